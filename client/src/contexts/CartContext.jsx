@@ -59,6 +59,23 @@ export const CartProvider = ({ children }) => {
     )
   }
 
+  // Replace stored prices with the current ones from a cart quote
+  const applyQuotedPrices = (quotedItems) => {
+    const prices = {}
+    quotedItems.forEach(line => {
+      if (line.warnings.includes('price_changed')) {
+        prices[line.product_id] = line.unit_price
+      }
+    })
+    if (Object.keys(prices).length === 0) return
+
+    setCartItems(prevItems =>
+      prevItems.map(item =>
+        item.id in prices ? { ...item, selling_price: prices[item.id] } : item
+      )
+    )
+  }
+
   const clearCart = () => {
     setCartItems([])
   }
@@ -80,6 +97,7 @@ export const CartProvider = ({ children }) => {
     addToCart,
     removeFromCart,
     updateQuantity,
+    applyQuotedPrices,
     clearCart,
     getCartTotal,
     getCartItemCount,
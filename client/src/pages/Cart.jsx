@@ -1,8 +1,8 @@
-import { useState } from 'react'
+import { useState, useEffect } from 'react'
 import { Link } from 'react-router-dom'
 import { useCart } from '../contexts/CartContext'
 import { useAuth } from '../contexts/AuthContext'
-import { purchasesAPI } from '../utils/api'
+import { purchasesAPI, cartAPI } from '../utils/api'
 import { 
   ShoppingCartIcon,
   PlusIcon,
@@ -15,11 +15,58 @@ import {
 } from '@heroicons/react/24/outline'
 
 const Cart = () => {
-  const { cartItems, removeFromCart, updateQuantity, getCartTotal, clearCart } = useCart()
+  const { cartItems, removeFromCart, updateQuantity, applyQuotedPrices, getCartTotal, clearCart } = useCart()
   const { user } = useAuth()
   const [showPaymentModal, setShowPaymentModal] = useState(false)
   const [paymentMethod, setPaymentMethod] = useState('cash')
   const [isProcessing, setIsProcessing] = useState(false)
+  const [quote, setQuote] = useState(null)
+  // One key per checkout attempt, so retrying "Pay Now" cannot create a second order
+  const [checkoutKey, setCheckoutKey] = useState(null)
+
+  // Re-validate prices and stock on the server whenever the cart changes
+  useEffect(() => {
+    if (cartItems.length === 0) {
+      setQuote(null)
+      return
+    }
+
+    const fetchQuote = async () => {
+      try {
+        const response = await cartAPI.quote(cartItems.map(item => ({
+          product_id: item.id,
+          quantity: item.quantity,
+          unit_price: item.selling_price
+        })))
+        setQuote(response.data)
+        applyQuotedPrices(response.data.items)
+      } catch (error) {
+        console.error('Error fetching cart quote:', error)
+      }
+    }
+
+    fetchQuote()
+  }, [cartItems])
+
+  const warningMessages = {
+    not_found: 'This product is no longer available',
+    inactive: 'This product is no longer available',
+    insufficient_stock: 'Not enough stock for this quantity',
+    price_changed: 'Price updated to the current price',
+  }
+
+  const getItemWarnings = (productId) => {
+    const line = quote?.items.find(item => item.product_id === productId)
+    return line ? line.warnings.filter(warning => warning in warningMessages) : []
+  }
+
+  const getItemPromotion = (productId) => {
+    const line = quote?.items.find(item => item.product_id === productId)
+    return line?.promotion ? { name: line.promotion.name, discount: line.discount_amount } : null
+  }
+
+  // Promotions are applied by the server, so its quote is the amount charged
+  const getPayableTotal = () => (quote && quote.is_valid ? quote.subtotal : getCartTotal())
 
   const handleQuantityChange = (productId, newQuantity) => {
     if (newQuantity <= 0) {
@@ -36,6 +83,7 @@ const Cart = () => {
       return
     }
 
+    setCheckoutKey(crypto.randomUUID())
     setShowPaymentModal(true)
   }
 
@@ -58,7 +106,7 @@ const Cart = () => {
       }
 
       // Create the purchase in the database
-      const response = await purchasesAPI.createPurchase(purchaseData)
+      const response = await purchasesAPI.createPurchase(purchaseData, checkoutKey)
       
       // Clear the cart after successful purchase
       clearCart()
@@ -141,6 +189,16 @@ const Cart = () => {
                 <p className="text-lg font-semibold text-primary-600 mt-1">
                   ${item.selling_price?.toFixed(2) || '0.00'}
                 </p>
+                {getItemPromotion(item.id) && (
+                  <p className="text-sm text-green-600">
+                    {getItemPromotion(item.id).name}: -${getItemPromotion(item.id).discount.toFixed(2)}
+                  </p>
+                )}
+                {getItemWarnings(item.id).map(warning => (
+                  <p key={warning} className="text-sm text-red-600">
+                    {warningMessages[warning]}
+                  </p>
+                ))}
               </div>
 
               <div className="flex items-center space-x-3">
@@ -176,11 +234,12 @@ const Cart = () => {
         <div className="px-6 py-4 bg-gray-50 border-t border-gray-200">
           <div className="flex justify-between items-center">
             <div className="text-lg font-semibold text-gray-900">
-              Total: ${getCartTotal().toFixed(2)}
+              Total: ${getPayableTotal().toFixed(2)}
             </div>
             <button
               onClick={handleCheckout}
-              className="inline-flex items-center px-6 py-3 border border-transparent text-base font-medium rounded-md text-white bg-primary-600 hover:bg-primary-700 focus:outline-none focus:ring-2 focus:ring-offset-2 focus:ring-primary-500"
+              disabled={quote !== null && !quote.is_valid}
+              className="inline-flex items-center px-6 py-3 border border-transparent text-base font-medium rounded-md text-white bg-primary-600 hover:bg-primary-700 focus:outline-none focus:ring-2 focus:ring-offset-2 focus:ring-primary-500 disabled:opacity-50"
             >
               <CreditCardIcon className="h-5 w-5 mr-2" />
               Proceed to Checkout
@@ -225,7 +284,7 @@ const Cart = () => {
 
               <div className="flex justify-between items-center">
                 <div className="text-lg font-semibold">
-                  Total: ${getCartTotal().toFixed(2)}
+                  Total: ${getPayableTotal().toFixed(2)}
                 </div>
                 <div className="space-x-3">
                   <button
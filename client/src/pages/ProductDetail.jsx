@@ -20,10 +20,12 @@ const ProductDetail = () => {
   const [selectedColor, setSelectedColor] = useState('')
   const [quantity, setQuantity] = useState(1)
   const [isInWishlist, setIsInWishlist] = useState(false)
+  const [relatedProducts, setRelatedProducts] = useState([])
   const { addToCart } = useCart()
 
   useEffect(() => {
     fetchProduct()
+    fetchRelatedProducts()
   }, [id])
 
   const fetchProduct = async () => {
@@ -40,6 +42,16 @@ const ProductDetail = () => {
     }
   }
 
+  const fetchRelatedProducts = async () => {
+    try {
+      const response = await productsAPI.getRelatedProducts(id, { limit: 4 })
+      setRelatedProducts(response.data.related)
+    } catch (error) {
+      console.error('Error fetching related products:', error)
+      setRelatedProducts([])
+    }
+  }
+
   const handleAddToCart = () => {
     if (product) {
       addToCart(product, quantity)
@@ -343,6 +355,33 @@ const ProductDetail = () => {
             </div>
           </div>
         </div>
+
+        {/* Frequently Bought Together */}
+        {relatedProducts.length > 0 && (
+          <div className="mt-16">
+            <h2 className="text-2xl font-bold text-gray-900 mb-8">Frequently Bought Together</h2>
+            <div className="grid grid-cols-2 md:grid-cols-4 gap-6">
+              {relatedProducts.map(({ product: related }) => (
+                <Link
+                  key={related.id}
+                  to={`/products/${related.id}`}
+                  className="bg-white rounded-lg shadow-md overflow-hidden hover:shadow-lg transition-shadow duration-200"
+                >
+                  <img
+                    src={related.image_url || 'https://via.placeholder.com/300x300?text=No+Image'}
+                    alt={related.name}
+                    className="w-full h-40 object-cover"
+                  />
+                  <div className="p-4">
+                    <p className="text-sm text-gray-500">{related.brand}</p>
+                    <h3 className="font-medium text-gray-900 truncate">{related.name}</h3>
+                    <p className="text-lg font-bold text-gray-900 mt-1">${related.selling_price}</p>
+                  </div>
+                </Link>
+              ))}
+            </div>
+          </div>
+        )}
       </div>
     </div>
   )
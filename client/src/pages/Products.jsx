@@ -1,6 +1,6 @@
 import { useState, useEffect } from 'react'
 import { Link } from 'react-router-dom'
-import { productsAPI, categoriesAPI } from '../utils/api'
+import { productsAPI, batchAPI } from '../utils/api'
 import { useCart } from '../contexts/CartContext'
 import { 
   MagnifyingGlassIcon, 
@@ -33,24 +33,10 @@ const Products = () => {
   const [showFilters, setShowFilters] = useState(false)
   const { addToCart } = useCart()
 
-  useEffect(() => {
-    fetchCategories()
-    fetchProducts()
-  }, [])
-
   useEffect(() => {
     fetchProducts()
   }, [filters, pagination.current_page])
 
-  const fetchCategories = async () => {
-    try {
-      const response = await categoriesAPI.getCategories()
-      setCategories(response.data.categories)
-    } catch (error) {
-      console.error('Error fetching categories:', error)
-    }
-  }
-
   const fetchProducts = async () => {
     try {
       setLoading(true)
@@ -67,12 +53,32 @@ const Products = () => {
         }
       })
 
-      const response = await productsAPI.getProducts(params)
-      setProducts(response.data.products)
+      let data
+      if (categories.length === 0) {
+        // First load: fetch categories and products in one round trip
+        const response = await batchAPI.run([
+          { id: 'categories', path: '/api/categories/' },
+          { id: 'products', path: '/api/products/', params },
+        ], { parallel: true })
+        const [categoriesResult, productsResult] = response.data.responses
+        if (categoriesResult.status === 200) {
+          setCategories(categoriesResult.body.categories)
+        }
+        if (productsResult.status !== 200) {
+          // Keep the current list rather than replacing it with an error body
+          throw new Error(productsResult.body?.error || 'Failed to fetch products')
+        }
+        data = productsResult.body
+      } else {
+        const response = await productsAPI.getProducts(params)
+        data = response.data
+      }
+
+      setProducts(data.products)
       setPagination(prev => ({
         ...prev,
-        total: response.data.total,
-        pages: response.data.pages
+        total: data.total,
+        pages: data.pages
       }))
     } catch (error) {
       console.error('Error fetching products:', error)
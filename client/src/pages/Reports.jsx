@@ -1,5 +1,5 @@
 import { useState, useEffect } from 'react'
-import { reportsAPI } from '../utils/api'
+import { batchAPI } from '../utils/api'
 import { 
   ChartBarIcon,
   CurrencyDollarIcon,
@@ -23,22 +23,22 @@ const Reports = () => {
 
   useEffect(() => {
     fetchReports()
-  }, [activeTab, dateRange])
+  }, [dateRange])
 
   const fetchReports = async () => {
     try {
       setLoading(true)
       
-      if (activeTab === 'sales') {
-        const response = await reportsAPI.getSalesReport(dateRange)
-        setSalesReport(response.data)
-      } else if (activeTab === 'inventory') {
-        const response = await reportsAPI.getInventoryReport()
-        setInventoryReport(response.data)
-      } else if (activeTab === 'profit') {
-        const response = await reportsAPI.getProfitReport(dateRange)
-        setProfitReport(response.data)
-      }
+      // Load every tab in one round trip so switching tabs needs no request
+      const response = await batchAPI.run([
+        { id: 'sales', path: '/api/reports/sales', params: dateRange },
+        { id: 'inventory', path: '/api/reports/inventory' },
+        { id: 'profit', path: '/api/reports/profit', params: dateRange },
+      ], { parallel: true })
+      const [sales, inventory, profit] = response.data.responses
+      if (sales.status === 200) setSalesReport(sales.body)
+      if (inventory.status === 200) setInventoryReport(inventory.body)
+      if (profit.status === 200) setProfitReport(profit.body)
     } catch (error) {
       console.error('Error fetching reports:', error)
     } finally {
@@ -50,10 +50,20 @@ export const authAPI = {
 export const productsAPI = {
   getProducts: (params) => api.get('/products/', { params }),
   getProduct: (id) => api.get(`/products/${id}`),
+  getRelatedProducts: (id, params) => api.get(`/products/${id}/related`, { params }),
+  getSimilarProducts: (id, params) => api.get(`/products/${id}/similar`, { params }),
+  getProductStyles: (params) => api.get('/products/', { params: { ...params, group_by: 'style' } }),
+  getProductStyle: (id) => api.get(`/products/styles/${id}`),
+  groupProductStyles: () => api.post('/products/styles/group'),
   createProduct: (productData) => api.post('/products/', productData),
   updateProduct: (id, productData) => api.put(`/products/${id}`, productData),
   deleteProduct: (id) => api.delete(`/products/${id}`),
   searchProducts: (query) => api.get('/products/search', { params: { q: query } }),
+  importProducts: (file, onConflict = 'update') => {
+    const formData = new FormData()
+    formData.append('file', file)
+    return api.post('/products/import', formData, { params: { on_conflict: onConflict } })
+  },
 }
 
 // Categories API
@@ -78,9 +88,13 @@ export const suppliersAPI = {
 export const purchasesAPI = {
   getPurchases: (params) => api.get('/purchases/', { params }),
   getPurchase: (id) => api.get(`/purchases/${id}`),
-  createPurchase: (purchaseData) => api.post('/purchases/', purchaseData),
+  createPurchase: (purchaseData, idempotencyKey) => api.post('/purchases/', purchaseData, {
+    headers: idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : {},
+  }),
   updatePurchase: (id, purchaseData) => api.put(`/purchases/${id}`, purchaseData),
   cancelPurchase: (id) => api.post(`/purchases/${id}/cancel`),
+  syncOfflineSales: (sales) => api.post('/purchases/bulk', { sales }),
+  updateStatuses: (purchaseIds, status) => api.post('/purchases/status', { purchase_ids: purchaseIds, status }),
 }
 
 // Inventory API
@@ -89,17 +103,114 @@ export const inventoryAPI = {
   getProductInventory: (productId) => api.get(`/inventory/${productId}`),
   createInventory: (inventoryData) => api.post('/inventory/', inventoryData),
   updateInventory: (productId, inventoryData) => api.put(`/inventory/${productId}`, inventoryData),
-  restockInventory: (productId, quantity) => api.post(`/inventory/${productId}/restock`, { quantity }),
+  restockInventory: (productId, quantity, locationId) => api.post(`/inventory/${productId}/restock`, { quantity, location_id: locationId }),
   getStockAlerts: () => api.get('/inventory/alerts'),
+  updateReorderPoints: (options) => api.post('/inventory/reorder-points', options),
 }
 
 // Reports API
 export const reportsAPI = {
   getSalesReport: (params) => api.get('/reports/sales', { params }),
   getInventoryReport: () => api.get('/reports/inventory'),
+  getInventoryAnalytics: (params) => api.get('/reports/inventory-analytics', { params }),
   getProfitReport: (params) => api.get('/reports/profit', { params }),
+  getTopProducts: (params) => api.get('/reports/top-products', { params }),
+  getTopCategories: (params) => api.get('/reports/top-categories', { params }),
   getDashboardData: () => api.get('/reports/dashboard'),
 }
 
+// Cart API
+export const cartAPI = {
+  quote: (items) => api.post('/cart/quote', { items }),
+}
+
+// Pricing API
+export const pricingAPI = {
+  bulkReprice: (data) => api.post('/pricing/bulk', data),
+  previewReprice: (data) => api.post('/pricing/bulk', { ...data, dry_run: true }),
+  getBatches: (params) => api.get('/pricing/batches', { params }),
+  getBatch: (id, params) => api.get(`/pricing/batches/${id}`, { params }),
+  rollbackBatch: (id) => api.post(`/pricing/batches/${id}/rollback`),
+}
+
+// Locations API
+export const locationsAPI = {
+  getLocations: () => api.get('/locations/'),
+  createLocation: (data) => api.post('/locations/', data),
+  updateLocation: (id, data) => api.put(`/locations/${id}`, data),
+  getStock: (id, params) => api.get(`/locations/${id}/stock`, { params }),
+  updateStock: (id, productId, data) => api.put(`/locations/${id}/stock/${productId}`, data),
+  getAlerts: (id) => api.get(`/locations/${id}/alerts`),
+  getTransfers: (params) => api.get('/locations/transfers', { params }),
+  createTransfer: (data) => api.post('/locations/transfers', data),
+}
+
+// Stocktakes API
+export const stocktakesAPI = {
+  getStocktakes: (params) => api.get('/stocktakes/', { params }),
+  getStocktake: (id) => api.get(`/stocktakes/${id}`),
+  createStocktake: (data) => api.post('/stocktakes/', data),
+  uploadCounts: (id, file, mode = 'add') => {
+    const formData = new FormData()
+    formData.append('file', file)
+    return api.post(`/stocktakes/${id}/counts`, formData, { params: { mode } })
+  },
+  recordCounts: (id, counts, mode = 'add') => api.post(`/stocktakes/${id}/counts`, { counts }, { params: { mode } }),
+  computeVariances: (id) => api.post(`/stocktakes/${id}/variances`),
+  getVariances: (id, params) => api.get(`/stocktakes/${id}/variances`, { params }),
+  reconcile: (id) => api.post(`/stocktakes/${id}/reconcile`),
+  cancel: (id) => api.post(`/stocktakes/${id}/cancel`),
+}
+
+// Replenishment API
+export const replenishmentAPI = {
+  getSuggestions: (params) => api.get('/replenishment/suggestions', { params }),
+  plan: (options) => api.post('/replenishment/plan', options),
+  getOrders: (params) => api.get('/replenishment/orders', { params }),
+  getOrder: (id) => api.get(`/replenishment/orders/${id}`),
+  updateOrder: (id, orderData) => api.put(`/replenishment/orders/${id}`, orderData),
+  submitOrder: (id) => api.post(`/replenishment/orders/${id}/submit`),
+  receiveOrder: (id, lines) => api.post(`/replenishment/orders/${id}/receive`, lines ? { lines } : {}),
+  cancelOrder: (id) => api.post(`/replenishment/orders/${id}/cancel`),
+}
+
+// Customers API
+export const customersAPI = {
+  getCustomers: (params) => api.get('/customers/', { params }),
+  getCustomerSegment: (userId) => api.get(`/customers/${userId}/segment`),
+  getSegments: () => api.get('/customers/segments'),
+  refreshSegments: (full = false) => api.post('/customers/segments/refresh', { full }),
+}
+
+// Promotions API
+export const promotionsAPI = {
+  getPromotions: (params) => api.get('/promotions/', { params }),
+  getRunningPromotions: () => api.get('/promotions/running'),
+  getPromotion: (id) => api.get(`/promotions/${id}`),
+  createPromotion: (promotionData) => api.post('/promotions/', promotionData),
+  updatePromotion: (id, promotionData) => api.put(`/promotions/${id}`, promotionData),
+  deletePromotion: (id) => api.delete(`/promotions/${id}`),
+}
+
+// POS API
+export const posAPI = {
+  lookup: (sku) => api.get('/pos/lookup', { params: { sku } }),
+  lookupMany: (skus) => api.post('/pos/lookup', { skus }),
+}
+
+// Batch API
+// Runs several API calls in one round trip. Each request is
+// { id, method, path, params, body }; responses come back in the same order.
+export const batchAPI = {
+  run: (requests, options = {}) => api.post('/batch', { requests, ...options }),
+}
+
+// Exports API
+export const exportsAPI = {
+  exportPurchases: (params) => api.get('/exports/purchases', { params, responseType: 'blob' }),
+  exportSales: (params) => api.get('/exports/sales', { params, responseType: 'blob' }),
+  exportInventory: (params) => api.get('/exports/inventory', { params, responseType: 'blob' }),
+}
+
 export default api
 
@@ -1,31 +1,49 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
-from flask_migrate import Migrate
+from flask_migrate import Migrate, upgrade
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timedelta
 import os
 from dotenv import load_dotenv
+from utils.json_provider import FastJSONProvider
+from utils.compression import init_compression
+from services.sku_index import init_sku_index, sku_index
+from services.stock import init_stock_sync, ensure_default_location, sync_product_stock
+from services.sales_rollups import ensure_sales_rollups
 
 load_dotenv()
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'your-secret-key-here')
 app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///fitness_shop.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'jwt-secret-string')
 app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=24)
+app.config['COMPRESS_MIN_SIZE'] = int(os.getenv('COMPRESS_MIN_SIZE', 1024))
+app.config['CATALOG_CACHE_TTL'] = int(os.getenv('CATALOG_CACHE_TTL', 60))
+app.config['SIMILARITY_INDEX_MAX_AGE'] = int(os.getenv('SIMILARITY_INDEX_MAX_AGE', 300))
+app.config['PROMOTION_INDEX_MAX_AGE'] = int(os.getenv('PROMOTION_INDEX_MAX_AGE', 60))
+app.config['POS_ROLE_CACHE_SECONDS'] = int(os.getenv('POS_ROLE_CACHE_SECONDS', 30))
+app.config['BATCH_MAX_REQUESTS'] = 20
+app.config['BATCH_MAX_WORKERS'] = 4
+app.config['IDEMPOTENCY_KEY_TTL_HOURS'] = 24
+app.config['IDEMPOTENCY_PENDING_SECONDS'] = 60  # After this, a key without a stored response counts as processed
 
 # Import models first to get the db instance
 from models import db, User, Product, Category, Supplier, Purchase, PurchaseItem, Inventory
 
 # Initialize extensions with the db from models
 db.init_app(app)
-migrate = Migrate(app, db)
+migrate = Migrate(app, db, directory=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations'))
 jwt = JWTManager(app)
+init_compression(app)
+init_sku_index(app)
+init_stock_sync(app)
 CORS(app, 
      origins=['http://localhost:5173', 'http://localhost:5174', 'http://localhost:3000', 'http://127.0.0.1:5173', 'http://127.0.0.1:5174', 'http://127.0.0.1:3000'],
-     allow_headers=['Content-Type', 'Authorization'],
+     allow_headers=['Content-Type', 'Authorization', 'Idempotency-Key'],
      methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'],
      supports_credentials=True)
 
@@ -37,6 +55,16 @@ from routes.suppliers import suppliers_bp
 from routes.purchases import purchases_bp
 from routes.inventory import inventory_bp
 from routes.reports import reports_bp
+from routes.exports import exports_bp
+from routes.batch import batch_bp
+from routes.pos import pos_bp
+from routes.cart import cart_bp
+from routes.pricing import pricing_bp
+from routes.stocktakes import stocktakes_bp
+from routes.locations import locations_bp
+from routes.replenishment import replenishment_bp
+from routes.customers import customers_bp
+from routes.promotions import promotions_bp
 
 # Register blueprints
 app.register_blueprint(auth_bp, url_prefix='/api/auth')
@@ -46,6 +74,16 @@ app.register_blueprint(suppliers_bp, url_prefix='/api/suppliers')
 app.register_blueprint(purchases_bp, url_prefix='/api/purchases')
 app.register_blueprint(inventory_bp, url_prefix='/api/inventory')
 app.register_blueprint(reports_bp, url_prefix='/api/reports')
+app.register_blueprint(exports_bp, url_prefix='/api/exports')
+app.register_blueprint(batch_bp, url_prefix='/api/batch')
+app.register_blueprint(pos_bp, url_prefix='/api/pos')
+app.register_blueprint(cart_bp, url_prefix='/api/cart')
+app.register_blueprint(pricing_bp, url_prefix='/api/pricing')
+app.register_blueprint(stocktakes_bp, url_prefix='/api/stocktakes')
+app.register_blueprint(locations_bp, url_prefix='/api/locations')
+app.register_blueprint(replenishment_bp, url_prefix='/api/replenishment')
+app.register_blueprint(customers_bp, url_prefix='/api/customers')
+app.register_blueprint(promotions_bp, url_prefix='/api/promotions')
 
 @app.route('/api/health')
 def health_check():
@@ -61,6 +99,13 @@ def internal_error(error):
 
 if __name__ == '__main__':
     with app.app_context():
+        # New tables come from create_all; columns added to existing tables from the migrations
         db.create_all()
+        upgrade()
+        ensure_default_location()
+        sync_product_stock()
+        ensure_sales_rollups()
+        db.session.commit()
+        sku_index.load()
     app.run(debug=True, host='0.0.0.0', port=5000)
 
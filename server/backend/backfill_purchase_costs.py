@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Purchase cost backfill script for Fitness Wear Shop Management System
+This script records a unit cost on purchase items created before costs were
+captured at the time of sale, so their cost stops following later
+cost price changes. Applying the schema migrations already does this;
+the script applies them and then costs any rows still missing a cost,
+for example ones loaded from an old backup, committing batch by batch.
+It can safely be stopped and run again.
+"""
+
+import os
+import sys
+import argparse
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from flask_migrate import upgrade
+from services.purchase_costs import BACKFILL_BATCH_SIZE, backfill_unit_costs
+
+def main():
+    parser = argparse.ArgumentParser(description='Backfill unit costs on purchase items')
+    parser.add_argument('--batch-size', type=int, default=BACKFILL_BATCH_SIZE,
+                        help=f'rows updated per transaction (default {BACKFILL_BATCH_SIZE})')
+    args = parser.parse_args()
+
+    with app.app_context():
+        # The cost and discount columns come from a migration; make sure it has run
+        upgrade()
+        print("Backfilling purchase item costs...")
+        updated = backfill_unit_costs(
+            batch_size=args.batch_size,
+            progress=lambda count: print(f"  {count} purchase items updated")
+        )
+        print(f"Backfill complete: {updated} purchase items updated")
+
+if __name__ == "__main__":
+    main()
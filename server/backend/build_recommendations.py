@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Recommendations script for Fitness Wear Shop Management System
+This script counts which products are bought together in purchases made
+since its last run and stores the top related products for each of them.
+Schedule it to run regularly; use --rebuild to recount every purchase.
+"""
+
+import os
+import sys
+import argparse
+import time
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, db
+from services.recommendations import (
+    TOP_K, MIN_CO_PURCHASES, PURCHASE_BATCH_SIZE, refresh_associations, rebuild_associations
+)
+
+def main():
+    parser = argparse.ArgumentParser(description='Build "frequently bought together" recommendations')
+    parser.add_argument('--top-k', type=int, default=TOP_K, help='related products stored per product')
+    parser.add_argument('--min-co-purchases', type=int, default=MIN_CO_PURCHASES,
+                        help='baskets two products must share to be related')
+    parser.add_argument('--batch-size', type=int, default=PURCHASE_BATCH_SIZE, help='purchases read per batch')
+    parser.add_argument('--rescore', action='store_true', help='re-rank every product, not just those bought since the last run')
+    parser.add_argument('--rebuild', action='store_true', help='recount all purchases from scratch')
+    args = parser.parse_args()
+
+    if args.top_k < 1 or args.min_co_purchases < 1 or args.batch_size < 1:
+        parser.error('--top-k, --min-co-purchases and --batch-size must be positive')
+
+    def progress(done, last):
+        print(f"  read purchases up to {done}/{last}")
+
+    with app.app_context():
+        started = time.perf_counter()
+        if args.rebuild:
+            summary = rebuild_associations(args.top_k, args.min_co_purchases, args.batch_size, progress)
+        else:
+            summary = refresh_associations(args.top_k, args.min_co_purchases, args.rescore, args.batch_size, progress)
+        db.session.commit()
+        print(f"Counted {summary['baskets']} baskets and stored {summary['associations']} associations "
+              f"for {summary['products']} products in {time.perf_counter() - started:.2f}s")
+
+if __name__ == "__main__":
+    main()
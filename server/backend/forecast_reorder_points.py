@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Reorder point script for Fitness Wear Shop Management System
+This script forecasts daily demand for every product from its sales history
+and sets each product's minimum and maximum stock levels from the forecast.
+Run it with --dry-run to print the suggestions without changing anything.
+"""
+
+import os
+import sys
+import argparse
+import time
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, db
+from services.forecasting import (
+    FORECAST_METHODS, DEFAULT_HISTORY_DAYS, DEFAULT_WINDOW_DAYS, DEFAULT_ALPHA,
+    DEFAULT_SERVICE_LEVEL, DEFAULT_COVER_DAYS, ForecastError, parse_options,
+    forecast_reorder_points, apply_reorder_points, forecast_rows
+)
+
+def main():
+    parser = argparse.ArgumentParser(description='Set stock levels from demand forecasts')
+    parser.add_argument('--method', choices=FORECAST_METHODS, default='exponential')
+    parser.add_argument('--history-days', type=int, default=DEFAULT_HISTORY_DAYS)
+    parser.add_argument('--window-days', type=int, default=DEFAULT_WINDOW_DAYS,
+                        help='days averaged by the moving-average method')
+    parser.add_argument('--alpha', type=float, default=DEFAULT_ALPHA,
+                        help='smoothing factor of the exponential method')
+    parser.add_argument('--service-level', type=float, default=DEFAULT_SERVICE_LEVEL)
+    parser.add_argument('--cover-days', type=float, default=DEFAULT_COVER_DAYS)
+    parser.add_argument('--dry-run', action='store_true', help='print suggestions without saving them')
+    parser.add_argument('--show', type=int, default=20, help='products listed, highest demand first')
+    args = parser.parse_args()
+
+    try:
+        options = parse_options({
+            'method': args.method,
+            'history_days': args.history_days,
+            'window_days': args.window_days,
+            'alpha': args.alpha,
+            'service_level': args.service_level,
+            'cover_days': args.cover_days,
+        })
+    except ForecastError as e:
+        parser.error(str(e))
+
+    with app.app_context():
+        started = time.perf_counter()
+        forecast = forecast_reorder_points(**options)
+        print(f"Forecast {len(forecast['product_id'])} products in {time.perf_counter() - started:.2f}s")
+
+        for row in forecast_rows(forecast, args.show):
+            print(f"  product {row['product_id']}: {row['daily_demand']}/day "
+                  f"(std {row['demand_std']}, lead {row['lead_time_days']}d) -> "
+                  f"min {row['minimum_stock_level']}, max {row['maximum_stock_level']}")
+
+        if args.dry_run:
+            print("Dry run: no stock levels changed")
+            return
+
+        updated = apply_reorder_points(forecast)
+        db.session.commit()
+        print(f"Updated stock levels on {updated} inventory records in {time.perf_counter() - started:.2f}s")
+
+if __name__ == "__main__":
+    main()
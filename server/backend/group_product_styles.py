@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+Product style grouping script for Fitness Wear Shop Management System
+This script attaches every active product without a style to a parent
+style by its name, brand and category, so each size/color variant of a
+garment lists under one style. Products matching an existing style join
+it; the rest get new styles.
+"""
+
+import os
+import sys
+import time
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, db
+from services.product_styles import group_ungrouped_products
+
+def main():
+    with app.app_context():
+        started = time.perf_counter()
+        summary = group_ungrouped_products()
+        db.session.commit()
+        print(f"Grouped {summary['products']} products, created {summary['styles_created']} styles "
+              f"in {time.perf_counter() - started:.2f}s")
+
+if __name__ == "__main__":
+    main()
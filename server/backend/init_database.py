@@ -16,7 +16,9 @@ from werkzeug.security import generate_password_hash
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from app import app, db
+from flask_migrate import upgrade
 from models import User, Product, Category, Supplier, Purchase, PurchaseItem, Inventory, UserRole
+from services.stock import ensure_default_location
 
 def init_database():
     """Initialize database from scratch - THIS WILL DELETE ALL EXISTING DATA"""
@@ -27,6 +29,7 @@ def init_database():
         print("Clearing existing data...")
         db.drop_all()
         db.create_all()
+        upgrade()  # Record the schema as current so later migrations start from here
         
         # Create categories
         print("Creating categories...")
@@ -241,32 +244,40 @@ def init_database():
         ]
         
         products = []
+        stock_quantities = []
+        minimum_levels = []
         for prod_data in products_data:
+            stock_quantities.append(prod_data.pop("stock_quantity"))
+            # Reorder levels live on the inventory record; products have no material column
+            minimum_levels.append(prod_data.pop("min_stock_level"))
+            prod_data.pop("material", None)
             product = Product(**prod_data)
             db.session.add(product)
             products.append(product)
         
         db.session.commit()
         
-        # Create inventory records
+        # Create inventory records, stocked at the default "Main Warehouse" location
         print("Creating inventory records...")
-        for product in products:
+        for product, stock_quantity, minimum_level in zip(products, stock_quantities, minimum_levels):
             inventory = Inventory(
                 product_id=product.id,
-                quantity=product.stock_quantity,
-                location="Main Warehouse",
-                last_updated=datetime.utcnow()
+                quantity_in_stock=stock_quantity,
+                minimum_stock_level=minimum_level,
+                last_restocked=datetime.utcnow()
             )
             db.session.add(inventory)
         
+        db.session.flush()
+        ensure_default_location()
         db.session.commit()
         
         # Create sample purchases
         print("Creating sample purchases...")
         for i in range(10):
             purchase = Purchase(
-                supplier_id=random.choice(suppliers).id,
-                purchase_date=datetime.utcnow() - timedelta(days=random.randint(1, 30)),
+                user_id=random.choice(users).id,
+                created_at=datetime.utcnow() - timedelta(days=random.randint(1, 30)),
                 total_amount=Decimal(str(random.uniform(100, 1000))).quantize(Decimal('0.01')),
                 status=random.choice(['completed', 'pending', 'cancelled']),
                 notes=f"Sample purchase #{i+1}"
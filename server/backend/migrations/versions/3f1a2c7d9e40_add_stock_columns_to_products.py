@@ -0,0 +1,37 @@
+"""add stock columns to products
+
+Revision ID: 3f1a2c7d9e40
+Revises:
+Create Date: 2026-10-19 00:40:56.060554
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from utils.migrations import add_column, create_index, drop_column, drop_index
+from services.stock import sync_product_stock
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1a2c7d9e40'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    add_column('products', sa.Column('stock_quantity', sa.Integer(), nullable=False, server_default='0'))
+    add_column('products', sa.Column('stock_status', sa.String(length=20), nullable=False, server_default='out_of_stock'))
+    create_index('ix_products_stock_quantity', 'products', ['stock_quantity'])
+    create_index('ix_products_stock_status', 'products', ['stock_status'])
+    create_index('ix_inventory_product_id', 'inventory', ['product_id'])
+
+    # Copy the current inventory totals onto every product
+    sync_product_stock(connection=op.get_bind())
+
+
+def downgrade():
+    drop_index('ix_inventory_product_id', 'inventory')
+    drop_index('ix_products_stock_status', 'products')
+    drop_index('ix_products_stock_quantity', 'products')
+    drop_column('products', 'stock_status')
+    drop_column('products', 'stock_quantity')
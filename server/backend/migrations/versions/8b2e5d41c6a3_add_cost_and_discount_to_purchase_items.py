@@ -0,0 +1,28 @@
+"""add cost and discount to purchase items
+
+Revision ID: 8b2e5d41c6a3
+Revises: 3f1a2c7d9e40
+Create Date: 2026-10-19 01:05:12.418230
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from utils.migrations import add_column, drop_column
+
+
+# revision identifiers, used by Alembic.
+revision = '8b2e5d41c6a3'
+down_revision = '3f1a2c7d9e40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # unit_cost stays NULL on existing rows until backfill_purchase_costs.py fills it in batches
+    add_column('purchase_items', sa.Column('unit_cost', sa.Numeric(precision=10, scale=2), nullable=True))
+    add_column('purchase_items', sa.Column('discount_amount', sa.Numeric(precision=10, scale=2), nullable=True, server_default='0'))
+
+
+def downgrade():
+    drop_column('purchase_items', 'discount_amount')
+    drop_column('purchase_items', 'unit_cost')
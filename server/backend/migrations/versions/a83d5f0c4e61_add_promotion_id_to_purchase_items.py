@@ -0,0 +1,27 @@
+"""add promotion id to purchase items
+
+Revision ID: a83d5f0c4e61
+Revises: f19b3e6a8c27
+Create Date: 2026-10-19 02:34:45.118903
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from utils.migrations import add_column, create_foreign_key, drop_column
+
+
+# revision identifiers, used by Alembic.
+revision = 'a83d5f0c4e61'
+down_revision = 'f19b3e6a8c27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Sales recorded before promotions existed used none
+    if add_column('purchase_items', sa.Column('promotion_id', sa.Integer(), nullable=True)):
+        create_foreign_key('fk_purchase_items_promotion_id', 'purchase_items', 'promotions', ['promotion_id'], ['id'])
+
+
+def downgrade():
+    drop_column('purchase_items', 'promotion_id')
@@ -0,0 +1,30 @@
+"""backfill purchase item costs
+
+Revision ID: b6f28d3a9c14
+Revises: a83d5f0c4e61
+Create Date: 2026-10-19 03:12:26.584017
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from utils.migrations import has_column
+from services.purchase_costs import backfill_unit_costs
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6f28d3a9c14'
+down_revision = 'a83d5f0c4e61'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Items sold before costs were captured get the product's current cost
+    # price, so reports can read costs from purchase_items alone
+    if has_column('purchase_items', 'unit_cost'):
+        backfill_unit_costs(connection=op.get_bind())
+
+
+def downgrade():
+    # The costs stay; they are valid data for the earlier schema too
+    pass
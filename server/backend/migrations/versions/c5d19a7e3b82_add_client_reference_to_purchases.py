@@ -0,0 +1,28 @@
+"""add client reference to purchases
+
+Revision ID: c5d19a7e3b82
+Revises: 8b2e5d41c6a3
+Create Date: 2026-10-19 01:42:37.905116
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from utils.migrations import add_column, create_index, drop_column, drop_index
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5d19a7e3b82'
+down_revision = '8b2e5d41c6a3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # SQLite cannot add a UNIQUE column, so uniqueness comes from an index
+    if add_column('purchases', sa.Column('client_reference', sa.String(length=64), nullable=True)):
+        create_index('ix_purchases_client_reference', 'purchases', ['client_reference'], unique=True)
+
+
+def downgrade():
+    drop_index('ix_purchases_client_reference', 'purchases')
+    drop_column('purchases', 'client_reference')
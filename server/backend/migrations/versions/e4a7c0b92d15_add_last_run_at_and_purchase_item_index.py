@@ -0,0 +1,27 @@
+"""add last run time to job states and index purchase items by purchase
+
+Revision ID: e4a7c0b92d15
+Revises: c5d19a7e3b82
+Create Date: 2026-10-19 02:03:51.276604
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from utils.migrations import add_column, create_index, drop_column, drop_index
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4a7c0b92d15'
+down_revision = 'c5d19a7e3b82'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    add_column('job_states', sa.Column('last_run_at', sa.DateTime(), nullable=True))
+    create_index('ix_purchase_items_purchase_id', 'purchase_items', ['purchase_id'])
+
+
+def downgrade():
+    drop_index('ix_purchase_items_purchase_id', 'purchase_items')
+    drop_column('job_states', 'last_run_at')
@@ -0,0 +1,29 @@
+"""add style id to products
+
+Revision ID: f19b3e6a8c27
+Revises: e4a7c0b92d15
+Create Date: 2026-10-19 02:17:08.640392
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from utils.migrations import add_column, create_foreign_key, create_index, drop_column, drop_index
+
+
+# revision identifiers, used by Alembic.
+revision = 'f19b3e6a8c27'
+down_revision = 'e4a7c0b92d15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing products start without a style; group_product_styles.py groups them
+    if add_column('products', sa.Column('style_id', sa.Integer(), nullable=True)):
+        create_foreign_key('fk_products_style_id', 'products', 'product_styles', ['style_id'], ['id'])
+    create_index('ix_products_style_id', 'products', ['style_id'])
+
+
+def downgrade():
+    drop_index('ix_products_style_id', 'products')
+    drop_column('products', 'style_id')
@@ -115,7 +115,11 @@ class Product(db.Model):
     image_url = db.Column(db.String(500))
     category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=False)
     supplier_id = db.Column(db.Integer, db.ForeignKey('suppliers.id'), nullable=False)
+    style_id = db.Column(db.Integer, db.ForeignKey('product_styles.id'), index=True)  # Parent style; each product is one size/color variant
     is_active = db.Column(db.Boolean, default=True)
+    # Copied from the product's inventory record whenever it changes, so stock filters and sorts stay on this table
+    stock_quantity = db.Column(db.Integer, default=0, nullable=False, index=True)
+    stock_status = db.Column(db.String(20), default='out_of_stock', nullable=False, index=True)  # in_stock, low_stock, out_of_stock
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -137,13 +141,43 @@ class Product(db.Model):
             'image_url': self.image_url,
             'category_id': self.category_id,
             'supplier_id': self.supplier_id,
+            'style_id': self.style_id,
             'is_active': self.is_active,
+            'stock_quantity': self.stock_quantity,
+            'stock_status': self.stock_status,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat(),
             'category': self.category.to_dict() if self.category else None,
             'supplier': self.supplier.to_dict() if self.supplier else None
         }
 
+class ProductStyle(db.Model):
+    __tablename__ = 'product_styles'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(200), nullable=False)
+    brand = db.Column(db.String(100))
+    description = db.Column(db.Text)
+    image_url = db.Column(db.String(500))
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Relationships
+    variants = db.relationship('Product', backref='style', lazy=True, order_by='Product.id')
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'brand': self.brand,
+            'description': self.description,
+            'image_url': self.image_url,
+            'category_id': self.category_id,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat()
+        }
+
 class Purchase(db.Model):
     __tablename__ = 'purchases'
     
@@ -154,6 +188,7 @@ class Purchase(db.Model):
     payment_status = db.Column(db.String(20), default='pending')
     status = db.Column(db.String(20), default='pending')  # pending, completed, cancelled
     notes = db.Column(db.Text)
+    client_reference = db.Column(db.String(64), unique=True)  # ID assigned by an offline POS terminal
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -179,11 +214,14 @@ class PurchaseItem(db.Model):
     __tablename__ = 'purchase_items'
     
     id = db.Column(db.Integer, primary_key=True)
-    purchase_id = db.Column(db.Integer, db.ForeignKey('purchases.id'), nullable=False)
+    purchase_id = db.Column(db.Integer, db.ForeignKey('purchases.id'), nullable=False, index=True)
     product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
     quantity = db.Column(db.Integer, nullable=False)
     unit_price = db.Column(db.Numeric(10, 2), nullable=False)
-    total_price = db.Column(db.Numeric(10, 2), nullable=False)
+    unit_cost = db.Column(db.Numeric(10, 2))  # Product cost when sold; NULL until backfilled on older rows
+    discount_amount = db.Column(db.Numeric(10, 2), default=0)
+    promotion_id = db.Column(db.Integer, db.ForeignKey('promotions.id'))  # Promotion that gave discount_amount
+    total_price = db.Column(db.Numeric(10, 2), nullable=False)  # After discount_amount
     
     def to_dict(self):
         return {
@@ -192,6 +230,9 @@ class PurchaseItem(db.Model):
             'product_id': self.product_id,
             'quantity': self.quantity,
             'unit_price': float(self.unit_price),
+            'unit_cost': float(self.unit_cost) if self.unit_cost is not None else None,
+            'discount_amount': float(self.discount_amount or 0),
+            'promotion_id': self.promotion_id,
             'total_price': float(self.total_price),
             'product': self.product.to_dict() if self.product else None
         }
@@ -200,8 +241,8 @@ class Inventory(db.Model):
     __tablename__ = 'inventory'
     
     id = db.Column(db.Integer, primary_key=True)
-    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
-    quantity_in_stock = db.Column(db.Integer, default=0)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False, index=True)
+    quantity_in_stock = db.Column(db.Integer, default=0)  # Total over all locations, updated together with stock_levels
     minimum_stock_level = db.Column(db.Integer, default=10)
     maximum_stock_level = db.Column(db.Integer, default=100)
     last_restocked = db.Column(db.DateTime)
@@ -221,4 +262,516 @@ class Inventory(db.Model):
             'product': self.product.to_dict() if self.product else None,
             'is_low_stock': self.quantity_in_stock <= self.minimum_stock_level,
             'is_out_of_stock': self.quantity_in_stock == 0
-        }
\ No newline at end of file
+        }
+
+class IdempotencyKey(db.Model):
+    __tablename__ = 'idempotency_keys'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'key', name='uq_idempotency_keys_user_key'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    key = db.Column(db.String(255), nullable=False)
+    request_hash = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.Integer)  # None while the original request is in flight
+    response_body = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+class Promotion(db.Model):
+    __tablename__ = 'promotions'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.Text)
+    promotion_type = db.Column(db.String(20), nullable=False)  # percent, fixed, buy_x_get_y
+    value = db.Column(db.Numeric(10, 2), nullable=False)  # Percent off, amount off per unit, or percent off the free units
+    buy_quantity = db.Column(db.Integer)  # buy_x_get_y only
+    get_quantity = db.Column(db.Integer)  # buy_x_get_y only
+    scope = db.Column(db.String(20), nullable=False, default='all')  # all, product, category, brand
+    targets = db.Column(db.JSON, nullable=False, default=list)  # Product IDs, category IDs or brand names
+    include_subcategories = db.Column(db.Boolean, default=True)
+    starts_at = db.Column(db.DateTime)
+    ends_at = db.Column(db.DateTime)
+    is_active = db.Column(db.Boolean, default=True, index=True)
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'description': self.description,
+            'promotion_type': self.promotion_type,
+            'value': float(self.value),
+            'buy_quantity': self.buy_quantity,
+            'get_quantity': self.get_quantity,
+            'scope': self.scope,
+            'targets': self.targets,
+            'include_subcategories': self.include_subcategories,
+            'starts_at': self.starts_at.isoformat() if self.starts_at else None,
+            'ends_at': self.ends_at.isoformat() if self.ends_at else None,
+            'is_active': self.is_active,
+            'created_by': self.created_by,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat()
+        }
+
+class PriceChangeBatch(db.Model):
+    __tablename__ = 'price_change_batches'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    filters = db.Column(db.JSON, nullable=False)
+    rule = db.Column(db.JSON, nullable=False)
+    reason = db.Column(db.Text)
+    product_count = db.Column(db.Integer, default=0)
+    status = db.Column(db.String(20), default='applied')  # applied, rolled_back
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    rolled_back_at = db.Column(db.DateTime)
+    rolled_back_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    
+    # Relationships
+    changes = db.relationship('PriceChange', backref='batch', lazy='dynamic')
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'filters': self.filters,
+            'rule': self.rule,
+            'reason': self.reason,
+            'product_count': self.product_count,
+            'status': self.status,
+            'created_at': self.created_at.isoformat(),
+            'rolled_back_at': self.rolled_back_at.isoformat() if self.rolled_back_at else None,
+            'rolled_back_by': self.rolled_back_by
+        }
+
+class PriceChange(db.Model):
+    __tablename__ = 'price_changes'
+    __table_args__ = (
+        db.UniqueConstraint('batch_id', 'product_id', name='uq_price_changes_batch_product'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    batch_id = db.Column(db.Integer, db.ForeignKey('price_change_batches.id'), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False, index=True)
+    old_price = db.Column(db.Numeric(10, 2), nullable=False)
+    new_price = db.Column(db.Numeric(10, 2), nullable=False)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'batch_id': self.batch_id,
+            'product_id': self.product_id,
+            'old_price': float(self.old_price),
+            'new_price': float(self.new_price)
+        }
+
+class StocktakeSession(db.Model):
+    __tablename__ = 'stocktake_sessions'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    notes = db.Column(db.Text)
+    location_id = db.Column(db.Integer, db.ForeignKey('locations.id'), nullable=False)
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.id'))  # None counts the whole location
+    zero_uncounted = db.Column(db.Boolean, default=False)  # Products in scope that were not scanned are counted as 0
+    status = db.Column(db.String(20), default='open')  # open, reconciled, cancelled
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    reconciled_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    reconciled_at = db.Column(db.DateTime)
+    
+    # Variance summary, filled in whenever variances are computed
+    products_counted = db.Column(db.Integer, default=0)
+    products_with_variance = db.Column(db.Integer, default=0)
+    variance_units = db.Column(db.Integer, default=0)
+    variance_value = db.Column(db.Numeric(12, 2), default=0)
+    shrinkage_value = db.Column(db.Numeric(12, 2), default=0)
+    variances_computed_at = db.Column(db.DateTime)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'notes': self.notes,
+            'location_id': self.location_id,
+            'category_id': self.category_id,
+            'zero_uncounted': self.zero_uncounted,
+            'status': self.status,
+            'created_by': self.created_by,
+            'created_at': self.created_at.isoformat(),
+            'reconciled_by': self.reconciled_by,
+            'reconciled_at': self.reconciled_at.isoformat() if self.reconciled_at else None,
+            'products_counted': self.products_counted,
+            'products_with_variance': self.products_with_variance,
+            'variance_units': self.variance_units,
+            'variance_value': float(self.variance_value or 0),
+            'shrinkage_value': float(self.shrinkage_value or 0),
+            'variances_computed_at': self.variances_computed_at.isoformat() if self.variances_computed_at else None
+        }
+
+class StocktakeCount(db.Model):
+    __tablename__ = 'stocktake_counts'
+    __table_args__ = (
+        db.UniqueConstraint('session_id', 'product_id', name='uq_stocktake_counts_session_product'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.Integer, db.ForeignKey('stocktake_sessions.id'), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    counted_quantity = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class StocktakeVariance(db.Model):
+    __tablename__ = 'stocktake_variances'
+    __table_args__ = (
+        db.UniqueConstraint('session_id', 'product_id', name='uq_stocktake_variances_session_product'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.Integer, db.ForeignKey('stocktake_sessions.id'), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    expected_quantity = db.Column(db.Integer, nullable=False)
+    counted_quantity = db.Column(db.Integer, nullable=False)
+    variance = db.Column(db.Integer, nullable=False)  # counted - expected
+    unit_cost = db.Column(db.Numeric(10, 2), nullable=False)
+    variance_value = db.Column(db.Numeric(12, 2), nullable=False)
+    
+    # Relationships
+    product = db.relationship('Product', lazy='joined')
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'session_id': self.session_id,
+            'product_id': self.product_id,
+            'sku': self.product.sku if self.product else None,
+            'product_name': self.product.name if self.product else None,
+            'expected_quantity': self.expected_quantity,
+            'counted_quantity': self.counted_quantity,
+            'variance': self.variance,
+            'unit_cost': float(self.unit_cost),
+            'variance_value': float(self.variance_value)
+        }
+
+class Location(db.Model):
+    __tablename__ = 'locations'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False, unique=True)
+    code = db.Column(db.String(20), nullable=False, unique=True)
+    address = db.Column(db.Text)
+    is_default = db.Column(db.Boolean, default=False)  # Sales and unscoped stock changes use this location
+    is_active = db.Column(db.Boolean, default=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'code': self.code,
+            'address': self.address,
+            'is_default': self.is_default,
+            'is_active': self.is_active,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat()
+        }
+
+class StockLevel(db.Model):
+    __tablename__ = 'stock_levels'
+    __table_args__ = (
+        db.UniqueConstraint('location_id', 'product_id', name='uq_stock_levels_location_product'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    location_id = db.Column(db.Integer, db.ForeignKey('locations.id'), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False, index=True)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    minimum_stock_level = db.Column(db.Integer, default=0)  # 0 disables low-stock alerts here
+    maximum_stock_level = db.Column(db.Integer)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Relationships
+    location = db.relationship('Location', lazy='joined')
+    product = db.relationship('Product', lazy='joined')
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'location_id': self.location_id,
+            'location': self.location.name if self.location else None,
+            'product_id': self.product_id,
+            'product': self.product.to_dict() if self.product else None,
+            'quantity': self.quantity,
+            'minimum_stock_level': self.minimum_stock_level,
+            'maximum_stock_level': self.maximum_stock_level,
+            'updated_at': self.updated_at.isoformat(),
+            'is_low_stock': bool(self.minimum_stock_level) and self.quantity <= self.minimum_stock_level,
+            'is_out_of_stock': self.quantity <= 0
+        }
+
+class StockTransfer(db.Model):
+    __tablename__ = 'stock_transfers'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    from_location_id = db.Column(db.Integer, db.ForeignKey('locations.id'), nullable=False)
+    to_location_id = db.Column(db.Integer, db.ForeignKey('locations.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    notes = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Relationships
+    items = db.relationship('StockTransferItem', backref='transfer', lazy=True, cascade='all, delete-orphan')
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'from_location_id': self.from_location_id,
+            'to_location_id': self.to_location_id,
+            'user_id': self.user_id,
+            'notes': self.notes,
+            'created_at': self.created_at.isoformat(),
+            'items': [item.to_dict() for item in self.items]
+        }
+
+class StockTransferItem(db.Model):
+    __tablename__ = 'stock_transfer_items'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    transfer_id = db.Column(db.Integer, db.ForeignKey('stock_transfers.id'), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'transfer_id': self.transfer_id,
+            'product_id': self.product_id,
+            'quantity': self.quantity
+        }
+
+class ProductSalesRollup(db.Model):
+    __tablename__ = 'product_sales_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('period', 'period_start', 'product_id', name='uq_product_sales_rollups_period_product'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    period = db.Column(db.String(10), nullable=False)  # week, month
+    period_start = db.Column(db.Date, nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False, index=True)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    cost = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'period': self.period,
+            'period_start': self.period_start.isoformat() if self.period_start else None,
+            'product_id': self.product_id,
+            'quantity': self.quantity,
+            'revenue': float(self.revenue),
+            'cost': float(self.cost)
+        }
+
+class CategorySalesRollup(db.Model):
+    __tablename__ = 'category_sales_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('period', 'period_start', 'category_id', name='uq_category_sales_rollups_period_category'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    period = db.Column(db.String(10), nullable=False)  # week, month
+    period_start = db.Column(db.Date, nullable=False)
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=False, index=True)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    cost = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'period': self.period,
+            'period_start': self.period_start.isoformat() if self.period_start else None,
+            'category_id': self.category_id,
+            'quantity': self.quantity,
+            'revenue': float(self.revenue),
+            'cost': float(self.cost)
+        }
+
+class PurchaseOrder(db.Model):
+    __tablename__ = 'purchase_orders'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    supplier_id = db.Column(db.Integer, db.ForeignKey('suppliers.id'), nullable=False, index=True)
+    location_id = db.Column(db.Integer, db.ForeignKey('locations.id'), nullable=False)  # Where the stock is received
+    status = db.Column(db.String(20), default='draft', index=True)  # draft, ordered, received, cancelled
+    payment_terms = db.Column(db.String(100))  # Supplier terms when the order was drafted
+    expected_delivery = db.Column(db.Date)
+    total_cost = db.Column(db.Numeric(12, 2), default=0)
+    notes = db.Column(db.Text)
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    ordered_at = db.Column(db.DateTime)
+    received_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    received_at = db.Column(db.DateTime)
+    
+    # Relationships
+    supplier = db.relationship('Supplier', lazy='joined')
+    lines = db.relationship('PurchaseOrderLine', backref='order', lazy=True, cascade='all, delete-orphan',
+                            order_by='PurchaseOrderLine.id')
+    
+    def to_dict(self, include_lines=False):
+        data = {
+            'id': self.id,
+            'supplier_id': self.supplier_id,
+            'supplier_name': self.supplier.name if self.supplier else None,
+            'location_id': self.location_id,
+            'status': self.status,
+            'payment_terms': self.payment_terms,
+            'expected_delivery': self.expected_delivery.isoformat() if self.expected_delivery else None,
+            'total_cost': float(self.total_cost or 0),
+            'notes': self.notes,
+            'created_by': self.created_by,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat(),
+            'ordered_at': self.ordered_at.isoformat() if self.ordered_at else None,
+            'received_by': self.received_by,
+            'received_at': self.received_at.isoformat() if self.received_at else None
+        }
+        if include_lines:
+            data['lines'] = [line.to_dict() for line in self.lines]
+        return data
+
+class PurchaseOrderLine(db.Model):
+    __tablename__ = 'purchase_order_lines'
+    __table_args__ = (
+        db.UniqueConstraint('order_id', 'product_id', name='uq_purchase_order_lines_order_product'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey('purchase_orders.id'), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False, index=True)
+    quantity = db.Column(db.Integer, nullable=False)
+    unit_cost = db.Column(db.Numeric(10, 2), nullable=False)
+    received_quantity = db.Column(db.Integer)
+    
+    # Relationships
+    product = db.relationship('Product', lazy='joined')
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'order_id': self.order_id,
+            'product_id': self.product_id,
+            'sku': self.product.sku if self.product else None,
+            'product_name': self.product.name if self.product else None,
+            'quantity': self.quantity,
+            'unit_cost': float(self.unit_cost),
+            'line_total': float(self.unit_cost * self.quantity),
+            'received_quantity': self.received_quantity
+        }
+
+class JobState(db.Model):
+    __tablename__ = 'job_states'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)
+    watermark = db.Column(db.Integer, nullable=False, default=0)  # Highest record ID the job has processed
+    processed_count = db.Column(db.Integer, nullable=False, default=0)  # Records counted so far
+    last_run_at = db.Column(db.DateTime)  # When the last completed run started
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'watermark': self.watermark,
+            'processed_count': self.processed_count,
+            'last_run_at': self.last_run_at.isoformat() if self.last_run_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+class ProductPairCount(db.Model):
+    __tablename__ = 'product_pair_counts'
+    __table_args__ = (
+        db.UniqueConstraint('product_id', 'related_product_id', name='uq_product_pair_counts_pair'),
+    )
+    
+    # One row per pair with product_id <= related_product_id; the diagonal holds each product's basket count
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    related_product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    baskets = db.Column(db.Integer, nullable=False, default=0)
+
+class ProductAssociation(db.Model):
+    __tablename__ = 'product_associations'
+    __table_args__ = (
+        db.UniqueConstraint('product_id', 'rank', name='uq_product_associations_product_rank'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    related_product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    rank = db.Column(db.Integer, nullable=False)  # 1 is the strongest association
+    co_purchases = db.Column(db.Integer, nullable=False)  # Baskets containing both products
+    confidence = db.Column(db.Float, nullable=False)  # Share of the product's baskets that also contain the related one
+    lift = db.Column(db.Float, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'product_id': self.product_id,
+            'related_product_id': self.related_product_id,
+            'rank': self.rank,
+            'co_purchases': self.co_purchases,
+            'confidence': round(self.confidence, 4),
+            'lift': round(self.lift, 4),
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+class CustomerSegment(db.Model):
+    __tablename__ = 'customer_segments'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), unique=True, nullable=False)
+    first_purchase_at = db.Column(db.DateTime, nullable=False)
+    last_purchase_at = db.Column(db.DateTime, nullable=False)
+    frequency = db.Column(db.Integer, nullable=False)  # Completed purchases
+    monetary = db.Column(db.Numeric(12, 2), nullable=False)  # Total spent on completed purchases
+    recency_score = db.Column(db.Integer, nullable=False, default=1)  # 1-5 quintiles, 5 is best
+    frequency_score = db.Column(db.Integer, nullable=False, default=1)
+    monetary_score = db.Column(db.Integer, nullable=False, default=1)
+    segment = db.Column(db.String(20), nullable=False, index=True)
+    scored_at = db.Column(db.DateTime, nullable=False)
+    
+    # Relationships
+    user = db.relationship('User', lazy='joined')
+    
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'username': self.user.username if self.user else None,
+            'email': self.user.email if self.user else None,
+            'first_name': self.user.first_name if self.user else None,
+            'last_name': self.user.last_name if self.user else None,
+            'first_purchase_at': self.first_purchase_at.isoformat(),
+            'last_purchase_at': self.last_purchase_at.isoformat(),
+            'recency_days': (datetime.utcnow() - self.last_purchase_at).days,
+            'frequency': self.frequency,
+            'monetary': float(self.monetary),
+            'recency_score': self.recency_score,
+            'frequency_score': self.frequency_score,
+            'monetary_score': self.monetary_score,
+            'rfm': f'{self.recency_score}{self.frequency_score}{self.monetary_score}',
+            'segment': self.segment,
+            'scored_at': self.scored_at.isoformat()
+        }
@@ -0,0 +1,108 @@
+from flask import Blueprint, request, jsonify, current_app
+from werkzeug.exceptions import HTTPException
+from concurrent.futures import ThreadPoolExecutor
+
+batch_bp = Blueprint('batch', __name__)
+
+def _error(sub_request, status, message):
+    return {'id': sub_request.get('id'), 'status': status, 'body': {'error': message}}
+
+def _dispatch(sub_request, authorization):
+    """Run one sub-request through the app's URL map and return its result.
+
+    The sub-request gets its own request context inside whatever app
+    context is current: run in order, that is the batch's, so it reuses the
+    batch's database session; run in parallel, each worker pushes its own
+    app context and with it a separate session. Sub-responses are built by
+    the view and ``before_request`` hooks only; ``after_request`` hooks
+    (compression and the like) are not applied to them.
+    """
+    method = (sub_request.get('method') or 'GET').upper()
+    path = sub_request.get('path') or ''
+
+    # Query arguments belong in ``params``; the path is matched as given
+    if not isinstance(path, str) or not path.startswith('/api/') or '?' in path:
+        return _error(sub_request, 400, 'Invalid path')
+
+    try:
+        endpoint, _ = current_app.url_map.bind('').match(path, method)
+    except HTTPException:
+        endpoint = None  # Unknown paths and methods get their error response from dispatching
+    if endpoint == 'batch.run_batch':
+        return _error(sub_request, 400, 'Batches cannot be nested')
+
+    headers = {'Authorization': authorization} if authorization else {}
+    with current_app.test_request_context(
+        path,
+        method=method,
+        query_string=sub_request.get('params'),
+        json=sub_request.get('body'),
+        headers=headers
+    ):
+        try:
+            rv = current_app.preprocess_request()
+            if rv is None:
+                rv = current_app.dispatch_request()
+        except Exception as e:
+            try:
+                rv = current_app.handle_user_exception(e)
+            except Exception:
+                return _error(sub_request, 500, 'Internal server error')
+        response = current_app.make_response(rv)
+
+        if response.is_streamed:
+            return _error(sub_request, 400, 'Streaming endpoints cannot be batched')
+
+        return {
+            'id': sub_request.get('id'),
+            'status': response.status_code,
+            'body': response.get_json(silent=True)
+        }
+
+def _dispatch_in_app_context(app, sub_request, authorization):
+    with app.app_context():
+        return _dispatch(sub_request, authorization)
+
+@batch_bp.route('', methods=['POST'])
+def run_batch():
+    """Run several API requests in one round trip.
+
+    The batch itself needs no login: each sub-request carries the caller's
+    Authorization header and its route enforces its own access, so a
+    public page can batch public reads even with an expired token stored.
+    """
+    try:
+        data = request.get_json()
+        sub_requests = data.get('requests') if data else None
+
+        if not sub_requests or not isinstance(sub_requests, list):
+            return jsonify({'error': 'Requests are required'}), 400
+
+        if len(sub_requests) > current_app.config['BATCH_MAX_REQUESTS']:
+            return jsonify({'error': f'At most {current_app.config["BATCH_MAX_REQUESTS"]} requests can be batched'}), 400
+
+        if not all(isinstance(sub_request, dict) for sub_request in sub_requests):
+            return jsonify({'error': 'Each request must be an object'}), 400
+
+        authorization = request.headers.get('Authorization')
+
+        # Only independent reads may run concurrently; anything else runs in order
+        parallel = data.get('parallel', False) and all(
+            (sub_request.get('method') or 'GET').upper() == 'GET' for sub_request in sub_requests
+        )
+
+        if parallel and len(sub_requests) > 1:
+            app = current_app._get_current_object()
+            workers = min(len(sub_requests), current_app.config['BATCH_MAX_WORKERS'])
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                responses = list(executor.map(
+                    lambda sub_request: _dispatch_in_app_context(app, sub_request, authorization),
+                    sub_requests
+                ))
+        else:
+            responses = [_dispatch(sub_request, authorization) for sub_request in sub_requests]
+
+        return jsonify({'responses': responses}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
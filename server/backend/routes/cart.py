@@ -0,0 +1,34 @@
+from flask import Blueprint, request, jsonify
+from services.pricing import quote_items
+
+cart_bp = Blueprint('cart', __name__)
+
+# Largest number of lines accepted in one quote
+CART_MAX_LINES = 200
+
+@cart_bp.route('/quote', methods=['POST'])
+def quote_cart():
+    try:
+        data = request.get_json()
+        items = data.get('items') if data else None
+
+        if not isinstance(items, list):
+            return jsonify({'error': 'Items are required'}), 400
+
+        if len(items) > CART_MAX_LINES:
+            return jsonify({'error': f'At most {CART_MAX_LINES} items can be quoted at once'}), 400
+
+        if not all(isinstance(item, dict) for item in items):
+            return jsonify({'error': 'Each item must be an object'}), 400
+
+        lines, subtotal = quote_items(items)
+
+        return jsonify({
+            'items': lines,
+            'subtotal': subtotal,
+            'discount_total': sum(line.get('discount_amount', 0) for line in lines),
+            'is_valid': bool(lines) and not any(line['warnings'] for line in lines)
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -2,10 +2,13 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import db, Category, User, UserRole
 from datetime import datetime
+from utils.cache import cached_response, invalidate_catalog
+from utils.idempotency import idempotent
 
 categories_bp = Blueprint('categories', __name__)
 
 @categories_bp.route('/', methods=['GET'])
+@cached_response('catalog')
 def get_categories():
     try:
         categories = Category.query.all()
@@ -16,6 +19,7 @@ def get_categories():
         return jsonify({'error': str(e)}), 500
 
 @categories_bp.route('/<int:category_id>', methods=['GET'])
+@cached_response('catalog')
 def get_category(category_id):
     try:
         category = Category.query.get(category_id)
@@ -27,6 +31,7 @@ def get_category(category_id):
 
 @categories_bp.route('/', methods=['POST'])
 @jwt_required()
+@idempotent
 def create_category():
     try:
         user_id = get_jwt_identity()
@@ -52,6 +57,7 @@ def create_category():
         
         db.session.add(category)
         db.session.commit()
+        invalidate_catalog()
         
         return jsonify({
             'message': 'Category created successfully',
@@ -93,6 +99,7 @@ def update_category(category_id):
         
         category.updated_at = datetime.utcnow()
         db.session.commit()
+        invalidate_catalog()
         
         return jsonify({
             'message': 'Category updated successfully',
@@ -123,6 +130,7 @@ def delete_category(category_id):
         
         db.session.delete(category)
         db.session.commit()
+        invalidate_catalog()
         
         return jsonify({'message': 'Category deleted successfully'}), 200
         
@@ -0,0 +1,125 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from models import db, User, UserRole, CustomerSegment
+from utils.responses import listing_response
+from services.jobs import job_state
+from services.customer_segments import JOB_NAME, SEGMENTS, refresh_customer_segments, segment_summary
+
+customers_bp = Blueprint('customers', __name__)
+
+# Listing sort keys, all columns of the RFM table
+CUSTOMER_SORTS = {
+    'monetary': CustomerSegment.monetary,
+    'frequency': CustomerSegment.frequency,
+    'last_purchase_at': CustomerSegment.last_purchase_at,
+    'first_purchase_at': CustomerSegment.first_purchase_at,
+}
+
+def _is_admin():
+    user = User.query.get(get_jwt_identity())
+    return user is not None and user.role == UserRole.ADMIN
+
+def _last_run_at():
+    state = job_state(JOB_NAME)
+    return state.last_run_at.isoformat() if state.last_run_at else None
+
+@customers_bp.route('/', methods=['GET'])
+@jwt_required()
+def get_customers():
+    """Customers with their RFM scores, filtered and sorted on the stored segments only."""
+    try:
+        if not _is_admin():
+            return jsonify({'error': 'Insufficient permissions'}), 403
+        
+        page = request.args.get('page', 1, type=int)
+        per_page = request.args.get('per_page', 20, type=int)
+        segments = [name for name in request.args.get('segment', '').split(',') if name]
+        min_recency = request.args.get('min_recency_score', type=int)
+        min_frequency = request.args.get('min_frequency_score', type=int)
+        min_monetary = request.args.get('min_monetary_score', type=int)
+        sort_by = request.args.get('sort_by', 'monetary')
+        sort_order = request.args.get('sort_order', 'desc')
+        
+        unknown = [name for name in segments if name not in SEGMENTS]
+        if unknown:
+            return jsonify({'error': f'segment must be one of: {", ".join(SEGMENTS)}'}), 400
+        
+        if sort_by not in CUSTOMER_SORTS or sort_order not in ['asc', 'desc']:
+            return jsonify({'error': f'sort_by must be one of: {", ".join(CUSTOMER_SORTS)}; sort_order asc or desc'}), 400
+        
+        query = CustomerSegment.query
+        if segments:
+            query = query.filter(CustomerSegment.segment.in_(segments))
+        if min_recency:
+            query = query.filter(CustomerSegment.recency_score >= min_recency)
+        if min_frequency:
+            query = query.filter(CustomerSegment.frequency_score >= min_frequency)
+        if min_monetary:
+            query = query.filter(CustomerSegment.monetary_score >= min_monetary)
+        
+        sort_column = CUSTOMER_SORTS[sort_by]
+        order = sort_column.desc() if sort_order == 'desc' else sort_column.asc()
+        customers = query.order_by(order, CustomerSegment.user_id).paginate(
+            page=page, per_page=per_page, error_out=False
+        )
+        
+        return listing_response({
+            'customers': [customer.to_dict() for customer in customers.items],
+            'total': customers.total,
+            'pages': customers.pages,
+            'current_page': page,
+            'per_page': per_page,
+            'last_run_at': _last_run_at()
+        }, 'customers')
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@customers_bp.route('/<int:user_id>/segment', methods=['GET'])
+@jwt_required()
+def get_customer_segment(user_id):
+    try:
+        if not _is_admin():
+            return jsonify({'error': 'Insufficient permissions'}), 403
+        
+        customer = CustomerSegment.query.filter_by(user_id=user_id).first()
+        if not customer:
+            return jsonify({'error': 'No completed purchases recorded for this customer'}), 404
+        
+        return jsonify({'customer': customer.to_dict()}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@customers_bp.route('/segments', methods=['GET'])
+@jwt_required()
+def get_segments():
+    try:
+        if not _is_admin():
+            return jsonify({'error': 'Insufficient permissions'}), 403
+        
+        return jsonify({
+            'segments': segment_summary(),
+            'last_run_at': _last_run_at()
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@customers_bp.route('/segments/refresh', methods=['POST'])
+@jwt_required()
+def refresh_segments():
+    """Run the RFM job now instead of waiting for the scheduled run."""
+    try:
+        if not _is_admin():
+            return jsonify({'error': 'Insufficient permissions'}), 403
+        
+        data = request.get_json(silent=True) or {}
+        summary = refresh_customer_segments(full=bool(data.get('full')))
+        db.session.commit()
+        
+        return jsonify(dict(summary, message='Customer segments refreshed successfully')), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
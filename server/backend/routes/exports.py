@@ -0,0 +1,269 @@
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from models import db, Purchase, PurchaseItem, Product, Category, Inventory, User, UserRole
+from datetime import datetime, timedelta
+from decimal import Decimal
+from sqlalchemy import select, exists, and_
+import csv
+import io
+import json
+import zlib
+
+exports_bp = Blueprint('exports', __name__)
+
+# Rows fetched per round trip from the database cursor
+EXPORT_BATCH_SIZE = 1000
+
+# Flush the output buffer to the client once it grows past this many bytes
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+def _parse_export_args():
+    """Read the shared export filters from the query string.
+
+    Raises ValueError with a client-facing message on bad input.
+    """
+    export_format = request.args.get('format', 'csv').lower()
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError('format must be one of: csv, ndjson')
+
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    try:
+        start_datetime = datetime.strptime(start_date, '%Y-%m-%d') if start_date else None
+        end_datetime = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1) if end_date else None
+    except ValueError:
+        raise ValueError('Dates must use the YYYY-MM-DD format')
+
+    return {
+        'format': export_format,
+        'start': start_datetime,
+        'end': end_datetime,
+        'status': request.args.get('status'),
+        'category_id': request.args.get('category_id', type=int),
+    }
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def _json_value(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def _encode_rows(rows, fields, export_format):
+    """Yield encoded text chunks for ``rows`` without holding more than one chunk."""
+    buffer = io.StringIO()
+
+    if export_format == 'csv':
+        writer = csv.writer(buffer)
+        writer.writerow(fields)
+        for row in rows:
+            writer.writerow([_csv_value(value) for value in row])
+            if buffer.tell() >= EXPORT_CHUNK_SIZE:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+    else:
+        for row in rows:
+            buffer.write(json.dumps({field: _json_value(value) for field, value in zip(fields, row)}))
+            buffer.write('\n')
+            if buffer.tell() >= EXPORT_CHUNK_SIZE:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def _gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+def _stream_export(name, statement, fields, export_format):
+    """Build a streamed response that walks ``statement`` with a server-side cursor."""
+    def generate():
+        result = db.session.execute(
+            statement.execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE)
+        )
+        try:
+            yield from _encode_rows(result, fields, export_format)
+        finally:
+            result.close()
+
+    chunks = generate()
+    headers = {
+        'Content-Disposition': f'attachment; filename="{name}-{datetime.utcnow().strftime("%Y%m%d")}.{export_format}"',
+        'Vary': 'Accept-Encoding',
+    }
+
+    # Quality-aware, so 'gzip;q=0' refuses gzip as utils/compression.py reads it
+    if request.accept_encodings['gzip']:
+        chunks = _gzip_chunks(chunks)
+        headers['Content-Encoding'] = 'gzip'
+    else:
+        chunks = (chunk.encode('utf-8') for chunk in chunks)
+
+    return Response(
+        stream_with_context(chunks),
+        mimetype=EXPORT_FORMATS[export_format],
+        headers=headers
+    )
+
+def _is_staff():
+    user_id = get_jwt_identity()
+    user = User.query.get(user_id)
+    return user and user.role in [UserRole.STAFF, UserRole.ADMIN]
+
+@exports_bp.route('/purchases', methods=['GET'])
+@jwt_required()
+def export_purchases():
+    try:
+        if not _is_staff():
+            return jsonify({'error': 'Insufficient permissions'}), 403
+
+        filters = _parse_export_args()
+
+        fields = ['id', 'created_at', 'user_id', 'username', 'status', 'payment_method',
+                  'payment_status', 'total_amount', 'notes']
+        statement = select(
+            Purchase.id,
+            Purchase.created_at,
+            Purchase.user_id,
+            User.username,
+            Purchase.status,
+            Purchase.payment_method,
+            Purchase.payment_status,
+            Purchase.total_amount,
+            Purchase.notes
+        ).outerjoin(User, Purchase.user_id == User.id)
+
+        if filters['start']:
+            statement = statement.where(Purchase.created_at >= filters['start'])
+        if filters['end']:
+            statement = statement.where(Purchase.created_at < filters['end'])
+        if filters['status']:
+            statement = statement.where(Purchase.status == filters['status'])
+        if filters['category_id']:
+            statement = statement.where(exists().where(and_(
+                PurchaseItem.purchase_id == Purchase.id,
+                PurchaseItem.product_id == Product.id,
+                Product.category_id == filters['category_id']
+            )))
+
+        statement = statement.order_by(Purchase.id)
+        return _stream_export('purchases', statement, fields, filters['format'])
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@exports_bp.route('/sales', methods=['GET'])
+@jwt_required()
+def export_sales_lines():
+    try:
+        if not _is_staff():
+            return jsonify({'error': 'Insufficient permissions'}), 403
+
+        filters = _parse_export_args()
+
+        fields = ['purchase_id', 'created_at', 'status', 'item_id', 'product_id', 'sku',
+                  'product_name', 'category', 'quantity', 'unit_price', 'total_price']
+        statement = select(
+            Purchase.id,
+            Purchase.created_at,
+            Purchase.status,
+            PurchaseItem.id,
+            Product.id,
+            Product.sku,
+            Product.name,
+            Category.name,
+            PurchaseItem.quantity,
+            PurchaseItem.unit_price,
+            PurchaseItem.total_price
+        ).select_from(PurchaseItem).join(
+            Purchase, PurchaseItem.purchase_id == Purchase.id
+        ).join(
+            Product, PurchaseItem.product_id == Product.id
+        ).outerjoin(Category, Product.category_id == Category.id)
+
+        if filters['start']:
+            statement = statement.where(Purchase.created_at >= filters['start'])
+        if filters['end']:
+            statement = statement.where(Purchase.created_at < filters['end'])
+        if filters['status']:
+            statement = statement.where(Purchase.status == filters['status'])
+        if filters['category_id']:
+            statement = statement.where(Product.category_id == filters['category_id'])
+
+        statement = statement.order_by(Purchase.id, PurchaseItem.id)
+        return _stream_export('sales', statement, fields, filters['format'])
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@exports_bp.route('/inventory', methods=['GET'])
+@jwt_required()
+def export_inventory():
+    try:
+        if not _is_staff():
+            return jsonify({'error': 'Insufficient permissions'}), 403
+
+        filters = _parse_export_args()
+
+        fields = ['product_id', 'sku', 'name', 'category', 'quantity_in_stock', 'minimum_stock_level',
+                  'maximum_stock_level', 'cost_price', 'selling_price', 'stock_value', 'last_restocked']
+        statement = select(
+            Product.id,
+            Product.sku,
+            Product.name,
+            Category.name,
+            Inventory.quantity_in_stock,
+            Inventory.minimum_stock_level,
+            Inventory.maximum_stock_level,
+            Product.cost_price,
+            Product.selling_price,
+            Inventory.quantity_in_stock * Product.cost_price,
+            Inventory.last_restocked
+        ).select_from(Inventory).join(
+            Product, Inventory.product_id == Product.id
+        ).outerjoin(Category, Product.category_id == Category.id).where(Product.is_active == True)
+
+        # Inventory rows have no sale date, so the date range applies to restocking
+        if filters['start']:
+            statement = statement.where(Inventory.last_restocked >= filters['start'])
+        if filters['end']:
+            statement = statement.where(Inventory.last_restocked < filters['end'])
+        if filters['status'] == 'out_of_stock':
+            statement = statement.where(Inventory.quantity_in_stock == 0)
+        elif filters['status'] == 'low_stock':
+            statement = statement.where(Inventory.quantity_in_stock <= Inventory.minimum_stock_level)
+        elif filters['status'] == 'in_stock':
+            statement = statement.where(Inventory.quantity_in_stock > 0)
+        if filters['category_id']:
+            statement = statement.where(Product.category_id == filters['category_id'])
+
+        statement = statement.order_by(Product.id)
+        return _stream_export('inventory', statement, fields, filters['format'])
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
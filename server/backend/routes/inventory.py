@@ -1,10 +1,19 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, Inventory, Product, User, UserRole
+from models import db, Inventory, Product, User, UserRole, Location, StockLevel
 from datetime import datetime
+from sqlalchemy import and_
+from utils.responses import listing_response
+from utils.encoders import INVENTORY_ENCODER, paginate_rows
+from utils.idempotency import idempotent
+from services.stock import StockError, adjust_stock, withdraw_stock, add_stock_levels
+from services.forecasting import ForecastError, parse_options, forecast_reorder_points, apply_reorder_points, forecast_rows
 
 inventory_bp = Blueprint('inventory', __name__)
 
+# Products listed in a reorder-point run's response
+PREVIEW_LIMIT = 100
+
 @inventory_bp.route('/', methods=['GET'])
 @jwt_required()
 def get_inventory():
@@ -20,25 +29,23 @@ def get_inventory():
         low_stock_only = request.args.get('low_stock_only', 'false').lower() == 'true'
         out_of_stock_only = request.args.get('out_of_stock_only', 'false').lower() == 'true'
         
-        query = Inventory.query.join(Product).filter(Product.is_active == True)
+        query = INVENTORY_ENCODER.select().where(Product.is_active == True)
         
         if low_stock_only:
-            query = query.filter(Inventory.quantity_in_stock <= Inventory.minimum_stock_level)
+            query = query.where(Inventory.quantity_in_stock <= Inventory.minimum_stock_level)
         
         if out_of_stock_only:
-            query = query.filter(Inventory.quantity_in_stock == 0)
+            query = query.where(Inventory.quantity_in_stock == 0)
         
-        inventory = query.paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        rows, total, pages = paginate_rows(query.order_by(Inventory.id), page, per_page)
         
-        return jsonify({
-            'inventory': [item.to_dict() for item in inventory.items],
-            'total': inventory.total,
-            'pages': inventory.pages,
+        return listing_response({
+            'inventory': INVENTORY_ENCODER.encode_all(rows),
+            'total': total,
+            'pages': pages,
             'current_page': page,
             'per_page': per_page
-        }), 200
+        }, 'inventory')
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -57,13 +64,28 @@ def get_product_inventory(product_id):
         if not inventory:
             return jsonify({'error': 'Inventory record not found'}), 404
         
-        return jsonify({'inventory': inventory.to_dict()}), 200
+        stock_levels = StockLevel.query.filter_by(product_id=product_id).order_by(StockLevel.location_id).all()
+        
+        return jsonify({
+            'inventory': inventory.to_dict(),
+            'locations': [
+                {
+                    'location_id': level.location_id,
+                    'location': level.location.name,
+                    'quantity': level.quantity,
+                    'minimum_stock_level': level.minimum_stock_level,
+                    'maximum_stock_level': level.maximum_stock_level
+                }
+                for level in stock_levels
+            ]
+        }), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @inventory_bp.route('/', methods=['POST'])
 @jwt_required()
+@idempotent
 def create_inventory():
     try:
         user_id = get_jwt_identity()
@@ -86,6 +108,10 @@ def create_inventory():
         if Inventory.query.filter_by(product_id=data['product_id']).first():
             return jsonify({'error': 'Inventory record already exists for this product'}), 400
         
+        location_id = data.get('location_id')
+        if location_id is not None and not Location.query.filter_by(id=location_id, is_active=True).first():
+            return jsonify({'error': 'Location not found'}), 404
+        
         inventory = Inventory(
             product_id=data['product_id'],
             quantity_in_stock=data.get('quantity_in_stock', 0),
@@ -94,6 +120,12 @@ def create_inventory():
         )
         
         db.session.add(inventory)
+        add_stock_levels([{
+            'product_id': inventory.product_id,
+            'quantity_in_stock': inventory.quantity_in_stock,
+            'minimum_stock_level': inventory.minimum_stock_level,
+            'maximum_stock_level': inventory.maximum_stock_level
+        }], location_id)
         db.session.commit()
         
         return jsonify({
@@ -121,8 +153,21 @@ def update_inventory(product_id):
         
         data = request.get_json()
         
+        location_id = data.get('location_id')
+        if location_id is not None and not Location.query.filter_by(id=location_id, is_active=True).first():
+            return jsonify({'error': 'Location not found'}), 404
+        
         if 'quantity_in_stock' in data:
-            inventory.quantity_in_stock = data['quantity_in_stock']
+            quantity = data['quantity_in_stock']
+            if isinstance(quantity, bool) or not isinstance(quantity, int) or quantity < 0:
+                return jsonify({'error': 'Quantity must be a non-negative integer'}), 400
+            delta = quantity - inventory.quantity_in_stock
+            if delta < 0 and location_id is None:
+                # A lower total is drawn down across locations like a sale
+                withdraw_stock({product_id: -delta})
+            else:
+                # Booked at the given location (default location if omitted)
+                adjust_stock({product_id: delta}, location_id)
         if 'minimum_stock_level' in data:
             inventory.minimum_stock_level = data['minimum_stock_level']
         if 'maximum_stock_level' in data:
@@ -136,12 +181,16 @@ def update_inventory(product_id):
             'inventory': inventory.to_dict()
         }), 200
         
+    except StockError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @inventory_bp.route('/<int:product_id>/restock', methods=['POST'])
 @jwt_required()
+@idempotent
 def restock_inventory(product_id):
     try:
         user_id = get_jwt_identity()
@@ -160,7 +209,11 @@ def restock_inventory(product_id):
         if quantity <= 0:
             return jsonify({'error': 'Quantity must be greater than 0'}), 400
         
-        inventory.quantity_in_stock += quantity
+        location_id = data.get('location_id')
+        if location_id is not None and not Location.query.filter_by(id=location_id, is_active=True).first():
+            return jsonify({'error': 'Location not found'}), 404
+        
+        adjust_stock({product_id: quantity}, location_id)
         inventory.last_restocked = datetime.utcnow()
         inventory.updated_at = datetime.utcnow()
         db.session.commit()
@@ -201,12 +254,52 @@ def get_stock_alerts():
             )
         ).all()
         
-        return jsonify({
+        return listing_response({
             'low_stock': [item.to_dict() for item in low_stock],
             'out_of_stock': [item.to_dict() for item in out_of_stock],
             'total_alerts': len(low_stock) + len(out_of_stock)
-        }), 200
+        }, 'low_stock', 'out_of_stock')
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@inventory_bp.route('/reorder-points', methods=['POST'])
+@jwt_required()
+def update_reorder_points():
+    """Forecast demand and set minimum/maximum stock levels from it."""
+    try:
+        user_id = get_jwt_identity()
+        user = User.query.get(user_id)
+        
+        if not user or user.role != UserRole.ADMIN:
+            return jsonify({'error': 'Insufficient permissions'}), 403
+        
+        data = request.get_json(silent=True) or {}
+        
+        try:
+            options = parse_options(data)
+        except ForecastError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        forecast = forecast_reorder_points(**options)
+        summary = {
+            'options': options,
+            'products_forecast': len(forecast['product_id']),
+            'suggestions': forecast_rows(forecast, PREVIEW_LIMIT)
+        }
+        
+        if data.get('dry_run'):
+            return jsonify(dict(summary, dry_run=True)), 200
+        
+        updated = apply_reorder_points(forecast)
+        db.session.commit()
+        
+        return jsonify(dict(
+            summary,
+            message='Reorder points updated successfully',
+            inventory_updated=updated
+        )), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,327 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from models import db, User, UserRole, Location, StockLevel, StockTransfer, Inventory, Product
+from sqlalchemy import or_
+from utils.responses import listing_response
+from utils.idempotency import idempotent
+from services.stock import StockError, adjust_stock, transfer_stock
+
+locations_bp = Blueprint('locations', __name__)
+
+# Largest number of products moved by one transfer
+TRANSFER_MAX_ITEMS = 500
+
+def _current_user():
+    return User.query.get(get_jwt_identity())
+
+def _is_staff(user):
+    return user is not None and user.role in [UserRole.STAFF, UserRole.ADMIN]
+
+def _set_default(location):
+    Location.query.filter(Location.id != location.id, Location.is_default == True).update(
+        {'is_default': False}, synchronize_session=False
+    )
+    location.is_default = True
+
+@locations_bp.route('/', methods=['GET'])
+@jwt_required()
+def get_locations():
+    try:
+        if not _is_staff(_current_user()):
+            return jsonify({'error': 'Insufficient permissions'}), 403
+
+        locations = Location.query.order_by(Location.name).all()
+        return jsonify({
+            'locations': [location.to_dict() for location in locations]
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@locations_bp.route('/', methods=['POST'])
+@jwt_required()
+@idempotent
+def create_location():
+    try:
+        user = _current_user()
+        if not user or user.role != UserRole.ADMIN:
+            return jsonify({'error': 'Insufficient permissions'}), 403
+
+        data = request.get_json()
+
+        if not data or not data.get('name') or not data.get('code'):
+            return jsonify({'error': 'Name and code are required'}), 400
+
+        if Location.query.filter(or_(Location.name == data['name'], Location.code == data['code'])).first():
+            return jsonify({'error': 'Location already exists'}), 400
+
+        location = Location(
+            name=data['name'],
+            code=data['code'],
+            address=data.get('address')
+        )
+        db.session.add(location)
+        db.session.flush()
+
+        if data.get('is_default'):
+            _set_default(location)
+
+        db.session.commit()
+
+        return jsonify({
+            'message': 'Location created successfully',
+            'location': location.to_dict()
+        }), 201
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@locations_bp.route('/<int:location_id>', methods=['PUT'])
+@jwt_required()
+def update_location(location_id):
+    try:
+        user = _current_user()
+        if not user or user.role != UserRole.ADMIN:
+            return jsonify({'error': 'Insufficient permissions'}), 403
+
+        location = Location.query.get(location_id)
+        if not location:
+            return jsonify({'error': 'Location not found'}), 404
+
+        data = request.get_json()
+
+        if 'name' in data:
+            location.name = data['name']
+        if 'code' in data:
+            location.code = data['code']
+        if 'address' in data:
+            location.address = data['address']
+        if 'is_active' in data:
+            if not data['is_active'] and location.is_default:
+                return jsonify({'error': 'The default location cannot be deactivated'}), 400
+            location.is_active = data['is_active']
+        if data.get('is_default'):
+            if not location.is_active:
+                return jsonify({'error': 'An inactive location cannot be the default'}), 400
+            _set_default(location)
+
+        db.session.commit()
+
+        return jsonify({
+            'message': 'Location updated successfully',
+            'location': location.to_dict()
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@locations_bp.route('/<int:location_id>/stock', methods=['GET'])
+@jwt_required()
+def get_location_stock(location_id):
+    try:
+        if not _is_staff(_current_user()):
+            return jsonify({'error': 'Insufficient permissions'}), 403
+
+        location = Location.query.get(location_id)
+        if not location:
+            return jsonify({'error': 'Location not found'}), 404
+
+        page = request.args.get('page', 1, type=int)
+        per_page = request.args.get('per_page', 20, type=int)
+        low_stock_only = request.args.get('low_stock_only', 'false').lower() == 'true'
+        out_of_stock_only = request.args.get('out_of_stock_only', 'false').lower() == 'true'
+
+        query = StockLevel.query.join(Product, StockLevel.product_id == Product.id).filter(
+            StockLevel.location_id == location_id,
+            Product.is_active == True
+        )
+
+        if low_stock_only:
+            query = query.filter(
+                StockLevel.minimum_stock_level > 0,
+                StockLevel.quantity <= StockLevel.minimum_stock_level
+            )
+
+        if out_of_stock_only:
+            query = query.filter(StockLevel.quantity <= 0)
+
+        levels = query.order_by(StockLevel.product_id).paginate(page=page, per_page=per_page, error_out=False)
+
+        return listing_response({
+            'location': location.to_dict(),
+            'stock': [level.to_dict() for level in levels.items],
+            'total': levels.total,
+            'pages': levels.pages,
+            'current_page': page,
+            'per_page': per_page
+        }, 'stock')
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@locations_bp.route('/<int:location_id>/stock/<int:product_id>', methods=['PUT'])
+@jwt_required()
+def update_location_stock(location_id, product_id):
+    try:
+        if not _is_staff(_current_user()):
+            return jsonify({'error': 'Insufficient permissions'}), 403
+
+        if not Location.query.filter_by(id=location_id, is_active=True).first():
+            return jsonify({'error': 'Location not found'}), 404
+
+        if not Inventory.query.filter_by(product_id=product_id).first():
+            return jsonify({'error': 'Inventory record not found'}), 404
+
+        data = request.get_json()
+
+        if 'quantity' in data:
+            if not isinstance(data['quantity'], int) or data['quantity'] < 0:
+                return jsonify({'error': 'Quantity must be a non-negative integer'}), 400
+            level = StockLevel.query.filter_by(location_id=location_id, product_id=product_id).first()
+            # Moves the product total by the same amount
+            adjust_stock({product_id: data['quantity'] - (level.quantity if level else 0)}, location_id)
+
+        level = StockLevel.query.filter_by(location_id=location_id, product_id=product_id).first()
+        if level is None:
+            level = StockLevel(location_id=location_id, product_id=product_id, quantity=0)
+            db.session.add(level)
+
+        if 'minimum_stock_level' in data:
+            level.minimum_stock_level = data['minimum_stock_level']
+        if 'maximum_stock_level' in data:
+            level.maximum_stock_level = data['maximum_stock_level']
+
+        db.session.commit()
+
+        return jsonify({
+            'message': 'Stock level updated successfully',
+            'stock': level.to_dict()
+        }), 200
+
+    except StockError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@locations_bp.route('/<int:location_id>/alerts', methods=['GET'])
+@jwt_required()
+def get_location_alerts(location_id):
+    try:
+        if not _is_staff(_current_user()):
+            return jsonify({'error': 'Insufficient permissions'}), 403
+
+        location = Location.query.get(location_id)
+        if not location:
+            return jsonify({'error': 'Location not found'}), 404
+
+        # Only products with a minimum set at this location raise alerts here
+        levels = StockLevel.query.join(Product, StockLevel.product_id == Product.id).filter(
+            StockLevel.location_id == location_id,
+            Product.is_active == True,
+            StockLevel.minimum_stock_level > 0,
+            StockLevel.quantity <= StockLevel.minimum_stock_level
+        ).order_by(StockLevel.quantity, StockLevel.product_id).all()
+
+        low_stock = [level.to_dict() for level in levels if level.quantity > 0]
+        out_of_stock = [level.to_dict() for level in levels if level.quantity <= 0]
+
+        return listing_response({
+            'location': location.to_dict(),
+            'low_stock': low_stock,
+            'out_of_stock': out_of_stock,
+            'total_alerts': len(low_stock) + len(out_of_stock)
+        }, 'low_stock', 'out_of_stock')
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@locations_bp.route('/transfers', methods=['GET'])
+@jwt_required()
+def get_transfers():
+    try:
+        if not _is_staff(_current_user()):
+            return jsonify({'error': 'Insufficient permissions'}), 403
+
+        page = request.args.get('page', 1, type=int)
+        per_page = request.args.get('per_page', 20, type=int)
+        location_id = request.args.get('location_id', type=int)
+
+        query = StockTransfer.query
+        if location_id:
+            query = query.filter(or_(
+                StockTransfer.from_location_id == location_id,
+                StockTransfer.to_location_id == location_id
+            ))
+
+        transfers = query.order_by(StockTransfer.created_at.desc()).paginate(
+            page=page, per_page=per_page, error_out=False
+        )
+
+        return jsonify({
+            'transfers': [transfer.to_dict() for transfer in transfers.items],
+            'total': transfers.total,
+            'pages': transfers.pages,
+            'current_page': page,
+            'per_page': per_page
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@locations_bp.route('/transfers', methods=['POST'])
+@jwt_required()
+@idempotent
+def create_transfer():
+    try:
+        user = _current_user()
+        if not _is_staff(user):
+            return jsonify({'error': 'Insufficient permissions'}), 403
+
+        data = request.get_json()
+        items = data.get('items') if data else None
+
+        if not items or not isinstance(items, list):
+            return jsonify({'error': 'Items are required'}), 400
+
+        if len(items) > TRANSFER_MAX_ITEMS:
+            return jsonify({'error': f'At most {TRANSFER_MAX_ITEMS} products can be transferred at once'}), 400
+
+        locations = Location.query.filter(
+            Location.id.in_([data.get('from_location_id'), data.get('to_location_id')]),
+            Location.is_active == True
+        ).count()
+        if data.get('from_location_id') == data.get('to_location_id') or locations != 2:
+            return jsonify({'error': 'Two different active locations are required'}), 400
+
+        quantities = {}
+        for item in items:
+            product_id = item.get('product_id') if isinstance(item, dict) else None
+            quantity = item.get('quantity') if isinstance(item, dict) else None
+            if not isinstance(product_id, int) or not isinstance(quantity, int) or quantity <= 0:
+                return jsonify({'error': 'Product ID and a positive quantity are required for each item'}), 400
+            quantities[product_id] = quantities.get(product_id, 0) + quantity
+
+        transfer = transfer_stock(
+            data['from_location_id'],
+            data['to_location_id'],
+            quantities,
+            user_id=user.id,
+            notes=data.get('notes')
+        )
+        db.session.commit()
+
+        return jsonify({
+            'message': 'Stock transferred successfully',
+            'transfer': transfer.to_dict()
+        }), 201
+
+    except StockError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,78 @@
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from models import User, UserRole
+from services.sku_index import sku_index
+import time
+
+pos_bp = Blueprint('pos', __name__)
+
+# Largest number of SKUs resolved by one batch lookup
+POS_MAX_BATCH = 500
+
+# User ID mapped to (is active staff, monotonic time the answer expires)
+_staff_checks = {}
+
+def _is_staff():
+    """Check the caller is an active staff member, from the database.
+
+    Scans are frequent, so the answer is kept per user for
+    ``POS_ROLE_CACHE_SECONDS``: a demoted or deactivated account loses
+    POS access within that time, not when its token expires.
+    """
+    user_id = get_jwt_identity()
+    now = time.monotonic()
+    cached = _staff_checks.get(user_id)
+    if cached is not None and cached[1] > now:
+        return cached[0]
+
+    user = User.query.get(user_id)
+    allowed = user is not None and user.is_active and user.role in [UserRole.STAFF, UserRole.ADMIN]
+    _staff_checks[user_id] = (allowed, now + current_app.config['POS_ROLE_CACHE_SECONDS'])
+    return allowed
+
+def _requested_skus():
+    if request.method == 'POST':
+        data = request.get_json() or {}
+        skus = data.get('skus') or []
+        if data.get('sku'):
+            skus = [data['sku']] + list(skus)
+        return [str(sku) for sku in skus]
+
+    skus = request.args.getlist('sku')
+    for value in request.args.getlist('skus'):
+        skus.extend(sku for sku in value.split(',') if sku)
+    return skus
+
+@pos_bp.route('/lookup', methods=['GET', 'POST'])
+@jwt_required()
+def lookup():
+    try:
+        if not _is_staff():
+            return jsonify({'error': 'Insufficient permissions'}), 403
+
+        skus = [sku.strip() for sku in _requested_skus()]
+        if not skus:
+            return jsonify({'error': 'At least one SKU is required'}), 400
+
+        if len(skus) > POS_MAX_BATCH:
+            return jsonify({'error': f'At most {POS_MAX_BATCH} SKUs can be looked up at once'}), 400
+
+        entries = sku_index.lookup_many(skus)
+        items = []
+        not_found = []
+        for sku in skus:
+            entry = entries.get(sku)
+            if entry is None or not entry['is_active']:
+                not_found.append(sku)
+            else:
+                items.append(entry)
+
+        if len(skus) == 1 and request.method == 'GET':
+            if not items:
+                return jsonify({'error': 'Product not found'}), 404
+            return jsonify({'item': items[0]}), 200
+
+        return jsonify({'items': items, 'not_found': not_found}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,152 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from models import db, User, UserRole, PriceChangeBatch, PriceChange
+from utils.cache import invalidate_catalog
+from utils.idempotency import idempotent
+from services.repricing import (
+    RepricingError, parse_filters, parse_rule, plan_price_changes,
+    apply_price_changes, rollback_price_changes
+)
+
+pricing_bp = Blueprint('pricing', __name__)
+
+# Changed products listed in a dry-run preview
+PREVIEW_LIMIT = 100
+
+def _is_staff():
+    user = User.query.get(get_jwt_identity())
+    return user is not None and user.role in [UserRole.STAFF, UserRole.ADMIN]
+
+@pricing_bp.route('/bulk', methods=['POST'])
+@jwt_required()
+@idempotent
+def bulk_reprice():
+    try:
+        if not _is_staff():
+            return jsonify({'error': 'Insufficient permissions'}), 403
+
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'filters and rule are required'}), 400
+
+        try:
+            filters = parse_filters(data.get('filters'))
+            rule = parse_rule(data.get('rule'))
+            changes, matched = plan_price_changes(filters, rule)
+        except RepricingError as e:
+            return jsonify({'error': str(e)}), 400
+
+        summary = {
+            'matched': matched,
+            'changed': len(changes),
+            'below_cost': sum(1 for change in changes if change['below_cost'])
+        }
+
+        if data.get('dry_run'):
+            return jsonify(dict(
+                summary,
+                dry_run=True,
+                changes=changes[:PREVIEW_LIMIT]
+            )), 200
+
+        batch = apply_price_changes(
+            changes, filters, rule, get_jwt_identity(), reason=data.get('reason')
+        )
+        db.session.commit()
+        invalidate_catalog()
+
+        return jsonify(dict(
+            summary,
+            message='Prices updated successfully',
+            batch=batch.to_dict()
+        )), 201
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@pricing_bp.route('/batches', methods=['GET'])
+@jwt_required()
+def get_price_batches():
+    try:
+        if not _is_staff():
+            return jsonify({'error': 'Insufficient permissions'}), 403
+
+        page = request.args.get('page', 1, type=int)
+        per_page = request.args.get('per_page', 20, type=int)
+
+        batches = PriceChangeBatch.query.order_by(PriceChangeBatch.created_at.desc()).paginate(
+            page=page, per_page=per_page, error_out=False
+        )
+
+        return jsonify({
+            'batches': [batch.to_dict() for batch in batches.items],
+            'total': batches.total,
+            'pages': batches.pages,
+            'current_page': page,
+            'per_page': per_page
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@pricing_bp.route('/batches/<int:batch_id>', methods=['GET'])
+@jwt_required()
+def get_price_batch(batch_id):
+    try:
+        if not _is_staff():
+            return jsonify({'error': 'Insufficient permissions'}), 403
+
+        batch = PriceChangeBatch.query.get(batch_id)
+        if not batch:
+            return jsonify({'error': 'Price change batch not found'}), 404
+
+        page = request.args.get('page', 1, type=int)
+        per_page = request.args.get('per_page', 100, type=int)
+
+        changes = PriceChange.query.filter_by(batch_id=batch_id).order_by(PriceChange.id).paginate(
+            page=page, per_page=per_page, error_out=False
+        )
+
+        return jsonify({
+            'batch': batch.to_dict(),
+            'changes': [change.to_dict() for change in changes.items],
+            'total': changes.total,
+            'pages': changes.pages,
+            'current_page': page,
+            'per_page': per_page
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@pricing_bp.route('/batches/<int:batch_id>/rollback', methods=['POST'])
+@jwt_required()
+@idempotent
+def rollback_price_batch(batch_id):
+    try:
+        if not _is_staff():
+            return jsonify({'error': 'Insufficient permissions'}), 403
+
+        batch = PriceChangeBatch.query.get(batch_id)
+        if not batch:
+            return jsonify({'error': 'Price change batch not found'}), 404
+
+        if batch.status != 'applied':
+            return jsonify({'error': 'Price change batch has already been rolled back'}), 400
+
+        restored = rollback_price_changes(batch, get_jwt_identity())
+        db.session.commit()
+        invalidate_catalog()
+
+        return jsonify({
+            'message': 'Price change batch rolled back successfully',
+            'batch': batch.to_dict(),
+            'restored': restored,
+            # Products repriced again after this batch keep their newer price
+            'skipped': batch.product_count - restored
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
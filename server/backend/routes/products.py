@@ -1,12 +1,44 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, Product, Category, Supplier, User, UserRole
+from models import db, Product, ProductStyle, Category, Supplier, User, UserRole, ProductAssociation
 from datetime import datetime
-from sqlalchemy import or_, and_
+from sqlalchemy import select, or_, and_
+import csv
+import io
+import json
+from utils.responses import listing_response
+from utils.encoders import PRODUCT_ENCODER, paginate_rows
+from utils.cache import cached_response, invalidate_catalog
+from utils.idempotency import idempotent
+from services.product_import import import_products
+from services.recommendations import TOP_K
+from services.similarity import similarity_index, DEFAULT_K, MAX_K
+from services.product_styles import style_page, style_detail, group_ungrouped_products
 
 products_bp = Blueprint('products', __name__)
 
+# Listing sort keys; stock sorts use the denormalized, indexed column on products
+PRODUCT_SORTS = {
+    'id': Product.id,
+    'name': Product.name,
+    'selling_price': Product.selling_price,
+    'created_at': Product.created_at,
+    'stock_quantity': Product.stock_quantity,
+}
+
+STOCK_STATUSES = ['in_stock', 'low_stock', 'out_of_stock']
+
+def _filters_on_stock():
+    """Stock moves with every sale, so stock-filtered listings bypass the catalog cache."""
+    return (
+        request.args.get('in_stock_only', 'false').lower() == 'true'
+        or request.args.get('low_stock_only', 'false').lower() == 'true'
+        or bool(request.args.get('stock_status'))
+        or request.args.get('sort_by') == 'stock_quantity'
+    )
+
 @products_bp.route('/', methods=['GET'])
+@cached_response('catalog', unless=_filters_on_stock)
 def get_products():
     try:
         page = request.args.get('page', 1, type=int)
@@ -20,13 +52,27 @@ def get_products():
         color = request.args.get('color', '')
         brand = request.args.get('brand', '')
         in_stock_only = request.args.get('in_stock_only', 'false').lower() == 'true'
+        low_stock_only = request.args.get('low_stock_only', 'false').lower() == 'true'
+        stock_status = request.args.get('stock_status', '')
+        sort_by = request.args.get('sort_by', 'id')
+        sort_order = request.args.get('sort_order', 'asc')
+        group_by = request.args.get('group_by', '')
+        
+        if group_by and group_by != 'style':
+            return jsonify({'error': 'group_by must be style'}), 400
+        
+        if stock_status and stock_status not in STOCK_STATUSES:
+            return jsonify({'error': f'stock_status must be one of: {", ".join(STOCK_STATUSES)}'}), 400
+        
+        if sort_by not in PRODUCT_SORTS or sort_order not in ['asc', 'desc']:
+            return jsonify({'error': f'sort_by must be one of: {", ".join(PRODUCT_SORTS)}; sort_order asc or desc'}), 400
         
         # Build query
-        query = Product.query.filter_by(is_active=True)
+        query = PRODUCT_ENCODER.select().where(Product.is_active == True)
         
         # Apply filters
         if search:
-            query = query.filter(
+            query = query.where(
                 or_(
                     Product.name.ilike(f'%{search}%'),
                     Product.description.ilike(f'%{search}%'),
@@ -36,48 +82,65 @@ def get_products():
             )
         
         if category_id:
-            query = query.filter_by(category_id=category_id)
+            query = query.where(Product.category_id == category_id)
         
         if supplier_id:
-            query = query.filter_by(supplier_id=supplier_id)
+            query = query.where(Product.supplier_id == supplier_id)
         
         if min_price:
-            query = query.filter(Product.selling_price >= min_price)
+            query = query.where(Product.selling_price >= min_price)
         
         if max_price:
-            query = query.filter(Product.selling_price <= max_price)
+            query = query.where(Product.selling_price <= max_price)
         
         if size:
-            query = query.filter(Product.size == size)
+            query = query.where(Product.size == size)
         
         if color:
-            query = query.filter(Product.color.ilike(f'%{color}%'))
+            query = query.where(Product.color.ilike(f'%{color}%'))
         
         if brand:
-            query = query.filter(Product.brand.ilike(f'%{brand}%'))
+            query = query.where(Product.brand.ilike(f'%{brand}%'))
         
         if in_stock_only:
-            query = query.join(Product.inventory).filter(
-                Product.inventory.any(quantity_in_stock > 0)
-            )
+            query = query.where(Product.stock_quantity > 0)
+        
+        if low_stock_only:
+            query = query.where(Product.stock_status == 'low_stock')
+        
+        if stock_status:
+            query = query.where(Product.stock_status == stock_status)
+        
+        if group_by == 'style':
+            # One entry per style with its variant matrix; the filters pick which styles are listed
+            styles, total, pages = style_page(query, sort_by, sort_order, page, per_page)
+            return listing_response({
+                'styles': styles,
+                'total': total,
+                'pages': pages,
+                'current_page': page,
+                'per_page': per_page
+            }, 'styles')
+        
+        sort_column = PRODUCT_SORTS[sort_by]
+        order = sort_column.desc() if sort_order == 'desc' else sort_column.asc()
         
         # Pagination
-        products = query.paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        rows, total, pages = paginate_rows(query.order_by(order, Product.id), page, per_page)
         
-        return jsonify({
-            'products': [product.to_dict() for product in products.items],
-            'total': products.total,
-            'pages': products.pages,
+        return listing_response({
+            'products': PRODUCT_ENCODER.encode_all(rows),
+            'total': total,
+            'pages': pages,
             'current_page': page,
             'per_page': per_page
-        }), 200
+        }, 'products')
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @products_bp.route('/<int:product_id>', methods=['GET'])
+@cached_response('catalog')
 def get_product(product_id):
     try:
         product = Product.query.get(product_id)
@@ -90,8 +153,130 @@ def get_product(product_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@products_bp.route('/<int:product_id>/related', methods=['GET'])
+@cached_response('catalog')
+def get_related_products(product_id):
+    """Products frequently bought together with this one, as ranked by the last association run."""
+    try:
+        limit = min(max(request.args.get('limit', TOP_K, type=int), 1), TOP_K)
+        
+        statement = PRODUCT_ENCODER.join(
+            select(
+                *PRODUCT_ENCODER.columns,
+                ProductAssociation.rank,
+                ProductAssociation.co_purchases,
+                ProductAssociation.confidence,
+                ProductAssociation.lift
+            )
+            .select_from(ProductAssociation)
+            .join(Product, ProductAssociation.related_product_id == Product.id)
+        )
+        rows = db.session.execute(
+            statement.where(ProductAssociation.product_id == product_id, Product.is_active == True)
+            .order_by(ProductAssociation.rank)
+            .limit(limit)
+        ).all()
+        
+        related = []
+        for row in rows:
+            rank, co_purchases, confidence, lift = row[PRODUCT_ENCODER.width:]
+            related.append({
+                'product': PRODUCT_ENCODER.encode(row),
+                'rank': rank,
+                'co_purchases': co_purchases,
+                'confidence': round(confidence, 4),
+                'lift': round(lift, 4)
+            })
+        
+        return jsonify({'product_id': product_id, 'related': related}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@products_bp.route('/styles/<int:style_id>', methods=['GET'])
+@cached_response('catalog')
+def get_product_style(style_id):
+    """A style with its size by color matrix of active variants and their stock.
+
+    Cached with the catalog; committed stock changes drop the cached
+    responses, so per-size availability is not held for the cache TTL.
+    """
+    try:
+        style = style_detail(style_id)
+        
+        if not style:
+            return jsonify({'error': 'Style not found'}), 404
+        
+        return jsonify({'style': style}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@products_bp.route('/styles/group', methods=['POST'])
+@jwt_required()
+def group_product_styles():
+    """Attach products without a style to one by name, brand and category."""
+    try:
+        user_id = get_jwt_identity()
+        user = User.query.get(user_id)
+        
+        if not user or user.role not in [UserRole.STAFF, UserRole.ADMIN]:
+            return jsonify({'error': 'Insufficient permissions'}), 403
+        
+        summary = group_ungrouped_products()
+        db.session.commit()
+        invalidate_catalog()
+        
+        return jsonify({'message': 'Products grouped into styles', **summary}), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+def _match_filter(name):
+    """Tri-state ``same_*`` filter: None when absent, else True or False."""
+    value = request.args.get(name)
+    if value is None or value == '':
+        return None
+    if value.lower() not in ['true', 'false']:
+        raise ValueError(f'{name} must be true or false')
+    return value.lower() == 'true'
+
+@products_bp.route('/<int:product_id>/similar', methods=['GET'])
+def get_similar_products(product_id):
+    """Nearest products by category path, name, brand, size, color and price band."""
+    try:
+        k = min(max(request.args.get('k', DEFAULT_K, type=int), 1), MAX_K)
+        in_stock_only = request.args.get('in_stock_only', 'true').lower() == 'true'
+        
+        try:
+            filters = {name: _match_filter(name) for name in ['same_brand', 'same_size', 'same_color']}
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        neighbors = similarity_index.nearest(product_id, k, in_stock_only, **filters)
+        if neighbors is None:
+            return jsonify({'error': 'Product not found'}), 404
+        
+        rows = db.session.execute(
+            PRODUCT_ENCODER.select().where(Product.id.in_([neighbor for neighbor, _ in neighbors]))
+        ).all()
+        products = {row[0]: PRODUCT_ENCODER.encode(row) for row in rows}
+        
+        return jsonify({
+            'product_id': product_id,
+            'similar': [
+                {'product': products[neighbor], 'score': round(score, 4)}
+                for neighbor, score in neighbors if neighbor in products
+            ]
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @products_bp.route('/', methods=['POST'])
 @jwt_required()
+@idempotent
 def create_product():
     try:
         user_id = get_jwt_identity()
@@ -119,6 +304,9 @@ def create_product():
         if not Supplier.query.get(data['supplier_id']):
             return jsonify({'error': 'Supplier not found'}), 400
         
+        if data.get('style_id') and not ProductStyle.query.get(data['style_id']):
+            return jsonify({'error': 'Style not found'}), 400
+        
         # Create product
         product = Product(
             name=data['name'],
@@ -131,11 +319,13 @@ def create_product():
             selling_price=data['selling_price'],
             image_url=data.get('image_url'),
             category_id=data['category_id'],
-            supplier_id=data['supplier_id']
+            supplier_id=data['supplier_id'],
+            style_id=data.get('style_id')
         )
         
         db.session.add(product)
         db.session.commit()
+        invalidate_catalog()
         
         return jsonify({
             'message': 'Product created successfully',
@@ -194,11 +384,16 @@ def update_product(product_id):
             if not Supplier.query.get(data['supplier_id']):
                 return jsonify({'error': 'Supplier not found'}), 400
             product.supplier_id = data['supplier_id']
+        if 'style_id' in data:
+            if data['style_id'] is not None and not ProductStyle.query.get(data['style_id']):
+                return jsonify({'error': 'Style not found'}), 400
+            product.style_id = data['style_id']
         if 'is_active' in data:
             product.is_active = data['is_active']
         
         product.updated_at = datetime.utcnow()
         db.session.commit()
+        invalidate_catalog()
         
         return jsonify({
             'message': 'Product updated successfully',
@@ -228,6 +423,7 @@ def delete_product(product_id):
         product.is_active = False
         product.updated_at = datetime.utcnow()
         db.session.commit()
+        invalidate_catalog()
         
         return jsonify({'message': 'Product deleted successfully'}), 200
         
@@ -235,7 +431,62 @@ def delete_product(product_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@products_bp.route('/import', methods=['POST'])
+@jwt_required()
+def bulk_import_products():
+    try:
+        user_id = get_jwt_identity()
+        user = User.query.get(user_id)
+        
+        if not user or user.role not in [UserRole.STAFF, UserRole.ADMIN]:
+            return jsonify({'error': 'Insufficient permissions'}), 403
+        
+        on_conflict = request.args.get('on_conflict', 'update')
+        if on_conflict not in ['update', 'skip']:
+            return jsonify({'error': 'on_conflict must be update or skip'}), 400
+        
+        # Accept an uploaded file, a raw CSV body or a JSON body
+        upload = request.files.get('file')
+        if upload:
+            stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig')
+            is_json = upload.filename.lower().endswith('.json') or upload.mimetype == 'application/json'
+        elif request.mimetype == 'text/csv':
+            stream = io.TextIOWrapper(request.stream, encoding='utf-8-sig')
+            is_json = False
+        elif request.is_json:
+            stream = None
+            is_json = True
+        else:
+            return jsonify({'error': 'Upload a CSV or JSON file'}), 400
+        
+        if is_json:
+            data = json.load(stream) if stream else request.get_json()
+            rows = data.get('products') if isinstance(data, dict) else data
+            if not isinstance(rows, list):
+                return jsonify({'error': 'JSON imports must be a list of products'}), 400
+        else:
+            # Rows are read lazily, so large files are never held in memory
+            rows = csv.DictReader(stream)
+        
+        # One transaction for the whole file: it is applied completely or not at all
+        summary = import_products(rows, on_conflict=on_conflict)
+        db.session.commit()
+        invalidate_catalog()
+        
+        return jsonify({
+            'message': 'Import completed',
+            **summary
+        }), 200
+        
+    except (UnicodeDecodeError, csv.Error, json.JSONDecodeError) as e:
+        db.session.rollback()
+        return jsonify({'error': f'Could not read file: {e}'}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @products_bp.route('/search', methods=['GET'])
+@cached_response('catalog')
 def search_products():
     try:
         query = request.args.get('q', '')
@@ -244,7 +495,7 @@ def search_products():
         if not query:
             return jsonify({'products': []}), 200
         
-        products = Product.query.filter(
+        rows = db.session.execute(PRODUCT_ENCODER.select().where(
             and_(
                 Product.is_active == True,
                 or_(
@@ -254,11 +505,11 @@ def search_products():
                     Product.sku.ilike(f'%{query}%')
                 )
             )
-        ).limit(limit).all()
+        ).limit(limit)).all()
         
-        return jsonify({
-            'products': [product.to_dict() for product in products]
-        }), 200
+        return listing_response({
+            'products': PRODUCT_ENCODER.encode_all(rows)
+        }, 'products')
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
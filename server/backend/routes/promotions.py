@@ -0,0 +1,155 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from models import db, User, UserRole, Promotion
+from datetime import datetime
+from sqlalchemy import or_
+from utils.idempotency import idempotent
+from services.promotions import PromotionError, parse_promotion, invalidate_promotions
+
+promotions_bp = Blueprint('promotions', __name__)
+
+def _is_staff():
+    user = User.query.get(get_jwt_identity())
+    return user is not None and user.role in [UserRole.STAFF, UserRole.ADMIN]
+
+def _running(query, now):
+    return query.filter(
+        Promotion.is_active == True,
+        or_(Promotion.starts_at == None, Promotion.starts_at <= now),
+        or_(Promotion.ends_at == None, Promotion.ends_at > now)
+    )
+
+@promotions_bp.route('/', methods=['GET'])
+@jwt_required()
+def get_promotions():
+    try:
+        if not _is_staff():
+            return jsonify({'error': 'Insufficient permissions'}), 403
+
+        page = request.args.get('page', 1, type=int)
+        per_page = request.args.get('per_page', 20, type=int)
+        running_only = request.args.get('running_only', 'false').lower() == 'true'
+
+        query = Promotion.query
+        if running_only:
+            query = _running(query, datetime.utcnow())
+
+        promotions = query.order_by(Promotion.id.desc()).paginate(page=page, per_page=per_page, error_out=False)
+
+        return jsonify({
+            'promotions': [promotion.to_dict() for promotion in promotions.items],
+            'total': promotions.total,
+            'pages': promotions.pages,
+            'current_page': page,
+            'per_page': per_page
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@promotions_bp.route('/running', methods=['GET'])
+def get_running_promotions():
+    """Promotions customers can use right now."""
+    try:
+        promotions = _running(Promotion.query, datetime.utcnow()).order_by(Promotion.id).all()
+        return jsonify({'promotions': [promotion.to_dict() for promotion in promotions]}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@promotions_bp.route('/<int:promotion_id>', methods=['GET'])
+@jwt_required()
+def get_promotion(promotion_id):
+    try:
+        if not _is_staff():
+            return jsonify({'error': 'Insufficient permissions'}), 403
+
+        promotion = Promotion.query.get(promotion_id)
+        if not promotion:
+            return jsonify({'error': 'Promotion not found'}), 404
+
+        return jsonify({'promotion': promotion.to_dict()}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@promotions_bp.route('/', methods=['POST'])
+@jwt_required()
+@idempotent
+def create_promotion():
+    try:
+        if not _is_staff():
+            return jsonify({'error': 'Insufficient permissions'}), 403
+
+        try:
+            fields = parse_promotion(request.get_json())
+        except PromotionError as e:
+            return jsonify({'error': str(e)}), 400
+
+        promotion = Promotion(created_by=get_jwt_identity(), **fields)
+        db.session.add(promotion)
+        db.session.commit()
+        invalidate_promotions()
+
+        return jsonify({
+            'message': 'Promotion created successfully',
+            'promotion': promotion.to_dict()
+        }), 201
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@promotions_bp.route('/<int:promotion_id>', methods=['PUT'])
+@jwt_required()
+def update_promotion(promotion_id):
+    try:
+        if not _is_staff():
+            return jsonify({'error': 'Insufficient permissions'}), 403
+
+        promotion = Promotion.query.get(promotion_id)
+        if not promotion:
+            return jsonify({'error': 'Promotion not found'}), 404
+
+        try:
+            fields = parse_promotion(request.get_json(), promotion)
+        except PromotionError as e:
+            return jsonify({'error': str(e)}), 400
+
+        for name, value in fields.items():
+            setattr(promotion, name, value)
+        promotion.updated_at = datetime.utcnow()
+        db.session.commit()
+        invalidate_promotions()
+
+        return jsonify({
+            'message': 'Promotion updated successfully',
+            'promotion': promotion.to_dict()
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@promotions_bp.route('/<int:promotion_id>', methods=['DELETE'])
+@jwt_required()
+def delete_promotion(promotion_id):
+    try:
+        if not _is_staff():
+            return jsonify({'error': 'Insufficient permissions'}), 403
+
+        promotion = Promotion.query.get(promotion_id)
+        if not promotion:
+            return jsonify({'error': 'Promotion not found'}), 404
+
+        # Soft delete; purchase items keep pointing at the promotion they used
+        promotion.is_active = False
+        promotion.updated_at = datetime.utcnow()
+        db.session.commit()
+        invalidate_promotions()
+
+        return jsonify({'message': 'Promotion deleted successfully'}), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
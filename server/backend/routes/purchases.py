@@ -1,12 +1,28 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, Purchase, PurchaseItem, Product, User, UserRole, Inventory
-from datetime import datetime
-from decimal import Decimal
+from models import db, Purchase, PurchaseItem, Product, User, UserRole
+from datetime import datetime, timezone
+from sqlalchemy import insert
 from sqlalchemy.orm import joinedload
+from utils.responses import listing_response
+from utils.encoders import PURCHASE_ENCODER, encode_purchases, paginate_rows
+from utils.idempotency import idempotent
+from services.pricing import load_catalog, cart_product_ids, quote_items
+from services.stock import StockError, withdraw_stock
+from services.promotions import PromotionHistory
+from services.sales_rollups import record_sales, apply_status_change
+from services.purchase_status import (
+    PURCHASE_STATUSES, PAYMENT_STATUSES, StatusConflict, transition_error, restore_stock, transition_purchases
+)
 
 purchases_bp = Blueprint('purchases', __name__)
 
+# Largest number of offline sales accepted by one bulk sync
+BULK_MAX_SALES = 500
+
+# Largest number of purchases moved by one bulk status change
+BULK_MAX_TRANSITIONS = 1000
+
 @purchases_bp.route('/', methods=['GET'])
 @jwt_required()
 def get_purchases():
@@ -18,24 +34,21 @@ def get_purchases():
         per_page = request.args.get('per_page', 20, type=int)
         
         # Build query based on user role
-        if user.role == UserRole.ADMIN:
-            query = Purchase.query.options(joinedload(Purchase.user))
-        elif user.role == UserRole.STAFF:
-            query = Purchase.query.options(joinedload(Purchase.user))
-        else:  # Customer
-            query = Purchase.query.filter_by(user_id=user_id).options(joinedload(Purchase.user))
-        
-        purchases = query.order_by(Purchase.created_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
+        query = PURCHASE_ENCODER.select()
+        if user.role not in [UserRole.ADMIN, UserRole.STAFF]:  # Customer
+            query = query.where(Purchase.user_id == user_id)
+        
+        rows, total, pages = paginate_rows(
+            query.order_by(Purchase.created_at.desc()), page, per_page
         )
         
-        return jsonify({
-            'purchases': [purchase.to_dict() for purchase in purchases.items],
-            'total': purchases.total,
-            'pages': purchases.pages,
+        return listing_response({
+            'purchases': encode_purchases(rows),
+            'total': total,
+            'pages': pages,
             'current_page': page,
             'per_page': per_page
-        }), 200
+        }, 'purchases')
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -62,6 +75,7 @@ def get_purchase(purchase_id):
 
 @purchases_bp.route('/', methods=['POST'])
 @jwt_required()
+@idempotent
 def create_purchase():
     try:
         user_id = get_jwt_identity()
@@ -70,35 +84,34 @@ def create_purchase():
         if not data.get('items') or not isinstance(data['items'], list):
             return jsonify({'error': 'Items are required'}), 400
         
-        # Calculate total amount
-        total_amount = Decimal('0')
+        if not all(isinstance(item, dict) for item in data['items']):
+            return jsonify({'error': 'Product ID and quantity are required for each item'}), 400
+        
+        # Price all items and check stock with one batched read
+        catalog = load_catalog(cart_product_ids(data['items']))
+        lines, total_amount = quote_items(data['items'], catalog)
         purchase_items = []
         
-        for item_data in data['items']:
-            product_id = item_data.get('product_id')
-            quantity = item_data.get('quantity', 1)
+        for line in lines:
+            warnings = line['warnings']
             
-            if not product_id or not quantity:
+            if 'invalid_item' in warnings:
                 return jsonify({'error': 'Product ID and quantity are required for each item'}), 400
             
-            product = Product.query.get(product_id)
-            if not product or not product.is_active:
-                return jsonify({'error': f'Product {product_id} not found or inactive'}), 400
-            
-            # Check inventory
-            inventory = Inventory.query.filter_by(product_id=product_id).first()
-            if not inventory or inventory.quantity_in_stock < quantity:
-                return jsonify({'error': f'Insufficient stock for product {product.name}'}), 400
+            if 'not_found' in warnings or 'inactive' in warnings:
+                return jsonify({'error': f'Product {line["product_id"]} not found or inactive'}), 400
             
-            unit_price = product.selling_price
-            total_price = unit_price * quantity
-            total_amount += total_price
+            if 'insufficient_stock' in warnings:
+                return jsonify({'error': f'Insufficient stock for product {line["name"]}'}), 400
             
             purchase_items.append({
-                'product_id': product_id,
-                'quantity': quantity,
-                'unit_price': unit_price,
-                'total_price': total_price
+                'product_id': line['product_id'],
+                'quantity': line['quantity'],
+                'unit_price': line['unit_price'],
+                'unit_cost': catalog[line['product_id']].cost_price,
+                'discount_amount': line['discount_amount'],
+                'promotion_id': line['promotion']['id'] if line['promotion'] else None,
+                'total_price': line['line_total']
             })
         
         # Create purchase
@@ -115,21 +128,25 @@ def create_purchase():
         db.session.flush()  # Get the purchase ID
         
         # Create purchase items and update inventory
+        sold = {}
         for item_data in purchase_items:
             purchase_item = PurchaseItem(
                 purchase_id=purchase.id,
                 product_id=item_data['product_id'],
                 quantity=item_data['quantity'],
                 unit_price=item_data['unit_price'],
+                unit_cost=item_data['unit_cost'],
+                discount_amount=item_data['discount_amount'],
+                promotion_id=item_data['promotion_id'],
                 total_price=item_data['total_price']
             )
             db.session.add(purchase_item)
             
-            # Update inventory
-            inventory = Inventory.query.filter_by(product_id=item_data['product_id']).first()
-            inventory.quantity_in_stock -= item_data['quantity']
-            inventory.updated_at = datetime.utcnow()
+            sold[item_data['product_id']] = sold.get(item_data['product_id'], 0) + item_data['quantity']
         
+        # Update inventory at the locations holding the stock
+        withdraw_stock(sold)
+        apply_status_change([purchase.id], None, purchase.status)
         db.session.commit()
         
         return jsonify({
@@ -137,6 +154,248 @@ def create_purchase():
             'purchase': purchase.to_dict()
         }), 201
         
+    except StockError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+def _recorded_at(sale):
+    """When an offline sale was made, as naive UTC; now if not given, None if unreadable."""
+    if not sale.get('recorded_at'):
+        return datetime.utcnow()
+    try:
+        recorded_at = datetime.fromisoformat(sale['recorded_at'])
+    except (TypeError, ValueError):
+        return None
+    if recorded_at.tzinfo is not None:
+        recorded_at = recorded_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return recorded_at
+
+@purchases_bp.route('/bulk', methods=['POST'])
+@jwt_required()
+@idempotent
+def bulk_create_purchases():
+    """Record a batch of sales queued by an offline POS terminal."""
+    try:
+        user_id = get_jwt_identity()
+        user = User.query.get(user_id)
+        
+        if not user or user.role not in [UserRole.STAFF, UserRole.ADMIN]:
+            return jsonify({'error': 'Insufficient permissions'}), 403
+        
+        data = request.get_json()
+        sales = data.get('sales') if data else None
+        
+        if not sales or not isinstance(sales, list):
+            return jsonify({'error': 'Sales are required'}), 400
+        
+        if len(sales) > BULK_MAX_SALES:
+            return jsonify({'error': f'At most {BULK_MAX_SALES} sales can be synced at once'}), 400
+        
+        if not all(isinstance(sale, dict) and isinstance(sale.get('items'), list) for sale in sales):
+            return jsonify({'error': 'Each sale must be an object with an items list'}), 400
+        
+        # Sales synced by an earlier, interrupted upload are reported, not re-applied
+        client_ids = [str(sale['client_id']) for sale in sales if sale.get('client_id')]
+        already_synced = dict(
+            db.session.query(Purchase.client_reference, Purchase.id)
+            .filter(Purchase.client_reference.in_(client_ids))
+        ) if client_ids else {}
+        
+        # Customers the sales are recorded for, checked with one query
+        sale_user_ids = {
+            sale['user_id'] for sale in sales
+            if isinstance(sale.get('user_id'), int) and not isinstance(sale['user_id'], bool)
+        }
+        known_users = {
+            known_id for (known_id,) in db.session.query(User.id).filter(User.id.in_(sale_user_ids))
+        } if sale_user_ids else set()
+        
+        # One read of prices and stock for every product in the batch
+        catalog = load_catalog(
+            item.get('product_id') for sale in sales for item in sale['items']
+            if isinstance(item, dict) and isinstance(item.get('product_id'), int)
+        )
+        available = {product_id: row.quantity_in_stock or 0 for product_id, row in catalog.items()}
+        
+        # Sales are discounted by the promotions running when they were made,
+        # read with one query for the period the batch covers
+        recorded_times = {id(sale): _recorded_at(sale) for sale in sales}
+        valid_times = [moment for moment in recorded_times.values() if moment is not None]
+        history = PromotionHistory(min(valid_times), max(valid_times)) if valid_times else None
+        
+        results = []
+        accepted = []
+        seen_client_ids = set()
+        
+        for sale in sales:
+            client_id = str(sale['client_id']) if sale.get('client_id') else None
+            result = {'client_id': client_id}
+            results.append(result)
+            
+            if not client_id:
+                result.update({'status': 'rejected', 'error': 'client_id is required'})
+                continue
+            
+            if client_id in already_synced:
+                result.update({'status': 'duplicate', 'purchase_id': already_synced[client_id]})
+                continue
+            
+            if client_id in seen_client_ids:
+                result.update({'status': 'rejected', 'error': 'Duplicate client_id in batch'})
+                continue
+            seen_client_ids.add(client_id)
+            
+            recorded_at = recorded_times[id(sale)]
+            if recorded_at is None:
+                result.update({'status': 'rejected', 'error': 'recorded_at must be an ISO 8601 timestamp'})
+                continue
+            
+            status = sale.get('status', 'completed')
+            payment_status = sale.get('payment_status', 'completed')
+            if status not in PURCHASE_STATUSES:
+                result.update({'status': 'rejected', 'error': f'status must be one of: {", ".join(PURCHASE_STATUSES)}'})
+                continue
+            if payment_status not in PAYMENT_STATUSES:
+                result.update({'status': 'rejected', 'error': f'payment_status must be one of: {", ".join(PAYMENT_STATUSES)}'})
+                continue
+            
+            sale_user_id = sale.get('user_id')
+            if sale_user_id is not None and (isinstance(sale_user_id, bool) or sale_user_id not in known_users):
+                result.update({'status': 'rejected', 'error': 'user_id does not match a user'})
+                continue
+            
+            if not sale['items'] or not all(isinstance(item, dict) for item in sale['items']):
+                result.update({'status': 'rejected', 'error': 'Items are required'})
+                continue
+            
+            lines, total_amount = quote_items(sale['items'], catalog, history, recorded_at)
+            error = None
+            for line in lines:
+                if 'invalid_item' in line['warnings']:
+                    error = 'Product ID and quantity are required for each item'
+                elif 'not_found' in line['warnings'] or 'inactive' in line['warnings']:
+                    error = f'Product {line["product_id"]} not found or inactive'
+                if error:
+                    break
+            
+            # Validate against stock left after the sales accepted so far;
+            # sales that were cancelled on the terminal take no stock
+            requested = {}
+            if not error and status != 'cancelled':
+                for line in lines:
+                    requested[line['product_id']] = requested.get(line['product_id'], 0) + line['quantity']
+                for product_id, quantity in requested.items():
+                    if available[product_id] < quantity:
+                        error = f'Insufficient stock for product {catalog[product_id].name}'
+                        break
+            
+            if error:
+                result.update({'status': 'rejected', 'error': error})
+                continue
+            
+            for product_id, quantity in requested.items():
+                available[product_id] -= quantity
+            
+            purchase = Purchase(
+                user_id=sale_user_id if sale_user_id is not None else user_id,
+                total_amount=total_amount,
+                payment_method=sale.get('payment_method'),
+                payment_status=payment_status,
+                status=status,
+                notes=sale.get('notes'),
+                client_reference=client_id,
+                created_at=recorded_at,
+                updated_at=recorded_at
+            )
+            accepted.append((result, purchase, lines))
+        
+        if accepted:
+            db.session.add_all([purchase for _, purchase, _ in accepted])
+            db.session.flush()  # Assigns purchase IDs in one batched insert
+            
+            item_rows = []
+            sold = {}
+            for result, purchase, lines in accepted:
+                result.update({'status': 'created', 'purchase_id': purchase.id})
+                for line in lines:
+                    item_rows.append({
+                        'purchase_id': purchase.id,
+                        'product_id': line['product_id'],
+                        'quantity': line['quantity'],
+                        'unit_price': line['unit_price'],
+                        'unit_cost': catalog[line['product_id']].cost_price,
+                        'discount_amount': line['discount_amount'],
+                        'promotion_id': line['promotion']['id'] if line['promotion'] else None,
+                        'total_price': line['line_total']
+                    })
+                    if purchase.status != 'cancelled':
+                        sold[line['product_id']] = sold.get(line['product_id'], 0) + line['quantity']
+            
+            db.session.execute(insert(PurchaseItem), item_rows)
+            withdraw_stock(sold)
+            record_sales(purchase.id for _, purchase, _ in accepted if purchase.status == 'completed')
+            db.session.commit()
+        
+        return jsonify({
+            'message': f'{len(accepted)} of {len(sales)} sales recorded',
+            'results': results
+        }), 200
+        
+    except StockError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@purchases_bp.route('/status', methods=['POST'])
+@jwt_required()
+@idempotent
+def bulk_update_status():
+    """Move many purchases to a new status in one transaction."""
+    try:
+        user_id = get_jwt_identity()
+        user = User.query.get(user_id)
+        
+        if not user or user.role not in [UserRole.STAFF, UserRole.ADMIN]:
+            return jsonify({'error': 'Insufficient permissions'}), 403
+        
+        data = request.get_json()
+        purchase_ids = data.get('purchase_ids') if data else None
+        status = data.get('status') if data else None
+        
+        if status not in PURCHASE_STATUSES:
+            return jsonify({'error': f'Status must be one of: {", ".join(PURCHASE_STATUSES)}'}), 400
+        
+        if not purchase_ids or not isinstance(purchase_ids, list):
+            return jsonify({'error': 'Purchase IDs are required'}), 400
+        
+        if not all(isinstance(purchase_id, int) for purchase_id in purchase_ids):
+            return jsonify({'error': 'Purchase IDs must be integers'}), 400
+        
+        purchase_ids = list(dict.fromkeys(purchase_ids))
+        if len(purchase_ids) > BULK_MAX_TRANSITIONS:
+            return jsonify({'error': f'At most {BULK_MAX_TRANSITIONS} purchases can be updated at once'}), 400
+        
+        updated_ids, errors = transition_purchases(purchase_ids, status)
+        db.session.commit()
+        
+        return jsonify({
+            'message': 'Purchase statuses updated',
+            'status': status,
+            'updated': updated_ids,
+            'rejected': [
+                {'purchase_id': purchase_id, 'error': error}
+                for purchase_id, error in errors.items()
+            ]
+        }), 200
+        
+    except StatusConflict as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 409
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -156,6 +415,7 @@ def update_purchase(purchase_id):
             return jsonify({'error': 'Purchase not found'}), 404
         
         data = request.get_json()
+        previous_status = purchase.status
         
         if 'payment_method' in data:
             purchase.payment_method = data['payment_method']
@@ -167,6 +427,7 @@ def update_purchase(purchase_id):
             purchase.notes = data['notes']
         
         purchase.updated_at = datetime.utcnow()
+        apply_status_change([purchase.id], previous_status, purchase.status)
         db.session.commit()
         
         return jsonify({
@@ -180,6 +441,7 @@ def update_purchase(purchase_id):
 
 @purchases_bp.route('/<int:purchase_id>/cancel', methods=['POST'])
 @jwt_required()
+@idempotent
 def cancel_purchase(purchase_id):
     try:
         user_id = get_jwt_identity()
@@ -193,18 +455,13 @@ def cancel_purchase(purchase_id):
         if user.role == UserRole.CUSTOMER and purchase.user_id != user_id:
             return jsonify({'error': 'Insufficient permissions'}), 403
         
-        if purchase.status == 'cancelled':
-            return jsonify({'error': 'Purchase is already cancelled'}), 400
-        
-        if purchase.status == 'completed':
-            return jsonify({'error': 'Cannot cancel completed purchase'}), 400
+        error = transition_error(purchase.status, 'cancelled')
+        if error:
+            return jsonify({'error': error}), 400
         
         # Restore inventory
-        for item in purchase.items:
-            inventory = Inventory.query.filter_by(product_id=item.product_id).first()
-            if inventory:
-                inventory.quantity_in_stock += item.quantity
-                inventory.updated_at = datetime.utcnow()
+        restore_stock([purchase.id])
+        apply_status_change([purchase.id], purchase.status, 'cancelled')
         
         purchase.status = 'cancelled'
         purchase.updated_at = datetime.utcnow()
@@ -0,0 +1,264 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from models import db, User, UserRole, Location, PurchaseOrder
+from datetime import date
+from utils.responses import listing_response
+from utils.idempotency import idempotent
+from services.replenishment import (
+    ORDER_STATUSES, ReplenishmentError, reorder_candidates, candidate_dict, draft_orders,
+    set_line_quantities, submit_order, receive_order, cancel_order
+)
+
+replenishment_bp = Blueprint('replenishment', __name__)
+
+def _is_staff():
+    user = User.query.get(get_jwt_identity())
+    return user is not None and user.role in [UserRole.STAFF, UserRole.ADMIN]
+
+def _supplier_ids(value):
+    """Optional list of supplier IDs from a query string or body; None means all."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = [part for part in value.split(',') if part.strip()]
+    try:
+        return [int(supplier_id) for supplier_id in value]
+    except (TypeError, ValueError):
+        raise ReplenishmentError('supplier_ids must be a list of supplier IDs')
+
+def _quantities(lines):
+    """``{product_id: quantity}`` from ``[{product_id, quantity}]`` request lines."""
+    if not isinstance(lines, list):
+        raise ReplenishmentError('Lines must be a list')
+    quantities = {}
+    for line in lines:
+        product_id = line.get('product_id') if isinstance(line, dict) else None
+        quantity = line.get('quantity') if isinstance(line, dict) else None
+        if not isinstance(product_id, int) or not isinstance(quantity, int) or quantity < 0:
+            raise ReplenishmentError('Product ID and a non-negative quantity are required for each line')
+        quantities[product_id] = quantity
+    return quantities
+
+@replenishment_bp.route('/suggestions', methods=['GET'])
+@jwt_required()
+def get_suggestions():
+    try:
+        if not _is_staff():
+            return jsonify({'error': 'Insufficient permissions'}), 403
+
+        try:
+            supplier_ids = _supplier_ids(request.args.get('supplier_ids'))
+        except ReplenishmentError as e:
+            return jsonify({'error': str(e)}), 400
+
+        suppliers = {}
+        for row in reorder_candidates(supplier_ids):
+            supplier = suppliers.setdefault(row.supplier_id, {
+                'supplier_id': row.supplier_id,
+                'lines': [],
+                'total_cost': 0
+            })
+            line = candidate_dict(row)
+            supplier['lines'].append(line)
+            supplier['total_cost'] += line['line_total']
+
+        return jsonify({
+            'suppliers': list(suppliers.values()),
+            'total_products': sum(len(supplier['lines']) for supplier in suppliers.values())
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@replenishment_bp.route('/plan', methods=['POST'])
+@jwt_required()
+@idempotent
+def create_plan():
+    """Draft one purchase order per supplier for everything under its reorder point."""
+    try:
+        if not _is_staff():
+            return jsonify({'error': 'Insufficient permissions'}), 403
+
+        data = request.get_json(silent=True) or {}
+
+        try:
+            supplier_ids = _supplier_ids(data.get('supplier_ids'))
+        except ReplenishmentError as e:
+            return jsonify({'error': str(e)}), 400
+
+        location_id = data.get('location_id')
+        if location_id is not None and not Location.query.filter_by(id=location_id, is_active=True).first():
+            return jsonify({'error': 'Location not found'}), 404
+
+        orders = draft_orders(
+            reorder_candidates(supplier_ids),
+            user_id=get_jwt_identity(),
+            location_id=location_id,
+            notes=data.get('notes')
+        )
+        db.session.commit()
+
+        return jsonify({
+            'message': f'{len(orders)} draft purchase orders created',
+            'orders': [order.to_dict() for order in orders]
+        }), 201
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@replenishment_bp.route('/orders', methods=['GET'])
+@jwt_required()
+def get_orders():
+    try:
+        if not _is_staff():
+            return jsonify({'error': 'Insufficient permissions'}), 403
+
+        page = request.args.get('page', 1, type=int)
+        per_page = request.args.get('per_page', 20, type=int)
+        status = request.args.get('status')
+        supplier_id = request.args.get('supplier_id', type=int)
+
+        if status and status not in ORDER_STATUSES:
+            return jsonify({'error': f'Status must be one of: {", ".join(ORDER_STATUSES)}'}), 400
+
+        query = PurchaseOrder.query
+        if status:
+            query = query.filter(PurchaseOrder.status == status)
+        if supplier_id:
+            query = query.filter(PurchaseOrder.supplier_id == supplier_id)
+
+        orders = query.order_by(PurchaseOrder.created_at.desc(), PurchaseOrder.id.desc()).paginate(
+            page=page, per_page=per_page, error_out=False
+        )
+
+        return listing_response({
+            'orders': [order.to_dict() for order in orders.items],
+            'total': orders.total,
+            'pages': orders.pages,
+            'current_page': page,
+            'per_page': per_page
+        }, 'orders')
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@replenishment_bp.route('/orders/<int:order_id>', methods=['GET'])
+@jwt_required()
+def get_order(order_id):
+    try:
+        if not _is_staff():
+            return jsonify({'error': 'Insufficient permissions'}), 403
+
+        order = PurchaseOrder.query.get(order_id)
+        if not order:
+            return jsonify({'error': 'Purchase order not found'}), 404
+
+        return jsonify({'order': order.to_dict(include_lines=True)}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@replenishment_bp.route('/orders/<int:order_id>', methods=['PUT'])
+@jwt_required()
+def update_order(order_id):
+    try:
+        if not _is_staff():
+            return jsonify({'error': 'Insufficient permissions'}), 403
+
+        order = PurchaseOrder.query.get(order_id)
+        if not order:
+            return jsonify({'error': 'Purchase order not found'}), 404
+
+        data = request.get_json() or {}
+
+        try:
+            if 'lines' in data:
+                set_line_quantities(order, _quantities(data['lines']))
+        except ReplenishmentError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
+
+        if 'notes' in data:
+            order.notes = data['notes']
+        if 'expected_delivery' in data:
+            try:
+                order.expected_delivery = date.fromisoformat(data['expected_delivery']) if data['expected_delivery'] else None
+            except (TypeError, ValueError):
+                db.session.rollback()
+                return jsonify({'error': 'expected_delivery must be a YYYY-MM-DD date'}), 400
+
+        db.session.commit()
+
+        return jsonify({
+            'message': 'Purchase order updated successfully',
+            'order': order.to_dict(include_lines=True)
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+def _change_status(order_id, change, message):
+    if not _is_staff():
+        return jsonify({'error': 'Insufficient permissions'}), 403
+
+    order = PurchaseOrder.query.get(order_id)
+    if not order:
+        return jsonify({'error': 'Purchase order not found'}), 404
+
+    try:
+        change(order)
+    except ReplenishmentError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+
+    db.session.commit()
+
+    return jsonify({
+        'message': message,
+        'order': order.to_dict(include_lines=True)
+    }), 200
+
+@replenishment_bp.route('/orders/<int:order_id>/submit', methods=['POST'])
+@jwt_required()
+def submit_purchase_order(order_id):
+    try:
+        return _change_status(order_id, submit_order, 'Purchase order submitted successfully')
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@replenishment_bp.route('/orders/<int:order_id>/receive', methods=['POST'])
+@jwt_required()
+@idempotent
+def receive_purchase_order(order_id):
+    """Restock every line of an order in one transaction."""
+    try:
+        data = request.get_json(silent=True) or {}
+
+        try:
+            received = _quantities(data['lines']) if 'lines' in data else None
+        except ReplenishmentError as e:
+            return jsonify({'error': str(e)}), 400
+
+        return _change_status(
+            order_id,
+            lambda order: receive_order(order, get_jwt_identity(), received),
+            'Purchase order received successfully'
+        )
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@replenishment_bp.route('/orders/<int:order_id>/cancel', methods=['POST'])
+@jwt_required()
+def cancel_purchase_order(order_id):
+    try:
+        return _change_status(order_id, cancel_order, 'Purchase order cancelled successfully')
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
@@ -3,9 +3,50 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import db, Purchase, PurchaseItem, Product, Inventory, User, UserRole
 from datetime import datetime, timedelta
 from sqlalchemy import func, desc, and_
+from utils.responses import listing_response
+from services.repricing import category_descendants
+from services.sales_rollups import PERIODS, RANKING_METRICS, period_start, top_products, top_categories
+from services.inventory_analytics import (
+    DEFAULT_PERIOD_DAYS, DEFAULT_DEAD_STOCK_DAYS, MAX_DAYS, ABC_CLASSES, ANALYTICS_SORTS,
+    inventory_analytics, summarize, select_rows, product_rows
+)
 
 reports_bp = Blueprint('reports', __name__)
 
+# Largest leaderboard a ranking endpoint returns
+RANKING_MAX_LIMIT = 100
+
+def _ranking_params():
+    """Period, dates, metric and limit shared by the ranking endpoints."""
+    period = request.args.get('period', 'month')
+    if period not in PERIODS:
+        raise ValueError(f'period must be one of: {", ".join(PERIODS)}')
+    
+    metric = request.args.get('metric', 'quantity')
+    if metric not in RANKING_METRICS:
+        raise ValueError(f'metric must be one of: {", ".join(RANKING_METRICS)}')
+    
+    # Default to last 30 days if no dates provided
+    end = datetime.strptime(request.args['end_date'], '%Y-%m-%d').date() \
+        if request.args.get('end_date') else datetime.utcnow().date()
+    start = datetime.strptime(request.args['start_date'], '%Y-%m-%d').date() \
+        if request.args.get('start_date') else end - timedelta(days=30)
+    if start > end:
+        raise ValueError('start_date must not be after end_date')
+    
+    limit = min(max(request.args.get('limit', 10, type=int), 1), RANKING_MAX_LIMIT)
+    return period, start, end, metric, limit
+
+def _ranking_period(period, start, end):
+    # Rollups hold whole weeks or months, so the range is widened to cover them
+    last = period_start(end, period)
+    last_end = last + timedelta(days=6) if period == 'week' else (last + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    return {
+        'period': period,
+        'start_date': period_start(start, period).isoformat(),
+        'end_date': last_end.isoformat()
+    }
+
 @reports_bp.route('/sales', methods=['GET'])
 @jwt_required()
 def get_sales_report():
@@ -64,7 +105,7 @@ def get_sales_report():
             desc('total_quantity')
         ).limit(10).all()
         
-        return jsonify({
+        return listing_response({
             'period': {
                 'start_date': start_date,
                 'end_date': end_date
@@ -89,7 +130,87 @@ def get_sales_report():
                     'total_revenue': float(product.total_revenue)
                 } for product in top_products
             ]
-        }), 200
+        }, 'daily_sales', 'top_products')
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@reports_bp.route('/top-products', methods=['GET'])
+@jwt_required()
+def get_top_products():
+    try:
+        user_id = get_jwt_identity()
+        user = User.query.get(user_id)
+        
+        if not user or user.role not in [UserRole.STAFF, UserRole.ADMIN]:
+            return jsonify({'error': 'Insufficient permissions'}), 403
+        
+        try:
+            period, start, end, metric, limit = _ranking_params()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        category_id = request.args.get('category_id', type=int)
+        category_ids = None
+        if category_id is not None:
+            category_ids = list(db.session.execute(category_descendants([category_id])).scalars())
+        
+        rows = top_products(
+            period, start, end, metric, limit,
+            category_ids=category_ids,
+            brand=request.args.get('brand')
+        )
+        
+        return listing_response({
+            'period': _ranking_period(period, start, end),
+            'metric': metric,
+            'top_products': [
+                {
+                    'product_id': row.id,
+                    'name': row.name,
+                    'sku': row.sku,
+                    'brand': row.brand,
+                    'category_id': row.category_id,
+                    'total_quantity': row.total_quantity,
+                    'total_revenue': float(row.total_revenue),
+                    'total_profit': float(row.total_profit)
+                } for row in rows
+            ]
+        }, 'top_products')
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@reports_bp.route('/top-categories', methods=['GET'])
+@jwt_required()
+def get_top_categories():
+    try:
+        user_id = get_jwt_identity()
+        user = User.query.get(user_id)
+        
+        if not user or user.role not in [UserRole.STAFF, UserRole.ADMIN]:
+            return jsonify({'error': 'Insufficient permissions'}), 403
+        
+        try:
+            period, start, end, metric, limit = _ranking_params()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        rows = top_categories(period, start, end, metric, limit)
+        
+        return listing_response({
+            'period': _ranking_period(period, start, end),
+            'metric': metric,
+            'top_categories': [
+                {
+                    'category_id': row.id,
+                    'name': row.name,
+                    'total_quantity': row.total_quantity,
+                    'total_revenue': float(row.total_revenue),
+                    'total_profit': float(row.total_profit)
+                } for row in rows
+            ]
+        }, 'top_categories')
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -133,7 +254,7 @@ def get_inventory_report():
             )
         ).all()
         
-        return jsonify({
+        return listing_response({
             'summary': {
                 'total_products': total_products,
                 'low_stock_count': low_stock_count,
@@ -141,7 +262,60 @@ def get_inventory_report():
                 'total_inventory_value': float(inventory_value)
             },
             'low_stock_items': [item.to_dict() for item in low_stock_items]
-        }), 200
+        }, 'low_stock_items')
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@reports_bp.route('/inventory-analytics', methods=['GET'])
+@jwt_required()
+def get_inventory_analytics():
+    """Turnover, days of supply, sell-through, ABC class and dead stock per product."""
+    try:
+        user_id = get_jwt_identity()
+        user = User.query.get(user_id)
+        
+        if not user or user.role not in [UserRole.STAFF, UserRole.ADMIN]:
+            return jsonify({'error': 'Insufficient permissions'}), 403
+        
+        period_days = request.args.get('period_days', DEFAULT_PERIOD_DAYS, type=int)
+        dead_stock_days = request.args.get('dead_stock_days', DEFAULT_DEAD_STOCK_DAYS, type=int)
+        abc_class = request.args.get('abc_class')
+        dead_only = request.args.get('dead_stock_only', 'false').lower() == 'true'
+        sort_by = request.args.get('sort_by', 'revenue')
+        sort_order = request.args.get('sort_order', 'desc')
+        page = request.args.get('page', 1, type=int)
+        per_page = request.args.get('per_page', 50, type=int)
+        
+        if not 1 <= period_days <= MAX_DAYS or not 1 <= dead_stock_days <= MAX_DAYS:
+            return jsonify({'error': f'period_days and dead_stock_days must be between 1 and {MAX_DAYS}'}), 400
+        if abc_class is not None and abc_class not in ABC_CLASSES:
+            return jsonify({'error': f'abc_class must be one of: {", ".join(ABC_CLASSES)}'}), 400
+        if sort_by not in ANALYTICS_SORTS:
+            return jsonify({'error': f'sort_by must be one of: {", ".join(ANALYTICS_SORTS)}'}), 400
+        
+        # Computed once per day; refresh=true recomputes now
+        analytics = inventory_analytics(
+            period_days, dead_stock_days,
+            refresh=request.args.get('refresh', 'false').lower() == 'true'
+        )
+        
+        positions = select_rows(analytics, abc_class, dead_only, sort_by, sort_order != 'asc')
+        total = len(positions)
+        page = max(page, 1)
+        per_page = max(per_page, 1)
+        
+        return listing_response({
+            'computed_at': analytics['computed_at'].isoformat(),
+            'period_days': period_days,
+            'dead_stock_days': dead_stock_days,
+            'summary': summarize(analytics),
+            'products': product_rows(analytics, positions[(page - 1) * per_page:page * per_page]),
+            'total': total,
+            'pages': (total + per_page - 1) // per_page,
+            'current_page': page,
+            'per_page': per_page
+        }, 'products')
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -169,20 +343,25 @@ def get_profit_report():
         start_datetime = datetime.strptime(start_date, '%Y-%m-%d')
         end_datetime = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)
         
-        # Calculate profit for completed purchases
+        # Costs and discounts are recorded on each item at the time of sale
+        # (older items are costed by a migration), so purchase_items is read
+        # without products
+        line_cost = PurchaseItem.quantity * PurchaseItem.unit_cost
         profit_data = db.session.query(
-            func.sum(PurchaseItem.quantity * (Product.selling_price - Product.cost_price)).label('total_profit'),
-            func.sum(PurchaseItem.quantity * Product.selling_price).label('total_revenue'),
-            func.sum(PurchaseItem.quantity * Product.cost_price).label('total_cost')
-        ).join(Product).join(Purchase).filter(
+            func.sum(PurchaseItem.total_price).label('total_revenue'),
+            func.sum(line_cost).label('total_cost'),
+            func.sum(PurchaseItem.total_price - line_cost).label('total_profit'),
+            func.sum(PurchaseItem.discount_amount).label('total_discount'),
+            func.count(PurchaseItem.id).filter(PurchaseItem.unit_cost.is_(None)).label('items_without_cost')
+        ).join(Purchase).filter(
             Purchase.created_at >= start_datetime,
             Purchase.created_at < end_datetime,
             Purchase.status == 'completed'
         ).first()
         
-        total_profit = profit_data.total_profit or 0
         total_revenue = profit_data.total_revenue or 0
         total_cost = profit_data.total_cost or 0
+        total_profit = profit_data.total_profit or 0
         
         profit_margin = (total_profit / total_revenue * 100) if total_revenue > 0 else 0
         
@@ -195,7 +374,10 @@ def get_profit_report():
                 'total_revenue': float(total_revenue),
                 'total_cost': float(total_cost),
                 'total_profit': float(total_profit),
-                'profit_margin': round(profit_margin, 2)
+                'total_discount': float(profit_data.total_discount or 0),
+                'profit_margin': round(profit_margin, 2),
+                # Items left without a cost by the migration (none unless a product is missing)
+                'items_without_cost': profit_data.items_without_cost
             }
         }), 200
         
@@ -0,0 +1,272 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from models import db, User, UserRole, Category, Location, StocktakeSession, StocktakeVariance
+from utils.idempotency import idempotent
+from services.stocktake import COUNT_MODES, record_counts, compute_variances, reconcile
+from services.stock import default_location_id
+import csv
+import io
+import json
+
+stocktakes_bp = Blueprint('stocktakes', __name__)
+
+def _is_staff():
+    user = User.query.get(get_jwt_identity())
+    return user is not None and user.role in [UserRole.STAFF, UserRole.ADMIN]
+
+def _read_counts():
+    """Rows from a CSV/NDJSON/JSON upload or body, read lazily where possible."""
+    upload = request.files.get('file')
+    if upload:
+        stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig')
+        mimetype = upload.mimetype
+        if upload.filename.lower().endswith('.ndjson'):
+            mimetype = 'application/x-ndjson'
+        elif upload.filename.lower().endswith('.json'):
+            mimetype = 'application/json'
+    else:
+        stream = io.TextIOWrapper(request.stream, encoding='utf-8-sig')
+        mimetype = request.mimetype
+
+    if mimetype == 'text/csv':
+        return csv.DictReader(stream)
+    if mimetype == 'application/x-ndjson':
+        # One scan per line, so a scanner can stream counts as they are taken
+        return (json.loads(line) for line in stream if line.strip())
+    if mimetype == 'application/json':
+        data = json.load(stream)
+        rows = data.get('counts') if isinstance(data, dict) else data
+        if not isinstance(rows, list):
+            raise ValueError('JSON uploads must be a list of counts')
+        return rows
+    raise ValueError('Upload counts as CSV, NDJSON or JSON')
+
+@stocktakes_bp.route('/', methods=['GET'])
+@jwt_required()
+def get_stocktakes():
+    try:
+        if not _is_staff():
+            return jsonify({'error': 'Insufficient permissions'}), 403
+
+        page = request.args.get('page', 1, type=int)
+        per_page = request.args.get('per_page', 20, type=int)
+        status = request.args.get('status')
+
+        query = StocktakeSession.query
+        if status:
+            query = query.filter(StocktakeSession.status == status)
+
+        sessions = query.order_by(StocktakeSession.created_at.desc()).paginate(
+            page=page, per_page=per_page, error_out=False
+        )
+
+        return jsonify({
+            'stocktakes': [session.to_dict() for session in sessions.items],
+            'total': sessions.total,
+            'pages': sessions.pages,
+            'current_page': page,
+            'per_page': per_page
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@stocktakes_bp.route('/', methods=['POST'])
+@jwt_required()
+@idempotent
+def create_stocktake():
+    try:
+        if not _is_staff():
+            return jsonify({'error': 'Insufficient permissions'}), 403
+
+        data = request.get_json()
+
+        if not data or not data.get('name'):
+            return jsonify({'error': 'Name is required'}), 400
+
+        category_id = data.get('category_id')
+        if category_id is not None and not Category.query.get(category_id):
+            return jsonify({'error': 'Category not found'}), 404
+
+        location_id = data.get('location_id')
+        if location_id is None:
+            location_id = default_location_id()
+        elif not Location.query.filter_by(id=location_id, is_active=True).first():
+            return jsonify({'error': 'Location not found'}), 404
+
+        session = StocktakeSession(
+            name=data['name'],
+            notes=data.get('notes'),
+            location_id=location_id,
+            category_id=category_id,
+            zero_uncounted=bool(data.get('zero_uncounted', False)),
+            created_by=get_jwt_identity()
+        )
+
+        db.session.add(session)
+        db.session.commit()
+
+        return jsonify({
+            'message': 'Stocktake opened successfully',
+            'stocktake': session.to_dict()
+        }), 201
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@stocktakes_bp.route('/<int:session_id>', methods=['GET'])
+@jwt_required()
+def get_stocktake(session_id):
+    try:
+        if not _is_staff():
+            return jsonify({'error': 'Insufficient permissions'}), 403
+
+        session = StocktakeSession.query.get(session_id)
+        if not session:
+            return jsonify({'error': 'Stocktake not found'}), 404
+
+        return jsonify({'stocktake': session.to_dict()}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@stocktakes_bp.route('/<int:session_id>/counts', methods=['POST'])
+@jwt_required()
+def upload_counts(session_id):
+    try:
+        if not _is_staff():
+            return jsonify({'error': 'Insufficient permissions'}), 403
+
+        session = StocktakeSession.query.get(session_id)
+        if not session:
+            return jsonify({'error': 'Stocktake not found'}), 404
+
+        if session.status != 'open':
+            return jsonify({'error': 'Stocktake is not open'}), 400
+
+        mode = request.args.get('mode', 'add')
+        if mode not in COUNT_MODES:
+            return jsonify({'error': 'mode must be add or set'}), 400
+
+        summary = record_counts(session, _read_counts(), mode=mode)
+        db.session.commit()
+
+        return jsonify({
+            'message': 'Counts recorded',
+            **summary
+        }), 200
+
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        db.session.rollback()
+        return jsonify({'error': f'Could not read counts: {e}'}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@stocktakes_bp.route('/<int:session_id>/variances', methods=['POST'])
+@jwt_required()
+def calculate_variances(session_id):
+    try:
+        if not _is_staff():
+            return jsonify({'error': 'Insufficient permissions'}), 403
+
+        session = StocktakeSession.query.get(session_id)
+        if not session:
+            return jsonify({'error': 'Stocktake not found'}), 404
+
+        if session.status != 'open':
+            return jsonify({'error': 'Variances of a closed stocktake cannot be recalculated'}), 400
+
+        compute_variances(session)
+        db.session.commit()
+
+        return jsonify({'stocktake': session.to_dict()}), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@stocktakes_bp.route('/<int:session_id>/variances', methods=['GET'])
+@jwt_required()
+def get_variances(session_id):
+    try:
+        if not _is_staff():
+            return jsonify({'error': 'Insufficient permissions'}), 403
+
+        session = StocktakeSession.query.get(session_id)
+        if not session:
+            return jsonify({'error': 'Stocktake not found'}), 404
+
+        page = request.args.get('page', 1, type=int)
+        per_page = request.args.get('per_page', 100, type=int)
+
+        # Largest losses first
+        variances = StocktakeVariance.query.filter_by(session_id=session_id).order_by(
+            StocktakeVariance.variance_value.asc(), StocktakeVariance.product_id
+        ).paginate(page=page, per_page=per_page, error_out=False)
+
+        return jsonify({
+            'stocktake': session.to_dict(),
+            'variances': [variance.to_dict() for variance in variances.items],
+            'total': variances.total,
+            'pages': variances.pages,
+            'current_page': page,
+            'per_page': per_page
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@stocktakes_bp.route('/<int:session_id>/reconcile', methods=['POST'])
+@jwt_required()
+@idempotent
+def reconcile_stocktake(session_id):
+    try:
+        if not _is_staff():
+            return jsonify({'error': 'Insufficient permissions'}), 403
+
+        session = StocktakeSession.query.get(session_id)
+        if not session:
+            return jsonify({'error': 'Stocktake not found'}), 404
+
+        if session.status != 'open':
+            return jsonify({'error': 'Stocktake is not open'}), 400
+
+        reconcile(session, get_jwt_identity())
+        db.session.commit()
+
+        return jsonify({
+            'message': 'Stocktake reconciled successfully',
+            'stocktake': session.to_dict()
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@stocktakes_bp.route('/<int:session_id>/cancel', methods=['POST'])
+@jwt_required()
+def cancel_stocktake(session_id):
+    try:
+        if not _is_staff():
+            return jsonify({'error': 'Insufficient permissions'}), 403
+
+        session = StocktakeSession.query.get(session_id)
+        if not session:
+            return jsonify({'error': 'Stocktake not found'}), 404
+
+        if session.status != 'open':
+            return jsonify({'error': 'Stocktake is not open'}), 400
+
+        session.status = 'cancelled'
+        db.session.commit()
+
+        return jsonify({
+            'message': 'Stocktake cancelled successfully',
+            'stocktake': session.to_dict()
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
@@ -2,6 +2,8 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import db, Supplier, User, UserRole
 from datetime import datetime
+from utils.cache import invalidate_catalog
+from utils.idempotency import idempotent
 
 suppliers_bp = Blueprint('suppliers', __name__)
 
@@ -41,6 +43,7 @@ def get_supplier(supplier_id):
 
 @suppliers_bp.route('/', methods=['POST'])
 @jwt_required()
+@idempotent
 def create_supplier():
     try:
         user_id = get_jwt_identity()
@@ -111,6 +114,7 @@ def update_supplier(supplier_id):
         
         supplier.updated_at = datetime.utcnow()
         db.session.commit()
+        invalidate_catalog()
         
         return jsonify({
             'message': 'Supplier updated successfully',
@@ -142,6 +146,7 @@ def delete_supplier(supplier_id):
         supplier.is_active = False
         supplier.updated_at = datetime.utcnow()
         db.session.commit()
+        invalidate_catalog()
         
         return jsonify({'message': 'Supplier deleted successfully'}), 200
         
@@ -15,7 +15,13 @@ from werkzeug.security import generate_password_hash
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from app import app, db
+from flask_migrate import upgrade
 from models import User, Product, Category, Supplier, Purchase, PurchaseItem, Inventory, UserRole
+from services.stock import ensure_default_location
+from services.sales_rollups import rebuild_sales_rollups
+from services.recommendations import rebuild_associations
+from services.customer_segments import refresh_customer_segments
+from services.product_styles import group_ungrouped_products
 
 def create_sample_data():
     """Create sample data for the fitness wear shop"""
@@ -30,6 +36,7 @@ def create_sample_data():
         # Create tables if they don't exist
         print("Creating database tables...")
         db.create_all()
+        upgrade()  # Record the schema as current so later migrations start from here
         
         # Create categories
         print("Creating categories...")
@@ -381,6 +388,9 @@ def create_sample_data():
             )
             db.session.add(inventory)
         
+        # Place all initial stock at the default location
+        db.session.flush()
+        ensure_default_location()
         db.session.commit()
         
         # Create sample purchases
@@ -419,6 +429,8 @@ def create_sample_data():
                     product_id=product.id,
                     quantity=quantity,
                     unit_price=unit_price,
+                    unit_cost=product.cost_price,
+                    discount_amount=Decimal("0.00"),
                     total_price=total_price
                 )
                 db.session.add(purchase_item)
@@ -427,6 +439,12 @@ def create_sample_data():
             purchase.total_amount = total_amount
             db.session.commit()
         
+        group_ungrouped_products()
+        rebuild_sales_rollups()
+        rebuild_associations()
+        refresh_customer_segments(full=True)
+        db.session.commit()
+        
         print("Sample data created successfully!")
         print(f"Created {len(categories)} categories")
         print(f"Created {len(suppliers)} suppliers")
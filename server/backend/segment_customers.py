@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Customer segmentation script for Fitness Wear Shop Management System
+This script scores every customer on recency, frequency and monetary value
+(RFM) of their completed purchases and assigns each one a segment. Only
+customers whose purchases changed since the last run are re-aggregated;
+use --full to aggregate everyone again.
+"""
+
+import os
+import sys
+import argparse
+import time
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, db
+from services.customer_segments import refresh_customer_segments, segment_summary
+
+def main():
+    parser = argparse.ArgumentParser(description='Refresh customer RFM segments')
+    parser.add_argument('--full', action='store_true', help='re-aggregate every customer from purchase history')
+    args = parser.parse_args()
+
+    with app.app_context():
+        started = time.perf_counter()
+        summary = refresh_customer_segments(full=args.full)
+        db.session.commit()
+        print(f"Aggregated {summary['customers_aggregated']} customers, "
+              f"{summary['segments_changed']} scores changed in {time.perf_counter() - started:.2f}s")
+        for segment in segment_summary():
+            print(f"  {segment['segment']}: {segment['customers']} customers, ${segment['monetary']:.2f}")
+
+if __name__ == "__main__":
+    main()
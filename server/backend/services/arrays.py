@@ -0,0 +1,31 @@
+from models import db
+from sqlalchemy import select, func
+import numpy as np
+
+# Joins text values on SQLite; the ASCII unit separator does not occur in catalog text
+TEXT_SEPARATOR = '\x1f'
+
+def _parse(value, dtype):
+    if dtype is str:
+        return np.array(value.split(TEXT_SEPARATOR) if value is not None else [], dtype=str)
+    return np.fromstring(value, sep=',', dtype=dtype) if value else np.array([], dtype=dtype)
+
+def fetch_columns(statement, dtypes):
+    """Read the columns of ``statement`` as numpy arrays, one per dtype.
+
+    On SQLite each column comes back as one ``group_concat`` string parsed
+    by numpy, which is many times faster than building a Python row per
+    record; other databases fetch the rows. A dtype of ``str`` reads a text
+    column. ``group_concat`` skips NULLs, so nullable columns must be
+    coalesced in ``statement``, and row order is not guaranteed.
+    """
+    subquery = statement.subquery()
+    columns = list(subquery.c)
+    if db.engine.dialect.name == 'sqlite':
+        values = db.session.execute(select(*[
+            func.group_concat(column, TEXT_SEPARATOR) if dtype is str else func.group_concat(column)
+            for column, dtype in zip(columns, dtypes)
+        ])).one()
+        return [_parse(value, dtype) for value, dtype in zip(values, dtypes)]
+    rows = db.session.execute(select(*columns)).all()
+    return [np.array([row[index] for row in rows], dtype=dtype) for index, dtype in enumerate(dtypes)]
@@ -0,0 +1,236 @@
+from models import db, User, UserRole, Purchase, CustomerSegment
+from sqlalchemy import select, insert, delete, func, bindparam, or_, union
+from datetime import datetime, timedelta
+from services.arrays import fetch_columns
+from services.jobs import job_state
+from services.sales_rollups import SALE_STATUS
+import numpy as np
+
+JOB_NAME = 'customer_segments'
+
+# Changes this long before the previous run started are read again, so
+# transactions still open while it ran are not missed
+CHANGE_OVERLAP = timedelta(minutes=5)
+
+# Recency, frequency and monetary scores run from 1 to this (quintiles)
+SCORE_LEVELS = 5
+
+# Checked in order; a customer gets the first segment whose rule matches
+SEGMENTS = ['champions', 'loyal', 'new', 'promising', 'at_risk', 'hibernating', 'lost']
+
+def _aggregate(user_ids=None):
+    """Frequency, monetary value and first/last purchase per customer, in one grouped query.
+
+    ``user_ids`` is an optional select limiting the customers read.
+    """
+    statement = (
+        select(
+            Purchase.user_id,
+            func.count(Purchase.id),
+            func.sum(Purchase.total_amount),
+            func.min(Purchase.created_at),
+            func.max(Purchase.created_at)
+        )
+        .join(User, Purchase.user_id == User.id)
+        .where(Purchase.status == SALE_STATUS, User.role == UserRole.CUSTOMER)
+        .group_by(Purchase.user_id)
+    )
+    if user_ids is not None:
+        statement = statement.where(Purchase.user_id.in_(user_ids))
+    return db.session.execute(statement).all()
+
+def _store_aggregates(rows, user_ids=None):
+    """Write aggregates for the customers in ``user_ids`` (default: all of them).
+
+    Existing rows are updated with one executemany ``UPDATE``, new
+    customers inserted in one batch (scored right after) and rows of
+    customers left without completed purchases deleted.
+    """
+    table = CustomerSegment.__table__
+    statement = select(table.c.user_id, table.c.id)
+    if user_ids is not None:
+        statement = statement.where(table.c.user_id.in_(user_ids))
+    existing = dict(db.session.execute(statement).all())
+
+    now = datetime.utcnow()
+    updates = []
+    inserts = []
+    for user_id, frequency, monetary, first_purchase_at, last_purchase_at in rows:
+        values = {
+            'first_purchase_at': first_purchase_at,
+            'last_purchase_at': last_purchase_at,
+            'frequency': frequency,
+            'monetary': monetary,
+        }
+        row_id = existing.pop(user_id, None)
+        if row_id is not None:
+            updates.append({
+                'row_id': row_id,
+                'first': first_purchase_at,
+                'last': last_purchase_at,
+                'count': frequency,
+                'total': monetary,
+            })
+        else:
+            inserts.append(dict(
+                values, user_id=user_id, recency_score=0, frequency_score=0, monetary_score=0,
+                segment='', scored_at=now
+            ))
+
+    if updates:
+        db.session.execute(
+            table.update().where(table.c.id == bindparam('row_id')).values(
+                first_purchase_at=bindparam('first'),
+                last_purchase_at=bindparam('last'),
+                frequency=bindparam('count'),
+                monetary=bindparam('total')
+            ),
+            updates
+        )
+    if inserts:
+        db.session.execute(insert(table), inserts)
+    if existing:
+        db.session.execute(delete(table).where(table.c.id.in_(list(existing.values()))))
+    return len(updates) + len(inserts)
+
+def _quintiles(values):
+    """Score each value 1..SCORE_LEVELS by the share of customers with a strictly lower one.
+
+    Equal values always share a score, so the many customers with a single
+    purchase all get the lowest frequency score.
+    """
+    below = np.searchsorted(np.sort(values), values, side='left')
+    return 1 + below * SCORE_LEVELS // len(values)
+
+def segment_names(recency, frequency, monetary):
+    """Segment of each customer from their 1-5 scores, per the rules in ``SEGMENTS`` order."""
+    return np.select(
+        [
+            (recency >= 4) & (frequency >= 4) & (monetary >= 4),  # champions
+            (recency >= 3) & (frequency >= 3),                    # loyal
+            (recency >= 4) & (frequency <= 2),                    # new
+            recency >= 3,                                         # promising
+            frequency >= 3,                                       # at_risk: used to buy often, not lately
+            recency == 2,                                         # hibernating
+        ],
+        SEGMENTS[:-1],
+        default=SEGMENTS[-1]
+    )
+
+def _score(now):
+    """Re-score every stored customer from the compact table alone.
+
+    Recency is measured from today and quintiles move with the customer
+    base, so all rows are scored each run. Columns are read into arrays,
+    scored in numpy, and only rows whose scores or segment changed are
+    written back. Returns the number of rows changed.
+    """
+    row_ids, frequency, monetary, last_days, old_recency, old_frequency, old_monetary, old_segments = fetch_columns(
+        select(
+            CustomerSegment.id,
+            CustomerSegment.frequency,
+            CustomerSegment.monetary,
+            func.date(CustomerSegment.last_purchase_at),
+            CustomerSegment.recency_score,
+            CustomerSegment.frequency_score,
+            CustomerSegment.monetary_score,
+            CustomerSegment.segment
+        ),
+        [np.int64, np.int64, np.float64, str, np.int64, np.int64, np.int64, str]
+    )
+    if not len(row_ids):
+        return 0
+
+    days = (np.datetime64(now.date(), 'D') - last_days.astype('datetime64[D]')).astype(np.int64)
+    recency = _quintiles(-days)
+    frequency = _quintiles(frequency)
+    monetary = _quintiles(monetary)
+    segments = segment_names(recency, frequency, monetary)
+
+    changed = np.flatnonzero(
+        (recency != old_recency) | (frequency != old_frequency)
+        | (monetary != old_monetary) | (segments != old_segments)
+    )
+    if len(changed):
+        table = CustomerSegment.__table__
+        db.session.execute(
+            table.update().where(table.c.id == bindparam('row_id')).values(
+                recency_score=bindparam('r'),
+                frequency_score=bindparam('f'),
+                monetary_score=bindparam('m'),
+                segment=bindparam('name'),
+                scored_at=now
+            ),
+            [
+                {'row_id': row_id, 'r': r, 'f': f, 'm': m, 'name': name}
+                for row_id, r, f, m, name in zip(
+                    row_ids[changed].tolist(), recency[changed].tolist(), frequency[changed].tolist(),
+                    monetary[changed].tolist(), segments[changed].tolist()
+                )
+            ]
+        )
+    return len(changed)
+
+def refresh_customer_segments(full=False):
+    """Bring the RFM table up to date with purchases changed since the last run.
+
+    Only some customers are re-aggregated: those with a purchase added since
+    the last run (by ID, so offline sales synced with an old timestamp
+    count), those with a purchase updated since shortly before it
+    (cancellations and status changes), and users whose own row changed,
+    so a customer who became staff drops out and the reverse is added.
+    ``full=True`` (and the first run) aggregates every customer. Every
+    stored customer is then re-scored from the table itself. Returns a
+    summary dict; the caller commits.
+    """
+    state = job_state(JOB_NAME)
+    started = datetime.utcnow()
+    # Purchases added after this are left to the next run
+    newest_id = db.session.execute(select(func.max(Purchase.id))).scalar() or 0
+
+    if full or state.last_run_at is None:
+        db.session.execute(delete(CustomerSegment))
+        user_ids = None
+    else:
+        since = state.last_run_at - CHANGE_OVERLAP
+        user_ids = union(
+            select(Purchase.user_id).where(or_(Purchase.id > state.watermark, Purchase.updated_at >= since)),
+            select(User.id).where(User.updated_at >= since)
+        )
+
+    aggregated = _store_aggregates(_aggregate(user_ids), user_ids)
+    changed = _score(started)
+    for instance in list(db.session.identity_map.values()):
+        if isinstance(instance, CustomerSegment):
+            db.session.expire(instance)
+
+    state.last_run_at = started
+    state.watermark = newest_id
+    return {
+        'customers_aggregated': aggregated,
+        'segments_changed': changed,
+        'full': user_ids is None,
+    }
+
+def segment_summary():
+    """Customers, purchases and spend per segment, read from the RFM table."""
+    rows = db.session.execute(
+        select(
+            CustomerSegment.segment,
+            func.count(CustomerSegment.id),
+            func.sum(CustomerSegment.frequency),
+            func.sum(CustomerSegment.monetary)
+        ).group_by(CustomerSegment.segment)
+    ).all()
+    by_segment = {row[0]: row for row in rows}
+    summary = []
+    for name in SEGMENTS:
+        _, customers, purchases, spend = by_segment.get(name, (name, 0, 0, 0))
+        summary.append({
+            'segment': name,
+            'customers': customers,
+            'purchases': int(purchases or 0),
+            'monetary': round(float(spend or 0), 2),
+            'average_monetary': round(float(spend or 0) / customers, 2) if customers else 0,
+        })
+    return summary
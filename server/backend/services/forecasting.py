@@ -0,0 +1,225 @@
+from models import db, Product, Supplier, Purchase, PurchaseItem, Inventory
+from sqlalchemy import select, func, bindparam
+from datetime import datetime, timedelta
+from statistics import NormalDist
+from services.stock import sync_product_stock
+from services.arrays import fetch_columns
+import numpy as np
+
+FORECAST_METHODS = ['moving_average', 'exponential']
+
+# Days of sales history read for each run
+DEFAULT_HISTORY_DAYS = 730
+
+# Days averaged by the moving-average forecast
+DEFAULT_WINDOW_DAYS = 28
+
+# Smoothing factor of the exponential forecast; higher follows recent sales more closely
+DEFAULT_ALPHA = 0.1
+
+# Chance of not running out before the next delivery arrives
+DEFAULT_SERVICE_LEVEL = 0.95
+
+# Days of demand the maximum stock level holds beyond the reorder point
+DEFAULT_COVER_DAYS = 30
+
+# Days until the next delivery for each supplier delivery schedule
+LEAD_TIME_DAYS = {
+    'daily': 1,
+    'twice weekly': 4,
+    'weekly': 7,
+    'bi weekly': 14,
+    'biweekly': 14,
+    'fortnightly': 14,
+    'monthly': 30,
+}
+DEFAULT_LEAD_TIME_DAYS = 7
+
+class ForecastError(ValueError):
+    """Raised when forecast options are out of range."""
+
+def lead_time_days(delivery_schedule):
+    """Lead time in days for a supplier's free-text ``delivery_schedule``."""
+    if not delivery_schedule:
+        return DEFAULT_LEAD_TIME_DAYS
+    key = delivery_schedule.strip().lower().replace('-', ' ')
+    return LEAD_TIME_DAYS.get(key, DEFAULT_LEAD_TIME_DAYS)
+
+def _check_options(method, history_days, window_days, alpha, service_level, cover_days):
+    if method not in FORECAST_METHODS:
+        raise ForecastError(f'method must be one of: {", ".join(FORECAST_METHODS)}')
+    if not isinstance(history_days, int) or history_days < 1:
+        raise ForecastError('history_days must be a positive whole number')
+    if not isinstance(window_days, int) or not 1 <= window_days <= history_days:
+        raise ForecastError('window_days must be between 1 and history_days')
+    if not 0 < alpha < 1:
+        raise ForecastError('alpha must be between 0 and 1')
+    if not 0.5 <= service_level < 1:
+        raise ForecastError('service_level must be at least 0.5 and below 1')
+    if cover_days < 0:
+        raise ForecastError('cover_days cannot be negative')
+
+def parse_options(data):
+    """Validate forecast options from a request body; missing ones take the defaults."""
+    data = data or {}
+    if not isinstance(data, dict):
+        raise ForecastError('Options must be an object')
+    options = {
+        'method': data.get('method', 'exponential'),
+        'history_days': data.get('history_days', DEFAULT_HISTORY_DAYS),
+        'window_days': data.get('window_days', DEFAULT_WINDOW_DAYS),
+        'alpha': data.get('alpha', DEFAULT_ALPHA),
+        'service_level': data.get('service_level', DEFAULT_SERVICE_LEVEL),
+        'cover_days': data.get('cover_days', DEFAULT_COVER_DAYS),
+    }
+    for name in ['alpha', 'service_level', 'cover_days']:
+        if isinstance(options[name], bool) or not isinstance(options[name], (int, float)):
+            raise ForecastError(f'{name} must be a number')
+    _check_options(**options)
+    return options
+
+def _daily_sales(start, today):
+    """Units sold per product and day since ``start`` as parallel numpy arrays.
+
+    Returns ``(product_ids, ages, quantities)`` with one entry per product
+    and day that had sales; ``age`` is days before ``today``. Items are read
+    with their purchase's date in one joined query, so a purchase completed
+    while the forecast runs is either fully in or fully out, and are summed
+    per day in numpy.
+    """
+    dates, product_ids, quantities = fetch_columns(
+        select(func.date(Purchase.created_at), PurchaseItem.product_id, PurchaseItem.quantity)
+        .join(Purchase, PurchaseItem.purchase_id == Purchase.id)
+        .where(Purchase.status == 'completed', Purchase.created_at >= start),
+        [str, np.int64, np.int64]
+    )
+    if not quantities.size:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, empty
+    # Few distinct days, so only those are parsed as dates
+    days, day_index = np.unique(dates, return_inverse=True)
+    ages = (today - days.astype('datetime64[D]')).astype(np.int64)[day_index]
+
+    # One entry per (product, day)
+    span = int(ages.max()) + 1
+    keys, index = np.unique(product_ids * span + ages, return_inverse=True)
+    return keys // span, keys % span, np.bincount(index, weights=quantities).astype(np.float64)
+
+def forecast_reorder_points(method='exponential', history_days=DEFAULT_HISTORY_DAYS,
+                            window_days=DEFAULT_WINDOW_DAYS, alpha=DEFAULT_ALPHA,
+                            service_level=DEFAULT_SERVICE_LEVEL, cover_days=DEFAULT_COVER_DAYS):
+    """Forecast daily demand and suggest stock levels for every product that sold.
+
+    Item sales for the last ``history_days`` are read into numpy arrays and
+    summed per product and day. Each product's demand is the mean of its last
+    ``window_days`` (moving average) or an exponentially weighted mean over
+    the whole history, with days without sales counting as zero; demand
+    variability is the matching (weighted) standard deviation. Both are
+    computed for all products at once with ``np.bincount`` over the sparse
+    sales rows, so no products-by-days matrix is built.
+
+    The suggested minimum is the reorder point ``d*L + z*sigma*sqrt(L)`` for
+    the supplier's lead time ``L`` and the service level's ``z``; the
+    maximum adds ``cover_days`` of demand. Returns a dict of numpy arrays
+    keyed ``product_id``, ``daily_demand``, ``demand_std``,
+    ``lead_time_days``, ``minimum_stock_level`` and
+    ``maximum_stock_level``, sorted by product id. Products with no sales
+    in the history are left out.
+    """
+    _check_options(method, history_days, window_days, alpha, service_level, cover_days)
+
+    today = datetime.utcnow().date()
+    start = datetime.combine(today - timedelta(days=history_days - 1), datetime.min.time())
+    product_ids, age, quantities = _daily_sales(start, np.datetime64(today, 'D'))
+
+    products, index = np.unique(product_ids, return_inverse=True)
+
+    if method == 'moving_average':
+        weights = np.where(age < window_days, 1.0 / window_days, 0.0)
+    else:
+        # Weights alpha * (1 - alpha) ** age, scaled to sum to 1 over the history
+        decay = 1 - alpha
+        weights = alpha * decay ** age / (1 - decay ** history_days)
+
+    demand = np.bincount(index, weights=weights * quantities, minlength=len(products))
+    second_moment = np.bincount(index, weights=weights * quantities ** 2, minlength=len(products))
+    std = np.sqrt(np.maximum(second_moment - demand ** 2, 0))
+
+    # Lead time per product from its supplier's delivery schedule
+    catalog_ids, supplier_ids = fetch_columns(select(Product.id, Product.supplier_id), [np.int64, np.int64])
+    order = np.argsort(catalog_ids)
+    catalog_ids, supplier_ids = catalog_ids[order], supplier_ids[order]
+    supplier_lead = {
+        supplier_id: lead_time_days(schedule)
+        for supplier_id, schedule in db.session.execute(select(Supplier.id, Supplier.delivery_schedule))
+    }
+    lead_by_product = np.array(
+        [supplier_lead.get(supplier_id, DEFAULT_LEAD_TIME_DAYS) for supplier_id in supplier_ids.tolist()],
+        dtype=np.float64
+    )
+    lead = lead_by_product[np.searchsorted(catalog_ids, products)] if len(products) else np.array([], dtype=np.float64)
+
+    z = NormalDist().inv_cdf(service_level)
+    reorder_point = demand * lead + z * std * np.sqrt(lead)
+    minimum = np.ceil(reorder_point).astype(np.int64)
+    maximum = np.maximum(np.ceil(reorder_point + demand * cover_days).astype(np.int64), minimum)
+
+    return {
+        'product_id': products,
+        'daily_demand': demand,
+        'demand_std': std,
+        'lead_time_days': lead.astype(np.int64),
+        'minimum_stock_level': minimum,
+        'maximum_stock_level': maximum,
+    }
+
+def apply_reorder_points(forecast):
+    """Write a forecast's suggested levels to ``Inventory`` with one executemany UPDATE.
+
+    Stock statuses on products are refreshed afterwards, since they depend
+    on the minimum. Returns the number of inventory records updated; the
+    caller commits.
+    """
+    if not len(forecast['product_id']):
+        return 0
+
+    inventory = Inventory.__table__
+    now = datetime.utcnow()
+    result = db.session.execute(
+        inventory.update().where(inventory.c.product_id == bindparam('target_id')).values(
+            minimum_stock_level=bindparam('minimum'),
+            maximum_stock_level=bindparam('maximum'),
+            updated_at=now
+        ),
+        [
+            {'target_id': product_id, 'minimum': minimum, 'maximum': maximum}
+            for product_id, minimum, maximum in zip(
+                forecast['product_id'].tolist(),
+                forecast['minimum_stock_level'].tolist(),
+                forecast['maximum_stock_level'].tolist()
+            )
+        ]
+    )
+
+    sync_product_stock()
+    for instance in list(db.session.identity_map.values()):
+        if isinstance(instance, Inventory):
+            db.session.expire(instance, ['minimum_stock_level', 'maximum_stock_level', 'updated_at'])
+    return result.rowcount
+
+def forecast_rows(forecast, limit=None):
+    """Turn a forecast into per-product dicts, highest demand first."""
+    order = np.argsort(-forecast['daily_demand'], kind='stable')
+    if limit is not None:
+        order = order[:limit]
+    return [
+        {
+            'product_id': int(forecast['product_id'][position]),
+            'daily_demand': round(float(forecast['daily_demand'][position]), 3),
+            'demand_std': round(float(forecast['demand_std'][position]), 3),
+            'lead_time_days': int(forecast['lead_time_days'][position]),
+            'minimum_stock_level': int(forecast['minimum_stock_level'][position]),
+            'maximum_stock_level': int(forecast['maximum_stock_level'][position]),
+        }
+        for position in order.tolist()
+    ]
@@ -0,0 +1,216 @@
+from models import db, Product, Purchase, PurchaseItem
+from sqlalchemy import select, func
+from datetime import datetime, timedelta
+from services.arrays import fetch_columns
+import threading
+import numpy as np
+
+DEFAULT_PERIOD_DAYS = 90
+DEFAULT_DEAD_STOCK_DAYS = 90
+MAX_DAYS = 730
+
+# Cumulative revenue share that closes classes A and B; the rest is C
+ABC_THRESHOLDS = (0.80, 0.95)
+ABC_CLASSES = ['A', 'B', 'C']
+
+ANALYTICS_SORTS = [
+    'product_id', 'stock_quantity', 'inventory_value', 'units_sold', 'revenue',
+    'turnover', 'days_of_supply', 'sell_through', 'days_since_sale'
+]
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+def compute_inventory_analytics(period_days=DEFAULT_PERIOD_DAYS, dead_stock_days=DEFAULT_DEAD_STOCK_DAYS):
+    """Per-product inventory metrics for the whole active catalog as numpy arrays.
+
+    Product and sale columns are each read once into arrays; sales over the
+    longer of the two windows are reduced per product with ``np.bincount``
+    and every metric is then computed for all products at once:
+
+    * ``turnover``: cost of goods sold over the period, annualised, divided
+      by the current stock value at cost.
+    * ``days_of_supply``: stock divided by average daily units sold
+      (NaN when nothing sold).
+    * ``sell_through``: units sold as a percentage of units sold plus stock.
+    * ``abc_class``: A/B/C by cumulative share of period revenue.
+    * ``dead_stock``: in stock but not sold in ``dead_stock_days``.
+
+    Costs are the ones recorded at the time of sale, falling back to the
+    current cost price for sales not yet backfilled.
+    """
+    now = datetime.utcnow()
+    lookback = max(period_days, dead_stock_days)
+    start = datetime.combine(now.date() - timedelta(days=lookback - 1), datetime.min.time())
+    today = np.datetime64(now.date(), 'D')
+
+    product_ids, stock, cost, price = fetch_columns(
+        select(
+            Product.id,
+            func.coalesce(Product.stock_quantity, 0),
+            Product.cost_price,
+            Product.selling_price
+        ).where(Product.is_active == True),
+        [np.int64, np.int64, np.float64, np.float64]
+    )
+    order = np.argsort(product_ids)
+    product_ids, stock, cost, price = product_ids[order], stock[order], cost[order], price[order]
+    count = len(product_ids)
+
+    # Items with their purchase's date in one joined read, so both always agree
+    item_dates, item_products, quantities, revenues, unit_costs = fetch_columns(
+        select(
+            func.date(Purchase.created_at),
+            PurchaseItem.product_id,
+            PurchaseItem.quantity,
+            PurchaseItem.total_price,
+            func.coalesce(PurchaseItem.unit_cost, -1)
+        )
+        .join(Purchase, PurchaseItem.purchase_id == Purchase.id)
+        .where(Purchase.status == 'completed', Purchase.created_at >= start),
+        [str, np.int64, np.float64, np.float64, np.float64]
+    )
+    days, day_index = np.unique(item_dates, return_inverse=True)
+    item_ages = (today - days.astype('datetime64[D]')).astype(np.int64)[day_index]
+
+    # Line sales up with the catalog; items of inactive products drop out
+    positions = np.minimum(np.searchsorted(product_ids, item_products), max(count - 1, 0))
+    known = (product_ids[positions] == item_products) if count else np.zeros(len(item_products), dtype=bool)
+    positions = positions[known]
+    ages = item_ages[known]
+    quantities, revenues, unit_costs = quantities[known], revenues[known], unit_costs[known]
+    unit_costs = np.where(unit_costs < 0, cost[positions], unit_costs)
+
+    in_period = ages < period_days
+    units_sold = np.bincount(positions[in_period], weights=quantities[in_period], minlength=count)
+    revenue = np.bincount(positions[in_period], weights=revenues[in_period], minlength=count)
+    cogs = np.bincount(positions[in_period], weights=(quantities * unit_costs)[in_period], minlength=count)
+
+    # Days since the most recent sale in the lookback window; NaN if none
+    days_since_sale = np.full(count, np.nan)
+    if len(positions):
+        latest = np.full(count, np.iinfo(np.int64).max)
+        np.minimum.at(latest, positions, ages)
+        sold = latest != np.iinfo(np.int64).max
+        days_since_sale[sold] = latest[sold]
+
+    inventory_value = stock * cost
+    with np.errstate(divide='ignore', invalid='ignore'):
+        turnover = np.where(inventory_value > 0, cogs * (365 / period_days) / inventory_value, np.nan)
+        daily_units = units_sold / period_days
+        days_of_supply = np.where(daily_units > 0, stock / daily_units, np.nan)
+        sell_through = np.where(units_sold + stock > 0, units_sold / (units_sold + stock) * 100, np.nan)
+
+    # ABC by cumulative revenue share, largest sellers first
+    abc = np.full(count, 2, dtype=np.int8)
+    total_revenue = revenue.sum()
+    if total_revenue > 0:
+        ranked = np.argsort(-revenue, kind='stable')
+        share_before = (np.cumsum(revenue[ranked]) - revenue[ranked]) / total_revenue
+        classes = np.searchsorted(np.array(ABC_THRESHOLDS), share_before, side='right').astype(np.int8)
+        classes[revenue[ranked] <= 0] = 2
+        abc[ranked] = classes
+
+    dead_stock = (stock > 0) & ~(days_since_sale < dead_stock_days)
+
+    return {
+        'computed_at': now,
+        'period_days': period_days,
+        'dead_stock_days': dead_stock_days,
+        'product_id': product_ids,
+        'stock_quantity': stock,
+        'cost_price': cost,
+        'selling_price': price,
+        'inventory_value': inventory_value,
+        'units_sold': units_sold,
+        'revenue': revenue,
+        'cogs': cogs,
+        'turnover': turnover,
+        'days_of_supply': days_of_supply,
+        'sell_through': sell_through,
+        'days_since_sale': days_since_sale,
+        'abc_class': abc,
+        'dead_stock': dead_stock,
+    }
+
+def inventory_analytics(period_days=DEFAULT_PERIOD_DAYS, dead_stock_days=DEFAULT_DEAD_STOCK_DAYS, refresh=False):
+    """Analytics for today, computed at most once per day for each set of options."""
+    key = (datetime.utcnow().date(), period_days, dead_stock_days)
+    analytics = None if refresh else _cache.get(key)
+    if analytics is None:
+        analytics = compute_inventory_analytics(period_days, dead_stock_days)
+        with _cache_lock:
+            # Earlier days are never read again
+            for stale in [cached for cached in _cache if cached[0] != key[0]]:
+                del _cache[stale]
+            _cache[key] = analytics
+    return analytics
+
+def summarize(analytics):
+    abc = analytics['abc_class']
+    revenue = analytics['revenue']
+    total_revenue = float(revenue.sum())
+    dead = analytics['dead_stock']
+    return {
+        'products': int(len(analytics['product_id'])),
+        'inventory_value': round(float(analytics['inventory_value'].sum()), 2),
+        'units_sold': int(analytics['units_sold'].sum()),
+        'revenue': round(total_revenue, 2),
+        'cost_of_goods_sold': round(float(analytics['cogs'].sum()), 2),
+        'dead_stock_products': int(dead.sum()),
+        'dead_stock_value': round(float(analytics['inventory_value'][dead].sum()), 2),
+        'abc': {
+            name: {
+                'products': int((abc == index).sum()),
+                'revenue_share': round(float(revenue[abc == index].sum()) / total_revenue * 100, 2) if total_revenue else 0
+            }
+            for index, name in enumerate(ABC_CLASSES)
+        },
+    }
+
+def select_rows(analytics, abc_class=None, dead_only=False, sort_by='revenue', descending=True):
+    """Positions of the products matching the filters, in sort order (NaN last)."""
+    mask = np.ones(len(analytics['product_id']), dtype=bool)
+    if abc_class is not None:
+        mask &= analytics['abc_class'] == ABC_CLASSES.index(abc_class)
+    if dead_only:
+        mask &= analytics['dead_stock']
+
+    positions = np.flatnonzero(mask)
+    values = analytics[sort_by][positions].astype(np.float64)
+    keys = np.where(np.isnan(values), np.inf, -values if descending else values)
+    return positions[np.lexsort((analytics['product_id'][positions], keys))]
+
+def _number(value, digits=2):
+    return None if np.isnan(value) else round(float(value), digits)
+
+def product_rows(analytics, positions):
+    """Per-product records for ``positions``, with names and SKUs looked up for just those products."""
+    product_ids = analytics['product_id'][positions].tolist()
+    details = {
+        row.id: row for row in db.session.execute(
+            select(Product.id, Product.sku, Product.name, Product.brand, Product.category_id)
+            .where(Product.id.in_(product_ids))
+        )
+    }
+    rows = []
+    for position, product_id in zip(positions.tolist(), product_ids):
+        detail = details.get(product_id)
+        rows.append({
+            'product_id': product_id,
+            'sku': detail.sku if detail else None,
+            'name': detail.name if detail else None,
+            'brand': detail.brand if detail else None,
+            'category_id': detail.category_id if detail else None,
+            'stock_quantity': int(analytics['stock_quantity'][position]),
+            'inventory_value': round(float(analytics['inventory_value'][position]), 2),
+            'units_sold': int(analytics['units_sold'][position]),
+            'revenue': round(float(analytics['revenue'][position]), 2),
+            'turnover': _number(analytics['turnover'][position]),
+            'days_of_supply': _number(analytics['days_of_supply'][position], 1),
+            'sell_through': _number(analytics['sell_through'][position]),
+            'days_since_sale': None if np.isnan(analytics['days_since_sale'][position]) else int(analytics['days_since_sale'][position]),
+            'abc_class': ABC_CLASSES[analytics['abc_class'][position]],
+            'dead_stock': bool(analytics['dead_stock'][position]),
+        })
+    return rows
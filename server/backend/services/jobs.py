@@ -0,0 +1,14 @@
+from models import db, JobState
+
+def job_state(name):
+    """The ``JobState`` row of a batch job, created on its first run.
+
+    Jobs keep their progress here between runs, so each run only reads
+    what was added since the last one. The caller commits.
+    """
+    state = JobState.query.filter_by(name=name).first()
+    if state is None:
+        state = JobState(name=name, watermark=0, processed_count=0)
+        db.session.add(state)
+        db.session.flush()
+    return state
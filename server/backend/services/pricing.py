@@ -0,0 +1,127 @@
+from models import db, Product, Inventory
+from sqlalchemy import select
+from decimal import Decimal, InvalidOperation
+from services.promotions import promotion_index
+
+def load_catalog(product_ids):
+    """Fetch price and stock for ``product_ids`` in a single query.
+
+    Returns a dict of product id to row with ``id``, ``name``, ``sku``,
+    ``brand``, ``category_id``, ``selling_price``, ``cost_price``,
+    ``is_active`` and ``quantity_in_stock`` (None when the product has no
+    inventory record).
+    """
+    product_ids = list(set(product_ids))
+    if not product_ids:
+        return {}
+
+    rows = db.session.execute(
+        select(
+            Product.id,
+            Product.name,
+            Product.sku,
+            Product.brand,
+            Product.category_id,
+            Product.selling_price,
+            Product.cost_price,
+            Product.is_active,
+            Inventory.quantity_in_stock
+        ).outerjoin(Inventory, Inventory.product_id == Product.id)
+        .where(Product.id.in_(product_ids))
+    ).all()
+    return {row.id: row for row in rows}
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def cart_product_ids(items):
+    """Product IDs referenced by cart lines, as ``quote_items`` reads them."""
+    return [product_id for product_id in (_to_int(item.get('product_id')) for item in items) if product_id]
+
+def quote_items(items, catalog=None, promotions=None, at=None):
+    """Price cart lines against current prices and stock.
+
+    ``items`` is a list of ``{'product_id', 'quantity', 'unit_price'}`` dicts,
+    where ``unit_price`` is the price the client last saw and is optional.
+    Stock is checked against the total quantity requested per product, so
+    a product split over several lines is validated as a whole.
+
+    Each line gets the running promotion with the largest discount for it,
+    looked up in the compiled promotion index; ``line_total`` is after that
+    ``discount_amount`` and so is the subtotal. For a sale made earlier,
+    pass a :class:`~services.promotions.PromotionHistory` covering ``at``
+    to use the promotions running at that time instead; prices are still
+    the current ones.
+
+    Returns ``(lines, subtotal)``. Each line carries a ``warnings`` list;
+    a cart is valid to check out when no line has any.
+    """
+    product_ids = [_to_int(item.get('product_id')) for item in items]
+    if catalog is None:
+        catalog = load_catalog(product_id for product_id in product_ids if product_id)
+
+    requested = {}
+    for product_id, item in zip(product_ids, items):
+        quantity = _to_int(item.get('quantity', 1))
+        if product_id and quantity and quantity > 0:
+            requested[product_id] = requested.get(product_id, 0) + quantity
+
+    lines = []
+    subtotal = Decimal('0')
+    for product_id, item in zip(product_ids, items):
+        quantity = _to_int(item.get('quantity', 1))
+        row = catalog.get(product_id) if product_id else None
+        line = {
+            'product_id': product_id,
+            'quantity': quantity,
+            'warnings': [],
+        }
+        lines.append(line)
+
+        if not product_id or not quantity or quantity <= 0:
+            line['warnings'].append('invalid_item')
+            continue
+
+        if row is None:
+            line['warnings'].append('not_found')
+            continue
+
+        available = row.quantity_in_stock or 0
+        unit_price = row.selling_price
+        if promotions is None:
+            promotion, discount = promotion_index.best(product_id, row.category_id, row.brand, unit_price, quantity)
+        else:
+            promotion, discount = promotions.best(product_id, row.category_id, row.brand, unit_price, quantity, at)
+        line_total = unit_price * quantity - discount
+        line.update({
+            'sku': row.sku,
+            'name': row.name,
+            'unit_price': unit_price,
+            'discount_amount': discount,
+            'promotion': {'id': promotion.id, 'name': promotion.name} if promotion else None,
+            'line_total': line_total,
+            'available_quantity': available,
+        })
+
+        if not row.is_active:
+            line['warnings'].append('inactive')
+            continue
+
+        if row.quantity_in_stock is None or available < requested[product_id]:
+            line['warnings'].append('insufficient_stock')
+
+        if item.get('unit_price') is not None:
+            try:
+                previous_price = Decimal(str(item['unit_price']))
+            except InvalidOperation:
+                previous_price = None
+            if previous_price is not None and previous_price != unit_price:
+                line['previous_unit_price'] = previous_price
+                line['warnings'].append('price_changed')
+
+        subtotal += line_total
+
+    return lines, subtotal
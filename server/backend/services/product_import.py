@@ -0,0 +1,185 @@
+from models import db, Product, Category, Supplier, Inventory
+from sqlalchemy import select, insert, update
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from services.sku_index import mark_products_changed
+from services.stock import add_stock_levels, sync_product_stock
+
+# Rows validated, conflict-checked and written per round of statements
+IMPORT_CHUNK_SIZE = 1000
+
+PRODUCT_FIELDS = ['name', 'description', 'sku', 'brand', 'size', 'color', 'image_url']
+
+# Fields every valid row provides; other fields only overwrite existing
+# products when their cell is filled in, since CSV rows carry every header
+REQUIRED_FIELDS = {'name', 'sku', 'cost_price', 'selling_price', 'category_id', 'supplier_id'}
+
+def _blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+def _text(value):
+    return None if _blank(value) else str(value).strip()
+
+def _price(value):
+    price = Decimal(str(value).strip())
+    if not price.is_finite() or price < 0:
+        raise InvalidOperation
+    return price.quantize(Decimal('0.01'))
+
+def _int(value, default):
+    return default if _blank(value) else int(str(value).strip())
+
+def _bool(value, default=True):
+    if _blank(value):
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'y')
+
+class _Lookup:
+    """Resolve a reference given either as an ID or as a (case-insensitive) name."""
+
+    def __init__(self, model):
+        rows = db.session.execute(select(model.id, model.name)).all()
+        self.ids = {row.id for row in rows}
+        self.by_name = {row.name.strip().lower(): row.id for row in rows}
+
+    def resolve(self, row, field):
+        value = row.get(f'{field}_id')
+        if not _blank(value):
+            try:
+                value = int(str(value).strip())
+            except ValueError:
+                return None
+            return value if value in self.ids else None
+        name = row.get(field)
+        return None if _blank(name) else self.by_name.get(str(name).strip().lower())
+
+def _parse_row(row, categories, suppliers):
+    """Validate one input row. Returns ``(values, inventory, error)``."""
+    for field in ['name', 'sku', 'cost_price', 'selling_price']:
+        if _blank(row.get(field)):
+            return None, None, f'{field} is required'
+
+    try:
+        cost_price = _price(row['cost_price'])
+        selling_price = _price(row['selling_price'])
+    except (InvalidOperation, ValueError):
+        return None, None, 'cost_price and selling_price must be non-negative numbers'
+
+    category_id = categories.resolve(row, 'category')
+    if category_id is None:
+        return None, None, 'Category not found'
+
+    supplier_id = suppliers.resolve(row, 'supplier')
+    if supplier_id is None:
+        return None, None, 'Supplier not found'
+
+    try:
+        inventory = {
+            'quantity_in_stock': _int(row.get('quantity_in_stock'), 0),
+            'minimum_stock_level': _int(row.get('minimum_stock_level'), 10),
+            'maximum_stock_level': _int(row.get('maximum_stock_level'), 100),
+        }
+    except ValueError:
+        return None, None, 'Stock quantities must be whole numbers'
+
+    values = {field: _text(row.get(field)) for field in PRODUCT_FIELDS}
+    values.update({
+        'cost_price': cost_price,
+        'selling_price': selling_price,
+        'category_id': category_id,
+        'supplier_id': supplier_id,
+        'is_active': _bool(row.get('is_active')),
+    })
+    return values, inventory, None
+
+def import_products(rows, on_conflict='update'):
+    """Insert or update products from an iterable of dict rows.
+
+    Categories and suppliers are resolved up front with one query each.
+    Rows are then processed in chunks: one ``IN`` query finds existing
+    SKUs, and new products are inserted (with their inventory rows) and
+    existing ones updated with batched statements. Everything runs in the
+    current transaction and the caller commits once, so a failure part
+    way through a file leaves nothing applied and the file can simply be
+    sent again. Invalid rows are skipped and reported by row number.
+
+    ``on_conflict`` is ``'update'`` to overwrite products whose SKU exists,
+    or ``'skip'`` to leave them untouched. Updates only write the optional
+    fields whose cells are filled in; blank cells keep the current value.
+    """
+    categories = _Lookup(Category)
+    suppliers = _Lookup(Supplier)
+
+    summary = {'created': 0, 'updated': 0, 'skipped': 0, 'errors': []}
+    seen_skus = set()
+    rows = iter(enumerate(rows, start=1))
+
+    while True:
+        chunk = list(islice(rows, IMPORT_CHUNK_SIZE))
+        if not chunk:
+            break
+
+        parsed = []
+        for row_number, row in chunk:
+            if not isinstance(row, dict):
+                summary['errors'].append({'row': row_number, 'sku': None, 'error': 'Row must be an object'})
+                continue
+            values, inventory, error = _parse_row(row, categories, suppliers)
+            if error is None and values['sku'] in seen_skus:
+                error = 'Duplicate SKU in file'
+            if error:
+                summary['errors'].append({'row': row_number, 'sku': _text(row.get('sku')), 'error': error})
+                continue
+            seen_skus.add(values['sku'])
+            parsed.append((row, values, inventory))
+
+        if not parsed:
+            continue
+
+        existing = dict(db.session.execute(
+            select(Product.sku, Product.id).where(Product.sku.in_([values['sku'] for _, values, _ in parsed]))
+        ).all())
+
+        now = datetime.utcnow()
+        new_rows = []
+        stock_by_sku = {}
+        update_rows = []
+        for row, values, inventory in parsed:
+            product_id = existing.get(values['sku'])
+            if product_id is None:
+                new_rows.append(dict(values, created_at=now, updated_at=now))
+                stock_by_sku[values['sku']] = inventory
+            elif on_conflict == 'update':
+                changes = {
+                    field: value for field, value in values.items()
+                    if field in REQUIRED_FIELDS or not _blank(row.get(field))
+                }
+                update_rows.append(dict(changes, id=product_id, updated_at=now))
+            else:
+                summary['skipped'] += 1
+
+        changed_ids = [row['id'] for row in update_rows]
+
+        if new_rows:
+            created = db.session.execute(
+                insert(Product).returning(Product.id, Product.sku), new_rows
+            ).all()
+            inventories = [dict(stock_by_sku[row.sku], product_id=row.id) for row in created]
+            db.session.execute(insert(Inventory), [
+                dict(inventory, created_at=now, updated_at=now) for inventory in inventories
+            ])
+            add_stock_levels(inventories)
+            sync_product_stock([row.id for row in created])
+            changed_ids.extend(row.id for row in created)
+            summary['created'] += len(created)
+
+        if update_rows:
+            db.session.execute(update(Product), update_rows)
+            summary['updated'] += len(update_rows)
+
+        mark_products_changed(db.session, changed_ids)
+
+    return summary
@@ -0,0 +1,221 @@
+from models import db, Product, ProductStyle
+from sqlalchemy import select, insert, func, case, or_, bindparam
+from datetime import datetime
+from services.similarity import SIZE_ORDER
+import math
+
+# Listing sort keys in style mode, aggregated over each style's matching variants
+STYLE_SORTS = {
+    'id': lambda: func.min(Product.id),
+    'name': lambda: func.min(Product.name),
+    'selling_price': lambda: func.min(Product.selling_price),
+    'created_at': lambda: func.min(Product.created_at),
+    'stock_quantity': lambda: func.sum(Product.stock_quantity),
+}
+
+def _style_key():
+    """Listing group of a product: its style, or the product on its own (negated ID) if it has none."""
+    return case((Product.style_id != None, Product.style_id), else_=-Product.id)
+
+def _normalized_key(name, brand, category_id):
+    return ((name or '').strip().lower(), (brand or '').strip().lower(), category_id)
+
+def _size_sort_key(size):
+    """Sizes in ``SIZE_ORDER`` first, then numeric sizes by value, then the rest alphabetically."""
+    if size is None or size == '':
+        return (3, 0, '')
+    label = size.strip().upper()
+    if label in SIZE_ORDER:
+        return (0, SIZE_ORDER.index(label), '')
+    try:
+        return (1, float(label), '')
+    except ValueError:
+        return (2, 0, label)
+
+def group_ungrouped_products():
+    """Attach every active product without a style to one, by name, brand and category.
+
+    Products whose trimmed, lower-cased name and brand and whose category
+    match an existing style join it; the rest are grouped the same way and
+    get a new style each, named after the group's first product. Styles
+    are inserted in one batch and products updated with one executemany
+    ``UPDATE``. Returns a summary dict; the caller commits.
+    """
+    products = db.session.execute(
+        select(Product.id, Product.name, Product.brand, Product.category_id, Product.description, Product.image_url)
+        .where(Product.is_active == True, Product.style_id == None)
+        .order_by(Product.id)
+    ).all()
+    if not products:
+        return {'products': 0, 'styles_created': 0}
+
+    def existing_styles():
+        styles = {}
+        for style_id, name, brand, category_id in db.session.execute(
+            select(ProductStyle.id, ProductStyle.name, ProductStyle.brand, ProductStyle.category_id)
+            .order_by(ProductStyle.id)
+        ):
+            styles.setdefault(_normalized_key(name, brand, category_id), style_id)
+        return styles
+
+    styles = existing_styles()
+    groups = {}
+    for product in products:
+        groups.setdefault(_normalized_key(product.name, product.brand, product.category_id), []).append(product)
+
+    now = datetime.utcnow()
+    new_styles = [
+        {
+            'name': members[0].name.strip(),
+            'brand': members[0].brand,
+            'category_id': members[0].category_id,
+            'description': members[0].description,
+            'image_url': next((member.image_url for member in members if member.image_url), None),
+            'created_at': now,
+            'updated_at': now,
+        }
+        for key, members in groups.items() if key not in styles
+    ]
+    if new_styles:
+        db.session.execute(insert(ProductStyle), new_styles)
+        styles = existing_styles()
+
+    table = Product.__table__
+    db.session.execute(
+        table.update().where(table.c.id == bindparam('product_id')).values(style_id=bindparam('style'), updated_at=now),
+        [
+            {'product_id': product.id, 'style': styles[key]}
+            for key, members in groups.items() for product in members
+        ]
+    )
+    for instance in list(db.session.identity_map.values()):
+        if isinstance(instance, Product):
+            db.session.expire(instance, ['style_id', 'updated_at'])
+
+    return {'products': len(products), 'styles_created': len(new_styles)}
+
+def _variant(row):
+    return {
+        'product_id': row.id,
+        'sku': row.sku,
+        'selling_price': row.selling_price,
+        'stock_quantity': row.stock_quantity,
+        'stock_status': row.stock_status,
+    }
+
+def _entries(keys, variants):
+    """One listing entry per style key, with its size by color variant matrix."""
+    by_key = {key: [] for key in keys}
+    for row in variants:
+        by_key[row.style_key].append(row)
+
+    entries = []
+    for key in keys:
+        rows = by_key[key]
+        if not rows:
+            continue
+        first = rows[0]
+        sizes = sorted({row.size for row in rows}, key=_size_sort_key)
+        colors = sorted({row.color for row in rows}, key=lambda color: (color is None, (color or '').lower()))
+        cells = {(row.color, row.size): _variant(row) for row in rows}
+        prices = [row.selling_price for row in rows]
+        entries.append({
+            'style_id': first.style_id,
+            'name': first.style_name if first.style_id else first.name,
+            'brand': first.style_brand if first.style_id else first.brand,
+            'category_id': first.style_category_id if first.style_id else first.category_id,
+            'image_url': (first.style_image_url if first.style_id else None) or next(
+                (row.image_url for row in rows if row.image_url), None
+            ),
+            'min_price': min(prices),
+            'max_price': max(prices),
+            'stock_quantity': sum(row.stock_quantity or 0 for row in rows),
+            'variant_count': len(rows),
+            'sizes': sizes,
+            'colors': colors,
+            'matrix': [[cells.get((color, size)) for size in sizes] for color in colors],
+        })
+    return entries
+
+def style_page(statement, sort_by='id', sort_order='asc', page=1, per_page=20):
+    """One page of styles that have a variant matched by ``statement``, a filtered select of products.
+
+    The statement's columns are swapped for the style key, so matching
+    variants are grouped by style in one query that sorts and paginates
+    the groups; products without a style are listed on their
+    own. A second query reads every active variant of the styles on the
+    page, so the matrix shows all sizes and colors of a style, not only
+    the ones that matched the filters. Returns ``(entries, total, pages)``.
+    """
+    group = _style_key()
+    sort_column = STYLE_SORTS[sort_by]()
+    order = sort_column.desc() if sort_order == 'desc' else sort_column.asc()
+    page = page if page and page > 0 else 1
+    per_page = per_page if per_page and per_page > 0 else 20
+
+    # Counting distinct keys skips the temporary GROUP BY table a counted subquery would build
+    total = db.session.execute(
+        statement.with_only_columns(func.count(func.distinct(group))).order_by(None)
+    ).scalar()
+    pages = int(math.ceil(total / per_page)) if total else 0
+    keys = db.session.execute(
+        statement.with_only_columns(group.label('style_key'))
+        .group_by(group)
+        .order_by(order, func.min(Product.id))
+        .limit(per_page)
+        .offset((page - 1) * per_page)
+    ).scalars().all()
+    if not keys:
+        return [], total, pages
+
+    style_ids = [key for key in keys if key > 0]
+    lone_ids = [-key for key in keys if key < 0]
+    variants = db.session.execute(
+        select(
+            group.label('style_key'),
+            Product.id,
+            Product.sku,
+            Product.name,
+            Product.brand,
+            Product.category_id,
+            Product.image_url,
+            Product.size,
+            Product.color,
+            Product.selling_price,
+            Product.stock_quantity,
+            Product.stock_status,
+            Product.style_id,
+            ProductStyle.name.label('style_name'),
+            ProductStyle.brand.label('style_brand'),
+            ProductStyle.category_id.label('style_category_id'),
+            ProductStyle.image_url.label('style_image_url')
+        )
+        .outerjoin(ProductStyle, Product.style_id == ProductStyle.id)
+        .where(
+            Product.is_active == True,
+            or_(Product.style_id.in_(style_ids), Product.id.in_(lone_ids))
+        )
+        .order_by(Product.id)
+    ).all()
+    return _entries(keys, variants), total, pages
+
+def style_detail(style_id):
+    """A style's record with its variant matrix over all of its active variants, or None."""
+    style = ProductStyle.query.get(style_id)
+    if not style:
+        return None
+    entries, _, _ = style_page(
+        select(Product.id).where(Product.style_id == style_id, Product.is_active == True)
+    )
+    detail = style.to_dict()
+    if entries:
+        entry = entries[0]
+        detail.update({name: entry[name] for name in [
+            'min_price', 'max_price', 'stock_quantity', 'variant_count', 'sizes', 'colors', 'matrix'
+        ]})
+    else:
+        detail.update({
+            'min_price': None, 'max_price': None, 'stock_quantity': 0, 'variant_count': 0,
+            'sizes': [], 'colors': [], 'matrix': []
+        })
+    return detail
@@ -0,0 +1,311 @@
+from flask import current_app
+from models import db, Promotion, Category, Product
+from sqlalchemy import select, or_
+from collections import namedtuple
+from datetime import datetime, timezone
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from utils.cache import catalog_generation
+import threading
+import time
+
+PROMOTION_TYPES = ['percent', 'fixed', 'buy_x_get_y']
+PROMOTION_SCOPES = ['all', 'product', 'category', 'brand']
+
+CENT = Decimal('0.01')
+
+# A promotion compiled for checkout; ``value`` is a Decimal
+CompiledPromotion = namedtuple('CompiledPromotion', [
+    'id', 'name', 'promotion_type', 'value', 'buy_quantity', 'get_quantity', 'starts_at', 'ends_at'
+])
+
+class PromotionError(ValueError):
+    """Raised for promotion definitions that cannot be applied."""
+
+def _decimal(value, field):
+    if isinstance(value, bool):
+        raise PromotionError(f'{field} must be a number')
+    try:
+        number = Decimal(str(value))
+    except (InvalidOperation, ValueError):
+        raise PromotionError(f'{field} must be a number')
+    if not number.is_finite():
+        raise PromotionError(f'{field} must be a number')
+    return number
+
+def _quantity(value, field):
+    if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+        raise PromotionError(f'{field} must be a positive whole number')
+    return value
+
+def _timestamp(value, field):
+    """Parse an ISO 8601 timestamp into naive UTC, the form stored and compared everywhere."""
+    if value is None or value == '':
+        return None
+    try:
+        timestamp = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise PromotionError(f'{field} must be an ISO 8601 timestamp')
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+def _check_targets(scope, targets):
+    """Reject product or category targets that do not exist."""
+    model = Product if scope == 'product' else Category
+    found = set(db.session.execute(select(model.id).where(model.id.in_(targets))).scalars())
+    unknown = [target for target in targets if target not in found]
+    if unknown:
+        raise PromotionError(f'Unknown {scope} IDs: {", ".join(map(str, unknown))}')
+
+def parse_promotion(data, promotion=None):
+    """Validate a promotion from a request body into model fields.
+
+    With ``promotion`` the body is a partial update: missing fields keep
+    the promotion's values, and the merged result is validated as a whole.
+    Product and category targets are checked against the database only
+    when the body sets them, so a promotion whose target was later deleted
+    can still be edited or switched off.
+    """
+    if not isinstance(data, dict):
+        raise PromotionError('Promotion must be an object')
+
+    current = promotion.to_dict() if promotion else {
+        'promotion_type': None, 'value': None, 'buy_quantity': None, 'get_quantity': None,
+        'scope': 'all', 'targets': [], 'include_subcategories': True, 'starts_at': None, 'ends_at': None,
+    }
+    merged = dict(current, **data)
+
+    fields = {}
+    if promotion is None or 'name' in data:
+        name = str(data.get('name') or '').strip()
+        if not name:
+            raise PromotionError('name is required')
+        fields['name'] = name
+    if 'description' in data:
+        fields['description'] = data['description']
+    if 'is_active' in data:
+        fields['is_active'] = bool(data['is_active'])
+
+    promotion_type = merged['promotion_type']
+    if promotion_type not in PROMOTION_TYPES:
+        raise PromotionError(f'promotion_type must be one of: {", ".join(PROMOTION_TYPES)}')
+    fields['promotion_type'] = promotion_type
+
+    if promotion_type == 'buy_x_get_y':
+        # The free units are fully free unless a smaller percentage is given
+        value = _decimal(merged['value'] if merged['value'] is not None else 100, 'value')
+        fields['buy_quantity'] = _quantity(merged['buy_quantity'], 'buy_quantity')
+        fields['get_quantity'] = _quantity(merged['get_quantity'], 'get_quantity')
+    else:
+        if merged['value'] is None:
+            raise PromotionError('value is required')
+        value = _decimal(merged['value'], 'value')
+        fields['buy_quantity'] = None
+        fields['get_quantity'] = None
+    if value <= 0 or (promotion_type != 'fixed' and value > 100):
+        raise PromotionError('value must be above 0, and at most 100 for percentages')
+    fields['value'] = value.quantize(CENT, rounding=ROUND_HALF_UP)
+
+    scope = merged['scope']
+    if scope not in PROMOTION_SCOPES:
+        raise PromotionError(f'scope must be one of: {", ".join(PROMOTION_SCOPES)}')
+    targets = merged['targets'] or []
+    if not isinstance(targets, list):
+        raise PromotionError('targets must be a list')
+    if scope == 'all':
+        targets = []
+    elif scope == 'brand':
+        targets = sorted({str(brand).strip() for brand in targets if str(brand).strip()})
+    else:
+        if not all(isinstance(target, int) and not isinstance(target, bool) for target in targets):
+            raise PromotionError('targets must contain IDs')
+        targets = sorted(set(targets))
+    if scope != 'all' and not targets:
+        raise PromotionError(f'targets are required for {scope} promotions')
+    if scope in ['product', 'category'] and (promotion is None or 'scope' in data or 'targets' in data):
+        _check_targets(scope, targets)
+    fields['scope'] = scope
+    fields['targets'] = targets
+    fields['include_subcategories'] = bool(merged['include_subcategories'])
+
+    starts_at = _timestamp(merged['starts_at'], 'starts_at')
+    ends_at = _timestamp(merged['ends_at'], 'ends_at')
+    if starts_at and ends_at and ends_at <= starts_at:
+        raise PromotionError('ends_at must be after starts_at')
+    fields['starts_at'] = starts_at
+    fields['ends_at'] = ends_at
+    return fields
+
+def line_discount(promotion, unit_price, quantity):
+    """Discount ``promotion`` gives a line of ``quantity`` units at ``unit_price``, in cents."""
+    if promotion.promotion_type == 'percent':
+        discount = unit_price * quantity * promotion.value / 100
+    elif promotion.promotion_type == 'fixed':
+        discount = min(promotion.value, unit_price) * quantity
+    else:
+        # Every full set of buy + get units makes the last get units free
+        free = quantity // (promotion.buy_quantity + promotion.get_quantity) * promotion.get_quantity
+        discount = unit_price * free * promotion.value / 100
+    return Decimal(discount).quantize(CENT, rounding=ROUND_HALF_UP)
+
+def _subcategories():
+    """Each category ID mapped to itself and every category below it."""
+    children = {}
+    for category_id, parent_id in db.session.execute(select(Category.id, Category.parent_id)):
+        children.setdefault(category_id, [])
+        if parent_id is not None:
+            children.setdefault(parent_id, []).append(category_id)
+
+    subtrees = {}
+    for root in children:
+        found = [root]
+        for category_id in found:
+            found.extend(child for child in children.get(category_id, []) if child not in found)
+        subtrees[root] = found
+    return subtrees
+
+def _compile(promotions):
+    """File promotions under the products, categories (with their
+    subcategories expanded up front) or brands they target, or in a list
+    of store-wide promotions."""
+    data = {'all': [], 'product': {}, 'category': {}, 'brand': {}, 'count': 0}
+    subtrees = None
+    for promotion in promotions:
+        compiled = CompiledPromotion(
+            promotion.id, promotion.name, promotion.promotion_type, Decimal(promotion.value),
+            promotion.buy_quantity, promotion.get_quantity, promotion.starts_at, promotion.ends_at
+        )
+        data['count'] += 1
+        if promotion.scope == 'all':
+            data['all'].append(compiled)
+            continue
+
+        targets = promotion.targets or []
+        if promotion.scope == 'brand':
+            targets = {target.strip().lower() for target in targets}
+        elif promotion.scope == 'category' and promotion.include_subcategories:
+            if subtrees is None:
+                subtrees = _subcategories()
+            targets = {category for target in targets for category in subtrees.get(target, [target])}
+        for target in targets:
+            data[promotion.scope].setdefault(target, []).append(compiled)
+    return data
+
+def _candidates(data, product_id, category_id, brand):
+    found = list(data['all'])
+    found.extend(data['product'].get(product_id, ()))
+    found.extend(data['category'].get(category_id, ()))
+    if brand:
+        found.extend(data['brand'].get(brand.strip().lower(), ()))
+    return found
+
+def _best(promotions, unit_price, quantity):
+    """The promotion giving a line the largest discount, as ``(promotion, discount)``.
+
+    Promotions do not stack; ties go to the older promotion. Returns
+    ``(None, 0)`` when none applies or none gives a discount.
+    """
+    best, best_discount = None, Decimal('0')
+    for promotion in promotions:
+        discount = line_discount(promotion, unit_price, quantity)
+        if discount > best_discount or (discount == best_discount and best and promotion.id < best.id):
+            best, best_discount = promotion, discount
+    return (best, best_discount) if best_discount > 0 else (None, Decimal('0'))
+
+class PromotionIndex:
+    """Running promotions compiled into lookup tables for checkout.
+
+    Each promotion is filed under the products, categories or brands it
+    targets, or in a list of store-wide promotions. Pricing a line then
+    reads only the few lists for its product, category and brand instead
+    of testing every running promotion. Only promotions inside their date
+    window are compiled; the index is rebuilt at the next start or end
+    date, after :func:`invalidate_promotions` or
+    :func:`utils.cache.invalidate_catalog` run in this process, and after
+    ``PROMOTION_INDEX_MAX_AGE`` seconds, to pick up changes made by other
+    workers.
+    """
+
+    def __init__(self):
+        self._data = None
+        self._key = None
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        key = (_generation, catalog_generation())
+        now = datetime.utcnow()
+        promotions = Promotion.query.filter(
+            Promotion.is_active == True,
+            or_(Promotion.ends_at == None, Promotion.ends_at > now)
+        ).all()
+
+        running = []
+        boundaries = []
+        for promotion in promotions:
+            if promotion.starts_at and promotion.starts_at > now:
+                boundaries.append(promotion.starts_at)
+                continue
+            if promotion.ends_at:
+                boundaries.append(promotion.ends_at)
+            running.append(promotion)
+
+        data = _compile(running)
+        data['valid_until'] = min(boundaries) if boundaries else None
+        with self._lock:
+            self._data = data
+            self._key = key
+            self._loaded_at = time.monotonic()
+        return data
+
+    def _current(self):
+        max_age = current_app.config['PROMOTION_INDEX_MAX_AGE']
+        data = self._data
+        if (data is None or self._key != (_generation, catalog_generation())
+                or (data['valid_until'] is not None and datetime.utcnow() >= data['valid_until'])
+                or time.monotonic() - self._loaded_at > max_age):
+            return self.load()
+        return data
+
+    def candidates(self, product_id, category_id, brand):
+        """Running promotions that apply to a product, store-wide ones included."""
+        return _candidates(self._current(), product_id, category_id, brand)
+
+    def best(self, product_id, category_id, brand, unit_price, quantity):
+        """The running promotion giving a line the largest discount, as ``(promotion, discount)``."""
+        return _best(self.candidates(product_id, category_id, brand), unit_price, quantity)
+
+class PromotionHistory:
+    """Promotions that ran at any time between ``start`` and ``end``, for pricing past sales.
+
+    Sales recorded offline are priced with the promotions that were
+    running when each sale was made, not the ones running when it syncs.
+    Every active promotion whose date window overlaps the period is read
+    with one query and compiled like :class:`PromotionIndex`; lookups then
+    keep the candidates whose window contains the sale time.
+    """
+
+    def __init__(self, start, end):
+        self._data = _compile(Promotion.query.filter(
+            Promotion.is_active == True,
+            or_(Promotion.starts_at == None, Promotion.starts_at <= end),
+            or_(Promotion.ends_at == None, Promotion.ends_at > start)
+        ).all())
+
+    def best(self, product_id, category_id, brand, unit_price, quantity, at):
+        """The promotion running at ``at`` giving a line the largest discount, as ``(promotion, discount)``."""
+        running = [
+            promotion for promotion in _candidates(self._data, product_id, category_id, brand)
+            if (promotion.starts_at is None or promotion.starts_at <= at)
+            and (promotion.ends_at is None or promotion.ends_at > at)
+        ]
+        return _best(running, unit_price, quantity)
+
+promotion_index = PromotionIndex()
+
+_generation = 0
+
+def invalidate_promotions():
+    """Make this process's promotion index rebuild after promotions change."""
+    global _generation
+    _generation += 1
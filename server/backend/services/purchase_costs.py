@@ -0,0 +1,51 @@
+from models import db, Product, PurchaseItem
+from sqlalchemy import select, func
+
+# Purchase items costed per statement (and committed per batch) by the backfill
+BACKFILL_BATCH_SIZE = 5000
+
+def backfill_unit_costs(batch_size=BACKFILL_BATCH_SIZE, progress=None, connection=None):
+    """Fill in ``unit_cost`` on purchase items recorded before it was captured.
+
+    Rows are walked in primary key order, ``batch_size`` at a time, and each
+    batch is costed with one correlated ``UPDATE`` from the product's
+    current ``cost_price`` (the best figure available for past sales) and
+    committed on its own, so a large table is never locked in one long
+    transaction and an interrupted run resumes where it stopped. A missing
+    ``discount_amount`` is set to 0. ``progress`` is called with the number
+    of rows updated after each batch. Returns the total updated.
+
+    With a ``connection`` (as the migration passes) the batches run on it
+    and are committed with the migration instead.
+    """
+    execute = connection.execute if connection is not None else db.session.execute
+    items = PurchaseItem.__table__
+    products = Product.__table__
+    cost = select(products.c.cost_price).where(products.c.id == items.c.product_id).scalar_subquery()
+
+    updated = 0
+    last_id = 0
+    while True:
+        ids = execute(
+            select(items.c.id)
+            .where(items.c.id > last_id, items.c.unit_cost.is_(None))
+            .order_by(items.c.id)
+            .limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            break
+
+        result = execute(
+            items.update()
+            .where(items.c.id.in_(ids))
+            .values(unit_cost=cost, discount_amount=func.coalesce(items.c.discount_amount, 0))
+        )
+        if connection is None:
+            db.session.commit()
+
+        updated += result.rowcount
+        last_id = ids[-1]
+        if progress:
+            progress(updated)
+
+    return updated
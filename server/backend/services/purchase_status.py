@@ -0,0 +1,98 @@
+from models import db, Purchase, PurchaseItem
+from sqlalchemy import select, func
+from datetime import datetime
+from services.stock import adjust_stock
+from services.sales_rollups import apply_status_change
+
+PURCHASE_STATUSES = ['pending', 'completed', 'cancelled']
+
+# Payment statuses a purchase may be recorded with
+PAYMENT_STATUSES = ['pending', 'completed', 'cancelled', 'paid', 'failed', 'refunded']
+
+# Statuses a purchase may move to from each status
+TRANSITIONS = {
+    'pending': {'completed', 'cancelled'},
+    'completed': set(),
+    'cancelled': set(),
+}
+
+class StatusConflict(Exception):
+    """Raised when purchases change status while a bulk transition runs."""
+
+def transition_error(current, target):
+    """Return why a purchase cannot move from ``current`` to ``target``, or None."""
+    if target == 'cancelled':
+        if current == 'cancelled':
+            return 'Purchase is already cancelled'
+        if current == 'completed':
+            return 'Cannot cancel completed purchase'
+    if current == target:
+        return f'Purchase is already {target}'
+    if target not in TRANSITIONS.get(current, set()):
+        return f'Cannot change purchase status from {current} to {target}'
+    return None
+
+def restore_stock(purchase_ids):
+    """Put the items of cancelled purchases back into stock.
+
+    Quantities are summed per product in the database, so each product gets
+    a single stock update however many purchases contained it.
+    """
+    deltas = dict(db.session.execute(
+        select(PurchaseItem.product_id, func.sum(PurchaseItem.quantity))
+        .where(PurchaseItem.purchase_id.in_(purchase_ids))
+        .group_by(PurchaseItem.product_id)
+    ).all())
+    adjust_stock(deltas)
+
+def transition_purchases(purchase_ids, target):
+    """Move many purchases to ``target`` in the current transaction.
+
+    Current statuses are read with one query and checked against the same
+    rules as a single cancellation. Accepted purchases are moved with one
+    ``UPDATE`` that also re-checks their status; cancellations restore
+    stock with one aggregated update and completions are added to the sales
+    rollups. Returns ``(updated_ids, errors)``
+    where ``errors`` maps purchase id to the reason it was rejected. The
+    caller commits.
+    """
+    current = dict(db.session.execute(
+        select(Purchase.id, Purchase.status).where(Purchase.id.in_(purchase_ids))
+    ).all())
+
+    updated_ids = []
+    errors = {}
+    for purchase_id in purchase_ids:
+        if purchase_id not in current:
+            errors[purchase_id] = 'Purchase not found'
+            continue
+        error = transition_error(current[purchase_id], target)
+        if error:
+            errors[purchase_id] = error
+        else:
+            updated_ids.append(purchase_id)
+
+    if not updated_ids:
+        return updated_ids, errors
+
+    sources = [status for status, targets in TRANSITIONS.items() if target in targets]
+    purchases = Purchase.__table__
+    result = db.session.execute(
+        purchases.update()
+        .where(purchases.c.id.in_(updated_ids), purchases.c.status.in_(sources))
+        .values(status=target, updated_at=datetime.utcnow())
+    )
+    if result.rowcount != len(updated_ids):
+        raise StatusConflict('Purchases were changed by another request, please retry')
+
+    for instance in list(db.session.identity_map.values()):
+        if isinstance(instance, Purchase) and instance.id in current:
+            db.session.expire(instance, ['status', 'updated_at'])
+
+    if target == 'cancelled':
+        restore_stock(updated_ids)
+
+    # Every accepted purchase came from the same (non-completed) source statuses
+    apply_status_change(updated_ids, None, target)
+
+    return updated_ids, errors
@@ -0,0 +1,236 @@
+from models import db, Product, Purchase, PurchaseItem, ProductPairCount, ProductAssociation
+from sqlalchemy import select, insert, delete, func, bindparam
+from datetime import datetime
+from services.arrays import fetch_columns
+from services.jobs import job_state
+import numpy as np
+
+JOB_NAME = 'product_associations'
+
+# Neighbors stored for each product
+TOP_K = 10
+
+# Pairs bought together fewer times than this are too thin to recommend
+MIN_CO_PURCHASES = 2
+
+# Larger baskets (team or bulk orders) say little about what goes together and are skipped
+MAX_BASKET_ITEMS = 50
+
+# Purchases read per pass while counting pairs
+PURCHASE_BATCH_SIZE = 20000
+
+_EMPTY = np.array([], dtype=np.int64)
+
+def _basket_pairs(first_id, last_id, span):
+    """Pair counts for the baskets of purchases ``first_id``..``last_id``.
+
+    Returns ``(keys, counts, baskets)``: sorted pair keys ``a * span + b``
+    with ``a <= b``, how many baskets contain each pair, and the number of
+    baskets counted. The diagonal ``a == b`` counts the baskets containing
+    each product. With every basket's distinct products sorted, the pairs
+    ``offset`` places apart are taken from all baskets at once, one offset
+    at a time, so no Python loop runs per basket.
+    """
+    purchases, products = fetch_columns(
+        select(PurchaseItem.purchase_id, PurchaseItem.product_id)
+        .join(Purchase, PurchaseItem.purchase_id == Purchase.id)
+        .where(Purchase.id >= first_id, Purchase.id <= last_id, Purchase.status != 'cancelled'),
+        [np.int64, np.int64]
+    )
+    if not len(purchases):
+        return _EMPTY, _EMPTY, 0
+
+    # Distinct products per basket, ordered by basket then product
+    items = np.unique(purchases * span + products)
+    purchases, products = items // span, items % span
+    starts = np.flatnonzero(np.r_[True, purchases[1:] != purchases[:-1]])
+    sizes = np.diff(np.r_[starts, len(items)])
+    counted = sizes <= MAX_BASKET_ITEMS
+    keep = np.repeat(counted, sizes)
+    purchases, products = purchases[keep], products[keep]
+
+    firsts, seconds = [products], [products]
+    for offset in range(1, MAX_BASKET_ITEMS):
+        same = purchases[offset:] == purchases[:-offset]
+        if not same.any():
+            break
+        firsts.append(products[:-offset][same])
+        seconds.append(products[offset:][same])
+
+    keys, counts = np.unique(np.concatenate(firsts) * span + np.concatenate(seconds), return_counts=True)
+    return keys, counts.astype(np.int64), int(counted.sum())
+
+def _add_counts(keys, counts, more_keys, more_counts):
+    """Sum two sets of pair counts into one, sorted by key."""
+    keys, index = np.unique(np.concatenate([keys, more_keys]), return_inverse=True)
+    return keys, np.bincount(index, weights=np.concatenate([counts, more_counts])).astype(np.int64)
+
+def _store_pair_counts(keys, counts, span):
+    """Add new pair counts to ``product_pair_counts`` and return every stored count.
+
+    The stored matrix is read once into arrays; pairs already there are
+    incremented with one executemany ``UPDATE`` and new pairs inserted in
+    one batch. Returns ``(keys, counts)`` for the whole matrix after the
+    change, so scoring does not read it again.
+    """
+    row_ids, firsts, seconds, stored = fetch_columns(
+        select(
+            ProductPairCount.id,
+            ProductPairCount.product_id,
+            ProductPairCount.related_product_id,
+            ProductPairCount.baskets
+        ),
+        [np.int64, np.int64, np.int64, np.int64]
+    )
+    stored_keys = firsts * span + seconds
+    order = np.argsort(stored_keys)
+    row_ids, stored_keys, stored = row_ids[order], stored_keys[order], stored[order]
+
+    positions = np.minimum(np.searchsorted(stored_keys, keys), max(len(stored_keys) - 1, 0))
+    found = (stored_keys[positions] == keys) if len(stored_keys) else np.zeros(len(keys), dtype=bool)
+
+    table = ProductPairCount.__table__
+    if found.any():
+        db.session.execute(
+            table.update().where(table.c.id == bindparam('row_id')).values(
+                baskets=table.c.baskets + bindparam('add_baskets')
+            ),
+            [
+                {'row_id': row_id, 'add_baskets': count}
+                for row_id, count in zip(row_ids[positions[found]].tolist(), counts[found].tolist())
+            ]
+        )
+        stored[positions[found]] += counts[found]
+
+    new_keys, new_counts = keys[~found], counts[~found]
+    if len(new_keys):
+        db.session.execute(insert(table), [
+            {'product_id': key // span, 'related_product_id': key % span, 'baskets': count}
+            for key, count in zip(new_keys.tolist(), new_counts.tolist())
+        ])
+
+    return np.concatenate([stored_keys, new_keys]), np.concatenate([stored, new_counts])
+
+def _score(keys, counts, span, total_baskets, product_ids=None, top_k=TOP_K, min_co_purchases=MIN_CO_PURCHASES):
+    """Rank every product's partners by lift and keep the best ``top_k``.
+
+    For products ``a`` and ``b`` bought together in ``n_ab`` of ``N``
+    baskets, confidence is ``n_ab / n_a`` and lift ``n_ab * N / (n_a * n_b)``,
+    how much more often they are bought together than chance. Ties go to
+    the pair bought together more often. Only pairs with at least
+    ``min_co_purchases`` baskets and active partners are ranked; with
+    ``product_ids`` only those products' lists are. Returns parallel
+    arrays ``(product, related, rank, co_purchases, confidence, lift)``.
+    """
+    firsts, seconds = keys // span, keys % span
+    diagonal = firsts == seconds
+    basket_products, basket_counts = firsts[diagonal], counts[diagonal]
+    order = np.argsort(basket_products)
+    basket_products, basket_counts = basket_products[order], basket_counts[order]
+
+    pairs = ~diagonal & (counts >= min_co_purchases)
+    source = np.concatenate([firsts[pairs], seconds[pairs]])
+    target = np.concatenate([seconds[pairs], firsts[pairs]])
+    co = np.concatenate([counts[pairs], counts[pairs]])
+
+    active = np.sort(fetch_columns(select(Product.id).where(Product.is_active == True), [np.int64])[0])
+    keep = np.isin(target, active)
+    if product_ids is not None:
+        keep &= np.isin(source, product_ids)
+    source, target, co = source[keep], target[keep], co[keep]
+
+    source_baskets = basket_counts[np.searchsorted(basket_products, source)]
+    target_baskets = basket_counts[np.searchsorted(basket_products, target)]
+    confidence = co / source_baskets
+    lift = co * float(total_baskets) / (source_baskets * target_baskets)
+
+    order = np.lexsort((target, -co, -lift, source))
+    source, target, co, confidence, lift = source[order], target[order], co[order], confidence[order], lift[order]
+    starts = np.flatnonzero(np.r_[True, source[1:] != source[:-1]]) if len(source) else _EMPTY
+    rank = np.arange(len(source)) - np.repeat(starts, np.diff(np.r_[starts, len(source)])) + 1
+    top = rank <= top_k
+    return source[top], target[top], rank[top], co[top], confidence[top], lift[top]
+
+def _store_associations(associations, product_ids=None):
+    """Replace the stored neighbors of ``product_ids`` (default: every product)."""
+    table = ProductAssociation.__table__
+    if product_ids is None:
+        db.session.execute(delete(table))
+    elif len(product_ids):
+        db.session.execute(
+            table.delete().where(table.c.product_id == bindparam('target_id')),
+            [{'target_id': product_id} for product_id in product_ids.tolist()]
+        )
+
+    now = datetime.utcnow()
+    rows = [
+        {
+            'product_id': product_id,
+            'related_product_id': related_id,
+            'rank': rank,
+            'co_purchases': co,
+            'confidence': confidence,
+            'lift': lift,
+            'updated_at': now,
+        }
+        for product_id, related_id, rank, co, confidence, lift in zip(*(column.tolist() for column in associations))
+    ]
+    if rows:
+        db.session.execute(insert(table), rows)
+    return len(rows)
+
+def refresh_associations(top_k=TOP_K, min_co_purchases=MIN_CO_PURCHASES, rescore=False,
+                         batch_size=PURCHASE_BATCH_SIZE, progress=None):
+    """Count the baskets bought since the last run and re-rank the products in them.
+
+    Every purchase that is not cancelled counts as a basket. Purchases
+    after the job's watermark are read ``batch_size`` at a time and their
+    pairs added to the stored co-occurrence counts; only products that
+    appear in those baskets get new neighbor lists. Lists of other products
+    keep the lift they were ranked with until ``rescore=True`` re-ranks
+    every product from the stored counts. Purchases cancelled after they
+    were counted stay counted until :func:`rebuild_associations`.
+    ``progress`` is called with ``(last_purchase_id_read, last_purchase_id)``
+    after each batch. Returns a summary dict; the caller commits.
+    """
+    state = job_state(JOB_NAME)
+    last_id = db.session.execute(select(func.max(Purchase.id))).scalar() or 0
+    span = (db.session.execute(select(func.max(Product.id))).scalar() or 0) + 1
+
+    keys, counts, baskets = _EMPTY, _EMPTY, 0
+    first_id = state.watermark + 1
+    while first_id <= last_id:
+        end_id = min(first_id + batch_size - 1, last_id)
+        batch_keys, batch_counts, batch_baskets = _basket_pairs(first_id, end_id, span)
+        keys, counts = _add_counts(keys, counts, batch_keys, batch_counts)
+        baskets += batch_baskets
+        if progress:
+            progress(end_id, last_id)
+        first_id = end_id + 1
+
+    touched = (keys // span)[keys // span == keys % span]
+    if not len(touched) and not rescore:
+        state.watermark = max(state.watermark, last_id)
+        return {'baskets': 0, 'products': 0, 'associations': 0}
+
+    all_keys, all_counts = _store_pair_counts(keys, counts, span)
+    state.watermark = max(state.watermark, last_id)
+    state.processed_count += baskets
+
+    product_ids = None if rescore else touched
+    associations = _score(all_keys, all_counts, span, state.processed_count, product_ids, top_k, min_co_purchases)
+    stored = _store_associations(associations, product_ids)
+    return {
+        'baskets': baskets,
+        'products': len(np.unique(associations[0])) if rescore else len(touched),
+        'associations': stored,
+    }
+
+def rebuild_associations(top_k=TOP_K, min_co_purchases=MIN_CO_PURCHASES, batch_size=PURCHASE_BATCH_SIZE, progress=None):
+    """Recount every basket from scratch and re-rank all products. The caller commits."""
+    db.session.execute(delete(ProductPairCount))
+    db.session.execute(delete(ProductAssociation))
+    state = job_state(JOB_NAME)
+    state.watermark = 0
+    state.processed_count = 0
+    return refresh_associations(top_k, min_co_purchases, rescore=True, batch_size=batch_size, progress=progress)
@@ -0,0 +1,212 @@
+from models import db, Product, Supplier, Inventory, PurchaseOrder, PurchaseOrderLine
+from sqlalchemy import select, insert, func
+from datetime import datetime, timedelta
+from decimal import Decimal
+from services.stock import adjust_stock, default_location_id
+from services.forecasting import lead_time_days
+
+ORDER_STATUSES = ['draft', 'ordered', 'received', 'cancelled']
+
+# Statuses a purchase order may move to from each status
+ORDER_TRANSITIONS = {
+    'draft': {'ordered', 'received', 'cancelled'},
+    'ordered': {'received', 'cancelled'},
+    'received': set(),
+    'cancelled': set(),
+}
+
+# Orders whose lines count as stock on the way
+OPEN_STATUSES = ['draft', 'ordered']
+
+class ReplenishmentError(ValueError):
+    """Raised when a purchase order cannot be changed as requested."""
+
+def check_transition(order, target):
+    if target not in ORDER_TRANSITIONS.get(order.status, set()):
+        raise ReplenishmentError(f'Cannot change purchase order from {order.status} to {target}')
+
+def reorder_candidates(supplier_ids=None):
+    """Every active product at or below its reorder point, in one query.
+
+    A product needs ordering when its stock plus what is already on open
+    purchase orders is at most ``minimum_stock_level``; the suggested
+    quantity brings that back up to ``maximum_stock_level``. Rows are
+    ordered by supplier, then product.
+    """
+    on_order_lines = (
+        select(PurchaseOrderLine.product_id, func.sum(PurchaseOrderLine.quantity).label('quantity'))
+        .join(PurchaseOrder, PurchaseOrderLine.order_id == PurchaseOrder.id)
+        .where(PurchaseOrder.status.in_(OPEN_STATUSES))
+        .group_by(PurchaseOrderLine.product_id)
+        .subquery()
+    )
+    in_stock = func.coalesce(Inventory.quantity_in_stock, 0)
+    on_order = func.coalesce(on_order_lines.c.quantity, 0)
+    order_quantity = Inventory.maximum_stock_level - in_stock - on_order
+
+    statement = (
+        select(
+            Product.id.label('product_id'),
+            Product.sku,
+            Product.name,
+            Product.supplier_id,
+            Product.cost_price,
+            in_stock.label('quantity_in_stock'),
+            Inventory.minimum_stock_level,
+            Inventory.maximum_stock_level,
+            on_order.label('on_order'),
+            order_quantity.label('order_quantity')
+        )
+        .join(Inventory, Inventory.product_id == Product.id)
+        .join(Supplier, Product.supplier_id == Supplier.id)
+        .outerjoin(on_order_lines, on_order_lines.c.product_id == Product.id)
+        .where(
+            Product.is_active == True,
+            Supplier.is_active == True,
+            in_stock + on_order <= Inventory.minimum_stock_level,
+            order_quantity > 0
+        )
+        .order_by(Product.supplier_id, Product.id)
+    )
+    if supplier_ids is not None:
+        statement = statement.where(Product.supplier_id.in_(supplier_ids))
+    return db.session.execute(statement).all()
+
+def candidate_dict(row):
+    return {
+        'product_id': row.product_id,
+        'sku': row.sku,
+        'name': row.name,
+        'supplier_id': row.supplier_id,
+        'quantity_in_stock': row.quantity_in_stock,
+        'minimum_stock_level': row.minimum_stock_level,
+        'maximum_stock_level': row.maximum_stock_level,
+        'on_order': row.on_order,
+        'order_quantity': row.order_quantity,
+        'unit_cost': float(row.cost_price),
+        'line_total': float(row.cost_price * row.order_quantity),
+    }
+
+def draft_orders(candidates, user_id=None, location_id=None, notes=None):
+    """Group reorder candidates into one draft purchase order per supplier.
+
+    Orders are inserted together and their lines in one batch; each order
+    records the supplier's payment terms and an expected delivery date
+    from its delivery schedule. Returns the new orders; the caller commits.
+    """
+    by_supplier = {}
+    for row in candidates:
+        by_supplier.setdefault(row.supplier_id, []).append(row)
+    if not by_supplier:
+        return []
+
+    location_id = location_id or default_location_id()
+    suppliers = {
+        supplier.id: supplier
+        for supplier in Supplier.query.filter(Supplier.id.in_(list(by_supplier))).all()
+    }
+    today = datetime.utcnow().date()
+
+    orders = []
+    for supplier_id, rows in by_supplier.items():
+        supplier = suppliers[supplier_id]
+        orders.append(PurchaseOrder(
+            supplier_id=supplier_id,
+            location_id=location_id,
+            payment_terms=supplier.payment_terms,
+            expected_delivery=today + timedelta(days=lead_time_days(supplier.delivery_schedule)),
+            total_cost=sum((row.cost_price * row.order_quantity for row in rows), Decimal('0')),
+            notes=notes,
+            created_by=user_id
+        ))
+    db.session.add_all(orders)
+    db.session.flush()
+
+    db.session.execute(insert(PurchaseOrderLine), [
+        {
+            'order_id': order.id,
+            'product_id': row.product_id,
+            'quantity': row.order_quantity,
+            'unit_cost': row.cost_price,
+        }
+        for order, rows in zip(orders, by_supplier.values())
+        for row in rows
+    ])
+    return orders
+
+def _refresh_total(order):
+    db.session.flush()
+    order.total_cost = db.session.execute(
+        select(func.coalesce(func.sum(PurchaseOrderLine.quantity * PurchaseOrderLine.unit_cost), 0))
+        .where(PurchaseOrderLine.order_id == order.id)
+    ).scalar()
+
+def set_line_quantities(order, quantities):
+    """Change the quantities of a draft order; a quantity of 0 removes the line.
+
+    ``quantities`` maps product id to the new quantity. The caller commits.
+    """
+    if order.status != 'draft':
+        raise ReplenishmentError('Only draft purchase orders can be edited')
+
+    lines = {line.product_id: line for line in order.lines}
+    unknown = [product_id for product_id in quantities if product_id not in lines]
+    if unknown:
+        raise ReplenishmentError(f'Products not on this order: {", ".join(map(str, unknown))}')
+
+    for product_id, quantity in quantities.items():
+        if quantity == 0:
+            order.lines.remove(lines[product_id])
+        else:
+            lines[product_id].quantity = quantity
+    _refresh_total(order)
+
+def receive_order(order, user_id=None, received=None):
+    """Receive every line of a purchase order into stock in one go.
+
+    ``received`` optionally maps product id to the quantity that actually
+    arrived (default: the ordered quantity). All lines are restocked at the
+    order's location with a single :func:`adjust_stock` call, and the
+    restock dates are set with one ``UPDATE``. The caller commits.
+    """
+    check_transition(order, 'received')
+    received = received or {}
+
+    lines = {line.product_id: line for line in order.lines}
+    unknown = [product_id for product_id in received if product_id not in lines]
+    if unknown:
+        raise ReplenishmentError(f'Products not on this order: {", ".join(map(str, unknown))}')
+
+    quantities = {product_id: received.get(product_id, line.quantity) for product_id, line in lines.items()}
+    adjust_stock(quantities, order.location_id)
+
+    now = datetime.utcnow()
+    for product_id, line in lines.items():
+        line.received_quantity = quantities[product_id]
+
+    restocked = [product_id for product_id, quantity in quantities.items() if quantity]
+    if restocked:
+        db.session.execute(
+            Inventory.__table__.update()
+            .where(Inventory.__table__.c.product_id.in_(restocked))
+            .values(last_restocked=now)
+        )
+        for instance in list(db.session.identity_map.values()):
+            if isinstance(instance, Inventory) and instance.product_id in quantities:
+                db.session.expire(instance, ['last_restocked'])
+
+    order.status = 'received'
+    order.received_by = user_id
+    order.received_at = now
+    return quantities
+
+def cancel_order(order):
+    check_transition(order, 'cancelled')
+    order.status = 'cancelled'
+
+def submit_order(order):
+    check_transition(order, 'ordered')
+    if not order.lines:
+        raise ReplenishmentError('Purchase order has no lines')
+    order.status = 'ordered'
+    order.ordered_at = datetime.utcnow()
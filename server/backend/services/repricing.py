@@ -0,0 +1,247 @@
+from models import db, Product, Category, PriceChangeBatch, PriceChange
+from sqlalchemy import select, insert
+from datetime import datetime
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP, ROUND_FLOOR
+from services.sku_index import mark_products_changed
+
+RULE_TYPES = ['percent', 'delta', 'round']
+
+CENT = Decimal('0.01')
+
+class RepricingError(ValueError):
+    """Raised for filters or rules that cannot be applied."""
+
+def category_descendants(category_ids):
+    """Select the given categories and every category below them.
+
+    Uses a recursive CTE so the whole subtree is resolved in the database
+    with one statement, however deep the hierarchy is.
+    """
+    tree = select(Category.id).where(Category.id.in_(category_ids)).cte('category_tree', recursive=True)
+    tree = tree.union(select(Category.id).where(Category.parent_id == tree.c.id))
+    return select(tree.c.id)
+
+def _decimal(value, field):
+    try:
+        number = Decimal(str(value))
+    except (InvalidOperation, ValueError):
+        raise RepricingError(f'{field} must be a number')
+    if not number.is_finite():
+        raise RepricingError(f'{field} must be a number')
+    return number
+
+def _id_list(values, field):
+    if not isinstance(values, list):
+        raise RepricingError(f'{field} must be a list')
+    try:
+        return [int(value) for value in values]
+    except (TypeError, ValueError):
+        raise RepricingError(f'{field} must contain IDs')
+
+def parse_filters(data):
+    """Normalise the product filters of a repricing request."""
+    if not isinstance(data, dict):
+        raise RepricingError('filters must be an object')
+
+    filters = {
+        'category_ids': _id_list(data.get('category_ids', []), 'category_ids'),
+        'include_subcategories': bool(data.get('include_subcategories', True)),
+        'supplier_ids': _id_list(data.get('supplier_ids', []), 'supplier_ids'),
+        'brands': [str(brand).strip() for brand in data.get('brands', []) if str(brand).strip()],
+        'skus': [str(sku).strip() for sku in data.get('skus', []) if str(sku).strip()],
+        'include_inactive': bool(data.get('include_inactive', False)),
+    }
+    if not any(filters[key] for key in ['category_ids', 'supplier_ids', 'brands', 'skus']):
+        raise RepricingError('At least one of category_ids, supplier_ids, brands or skus is required')
+    return filters
+
+def parse_rule(data):
+    """Normalise the pricing rule of a repricing request."""
+    if not isinstance(data, dict):
+        raise RepricingError('rule must be an object')
+
+    rule_type = data.get('type')
+    if rule_type not in RULE_TYPES:
+        raise RepricingError(f'rule type must be one of: {", ".join(RULE_TYPES)}')
+
+    rule = {'type': rule_type}
+    if rule_type != 'round':
+        rule['value'] = str(_decimal(data.get('value'), 'rule value'))
+
+    if data.get('round_to') is not None:
+        round_to = _decimal(data['round_to'], 'round_to')
+        if round_to <= 0:
+            raise RepricingError('round_to must be greater than zero')
+        rule['round_to'] = str(round_to)
+
+    if data.get('price_ending') is not None:
+        price_ending = _decimal(data['price_ending'], 'price_ending')
+        if not 0 <= price_ending < 1:
+            raise RepricingError('price_ending must be between 0 and 1')
+        rule['price_ending'] = str(price_ending.quantize(CENT))
+
+    if rule_type == 'round' and 'round_to' not in rule and 'price_ending' not in rule:
+        raise RepricingError('A round rule needs round_to or price_ending')
+    return rule
+
+def new_price(price, rule):
+    """Apply ``rule`` to a single price."""
+    if rule['type'] == 'percent':
+        price = price * (1 + Decimal(rule['value']) / 100)
+    elif rule['type'] == 'delta':
+        price = price + Decimal(rule['value'])
+
+    if 'round_to' in rule:
+        step = Decimal(rule['round_to'])
+        price = (price / step).quantize(Decimal('1'), rounding=ROUND_HALF_UP) * step
+
+    if 'price_ending' in rule:
+        # Nearest price with the given cents, e.g. 24.20 -> 23.99 and 24.70 -> 24.99
+        ending = Decimal(rule['price_ending'])
+        lower = price.to_integral_value(rounding=ROUND_FLOOR) + ending
+        if lower > price:
+            lower -= 1
+        upper = lower + 1
+        price = upper if upper - price <= price - lower or lower <= 0 else lower
+
+    return price.quantize(CENT, rounding=ROUND_HALF_UP)
+
+def matching_products(filters):
+    """Select the products a repricing request applies to."""
+    statement = select(
+        Product.id, Product.sku, Product.name, Product.cost_price, Product.selling_price
+    ).order_by(Product.id)
+
+    if filters['category_ids']:
+        if filters['include_subcategories']:
+            statement = statement.where(Product.category_id.in_(category_descendants(filters['category_ids'])))
+        else:
+            statement = statement.where(Product.category_id.in_(filters['category_ids']))
+    if filters['supplier_ids']:
+        statement = statement.where(Product.supplier_id.in_(filters['supplier_ids']))
+    if filters['brands']:
+        statement = statement.where(Product.brand.in_(filters['brands']))
+    if filters['skus']:
+        statement = statement.where(Product.sku.in_(filters['skus']))
+    if not filters['include_inactive']:
+        statement = statement.where(Product.is_active == True)
+
+    return statement
+
+def plan_price_changes(filters, rule):
+    """Work out the new price of every matching product.
+
+    Returns ``(changes, matched)`` where ``changes`` only holds products
+    whose price actually changes.
+    """
+    rows = db.session.execute(matching_products(filters)).all()
+
+    changes = []
+    for row in rows:
+        price = new_price(row.selling_price, rule)
+        if price == row.selling_price:
+            continue
+        changes.append({
+            'product_id': row.id,
+            'sku': row.sku,
+            'name': row.name,
+            'old_price': row.selling_price,
+            'new_price': price,
+            'below_cost': price < row.cost_price,
+        })
+
+    invalid = sum(1 for change in changes if change['new_price'] <= 0)
+    if invalid:
+        raise RepricingError(f'Rule would set {invalid} product price(s) to zero or below')
+    return changes, len(rows)
+
+def apply_price_changes(changes, filters, rule, user_id, reason=None):
+    """Record ``changes`` as a batch and apply them with one ``UPDATE``.
+
+    The audit rows are written first, and the products table is then
+    updated from them with a correlated subquery, so the statement size
+    does not grow with the number of products. The caller commits.
+    """
+    now = datetime.utcnow()
+    batch = PriceChangeBatch(
+        user_id=user_id,
+        filters=filters,
+        rule=rule,
+        reason=reason,
+        product_count=len(changes)
+    )
+    db.session.add(batch)
+    db.session.flush()
+
+    if changes:
+        db.session.execute(insert(PriceChange), [
+            {
+                'batch_id': batch.id,
+                'product_id': change['product_id'],
+                'old_price': change['old_price'],
+                'new_price': change['new_price'],
+            }
+            for change in changes
+        ])
+
+        products = Product.__table__
+        changes_table = PriceChange.__table__
+        db.session.execute(
+            products.update()
+            .where(products.c.id.in_(
+                select(changes_table.c.product_id).where(changes_table.c.batch_id == batch.id)
+            ))
+            .values(
+                selling_price=select(changes_table.c.new_price).where(
+                    changes_table.c.batch_id == batch.id,
+                    changes_table.c.product_id == products.c.id
+                ).scalar_subquery(),
+                updated_at=now
+            )
+        )
+        _expire_products([change['product_id'] for change in changes])
+
+    return batch
+
+def rollback_price_changes(batch, user_id):
+    """Restore the prices recorded in ``batch`` with one ``UPDATE``.
+
+    Products whose price was changed again after the batch are left alone.
+    Returns the number of products restored. The caller commits.
+    """
+    products = Product.__table__
+    changes_table = PriceChange.__table__
+    product_ids = db.session.execute(
+        select(changes_table.c.product_id).where(changes_table.c.batch_id == batch.id)
+    ).scalars().all()
+
+    change = select(changes_table).where(
+        changes_table.c.batch_id == batch.id,
+        changes_table.c.product_id == products.c.id
+    )
+    result = db.session.execute(
+        products.update()
+        .where(
+            products.c.id.in_(select(changes_table.c.product_id).where(changes_table.c.batch_id == batch.id)),
+            products.c.selling_price == change.with_only_columns(changes_table.c.new_price).scalar_subquery()
+        )
+        .values(
+            selling_price=change.with_only_columns(changes_table.c.old_price).scalar_subquery(),
+            updated_at=datetime.utcnow()
+        )
+    )
+
+    batch.status = 'rolled_back'
+    batch.rolled_back_at = datetime.utcnow()
+    batch.rolled_back_by = user_id
+
+    _expire_products(product_ids)
+    return result.rowcount
+
+def _expire_products(product_ids):
+    """Expire loaded products and queue them for the SKU index refresh."""
+    product_ids = set(product_ids)
+    for instance in list(db.session.identity_map.values()):
+        if isinstance(instance, Product) and instance.id in product_ids:
+            db.session.expire(instance, ['selling_price', 'updated_at'])
+    mark_products_changed(db.session, product_ids)
@@ -0,0 +1,208 @@
+from models import db, Purchase, PurchaseItem, Product, Category, ProductSalesRollup, CategorySalesRollup
+from sqlalchemy import select, insert, delete, func, bindparam, desc
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+PERIODS = ['week', 'month']
+
+RANKING_METRICS = ['quantity', 'revenue', 'profit']
+
+# Only completed purchases count as sales, as in the sales and profit reports
+SALE_STATUS = 'completed'
+
+def period_start(day, period):
+    """First day of the week (Monday) or month containing ``day``."""
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+def _daily_sales(*criteria):
+    """Units, revenue and cost per day and product for the matching purchases."""
+    day = func.date(Purchase.created_at)
+    return db.session.execute(
+        select(
+            day.label('day'),
+            PurchaseItem.product_id,
+            Product.category_id,
+            func.sum(PurchaseItem.quantity).label('quantity'),
+            func.sum(PurchaseItem.total_price).label('revenue'),
+            func.sum(PurchaseItem.quantity * PurchaseItem.unit_cost).label('cost')
+        )
+        .join(Purchase, PurchaseItem.purchase_id == Purchase.id)
+        .join(Product, PurchaseItem.product_id == Product.id)
+        .where(*criteria)
+        .group_by(day, PurchaseItem.product_id, Product.category_id)
+    )
+
+def _rollup_totals(rows):
+    """Fold daily rows into ``{(period, start, id): [quantity, revenue, cost]}`` per product and category."""
+    products = {}
+    categories = {}
+    for row in rows:
+        day = row.day if isinstance(row.day, date) else date.fromisoformat(str(row.day))
+        values = (row.quantity or 0, Decimal(str(row.revenue or 0)), Decimal(str(row.cost or 0)))
+        for period in PERIODS:
+            start = period_start(day, period)
+            for totals, key in ((products, row.product_id), (categories, row.category_id)):
+                entry = totals.setdefault((period, start, key), [0, Decimal('0'), Decimal('0')])
+                for index, value in enumerate(values):
+                    entry[index] += value
+    return products, categories
+
+def _merge(model, key_name, totals, sign=1):
+    """Add ``totals`` (times ``sign``) to a rollup table.
+
+    Existing rows are found with one query per period and incremented with
+    one executemany ``UPDATE``; missing rows are inserted in one batch.
+    """
+    if not totals:
+        return
+    table = model.__table__
+    key_column = table.c[key_name]
+
+    keys_by_period = {}
+    for period, start, key in totals:
+        keys_by_period.setdefault((period, start), []).append(key)
+
+    existing = {}
+    for (period, start), keys in keys_by_period.items():
+        for row_id, key in db.session.execute(
+            select(table.c.id, key_column).where(
+                table.c.period == period,
+                table.c.period_start == start,
+                key_column.in_(keys)
+            )
+        ):
+            existing[(period, start, key)] = row_id
+
+    new_rows = []
+    changes = []
+    for rollup_key, (quantity, revenue, cost) in totals.items():
+        if rollup_key in existing:
+            changes.append({
+                'row_id': existing[rollup_key],
+                'add_quantity': sign * quantity,
+                'add_revenue': sign * revenue,
+                'add_cost': sign * cost,
+            })
+        else:
+            period, start, key = rollup_key
+            new_rows.append({
+                'period': period,
+                'period_start': start,
+                key_name: key,
+                'quantity': sign * quantity,
+                'revenue': sign * revenue,
+                'cost': sign * cost,
+            })
+
+    if new_rows:
+        db.session.execute(insert(table), new_rows)
+    if changes:
+        db.session.execute(
+            table.update().where(table.c.id == bindparam('row_id')).values(
+                quantity=table.c.quantity + bindparam('add_quantity'),
+                revenue=table.c.revenue + bindparam('add_revenue'),
+                cost=table.c.cost + bindparam('add_cost')
+            ),
+            changes
+        )
+
+def record_sales(purchase_ids, sign=1):
+    """Add the items of ``purchase_ids`` to the rollups (``sign=-1`` takes them out).
+
+    Call when purchases become completed, or stop being completed. The
+    items are aggregated by day in one query, so the work depends on the
+    purchases changed rather than on the size of the history. The caller
+    commits.
+    """
+    purchase_ids = list(purchase_ids)
+    if not purchase_ids:
+        return
+    products, categories = _rollup_totals(_daily_sales(Purchase.id.in_(purchase_ids)))
+    _merge(ProductSalesRollup, 'product_id', products, sign)
+    _merge(CategorySalesRollup, 'category_id', categories, sign)
+
+def apply_status_change(purchase_ids, previous_status, status):
+    """Keep the rollups in step with purchases moving from ``previous_status`` to ``status``."""
+    if previous_status != SALE_STATUS and status == SALE_STATUS:
+        record_sales(purchase_ids)
+    elif previous_status == SALE_STATUS and status != SALE_STATUS:
+        record_sales(purchase_ids, sign=-1)
+
+def rebuild_sales_rollups():
+    """Recompute both rollup tables from every completed purchase.
+
+    History is read one calendar month at a time so memory stays bounded;
+    weeks that span two months are merged as the second month is added.
+    The caller commits.
+    """
+    db.session.execute(delete(ProductSalesRollup))
+    db.session.execute(delete(CategorySalesRollup))
+
+    first, last = db.session.execute(
+        select(func.min(Purchase.created_at), func.max(Purchase.created_at))
+        .where(Purchase.status == SALE_STATUS)
+    ).one()
+    if first is None:
+        return
+
+    month = period_start(first.date(), 'month')
+    while month <= last.date():
+        next_month = (month + timedelta(days=32)).replace(day=1)
+        products, categories = _rollup_totals(_daily_sales(
+            Purchase.status == SALE_STATUS,
+            Purchase.created_at >= datetime.combine(month, datetime.min.time()),
+            Purchase.created_at < datetime.combine(next_month, datetime.min.time())
+        ))
+        _merge(ProductSalesRollup, 'product_id', products)
+        _merge(CategorySalesRollup, 'category_id', categories)
+        month = next_month
+
+def ensure_sales_rollups():
+    """Build the rollups if they are empty but completed sales exist."""
+    if db.session.execute(select(ProductSalesRollup.id).limit(1)).first() is None:
+        rebuild_sales_rollups()
+
+def _ranked(model, columns, group_by, period, start, end, metric, limit, *criteria):
+    quantity = func.sum(model.quantity).label('total_quantity')
+    revenue = func.sum(model.revenue).label('total_revenue')
+    profit = func.sum(model.revenue - model.cost).label('total_profit')
+    order = {'quantity': quantity, 'revenue': revenue, 'profit': profit}[metric]
+    return db.session.execute(
+        select(*columns, quantity, revenue, profit)
+        .where(
+            model.period == period,
+            model.period_start >= period_start(start, period),
+            model.period_start <= period_start(end, period),
+            *criteria
+        )
+        .group_by(*group_by)
+        .having(quantity > 0)
+        .order_by(desc(order), *group_by[:1])
+        .limit(limit)
+    ).all()
+
+def top_products(period, start, end, metric='quantity', limit=10, category_ids=None, brand=None):
+    """Best-selling products over the weeks or months covering ``start``..``end``."""
+    criteria = [ProductSalesRollup.product_id == Product.id]
+    if category_ids is not None:
+        criteria.append(Product.category_id.in_(category_ids))
+    if brand:
+        criteria.append(Product.brand == brand)
+    return _ranked(
+        ProductSalesRollup,
+        [Product.id, Product.name, Product.sku, Product.brand, Product.category_id],
+        [Product.id, Product.name, Product.sku, Product.brand, Product.category_id],
+        period, start, end, metric, limit, *criteria
+    )
+
+def top_categories(period, start, end, metric='quantity', limit=10):
+    """Best-selling categories over the weeks or months covering ``start``..``end``."""
+    return _ranked(
+        CategorySalesRollup,
+        [Category.id, Category.name],
+        [Category.id, Category.name],
+        period, start, end, metric, limit,
+        CategorySalesRollup.category_id == Category.id
+    )
@@ -0,0 +1,226 @@
+from flask import current_app
+from models import db, Product, Category
+from sqlalchemy import select, func, case
+from utils.cache import catalog_generation
+from services.arrays import fetch_columns
+import threading
+import time
+import numpy as np
+
+# Sizes in order, so neighbouring sizes count as closer than distant ones
+SIZE_ORDER = ['XXS', 'XS', 'S', 'M', 'L', 'XL', 'XXL', 'XXXL']
+
+# Prices this many times apart or more get no credit for price
+PRICE_BAND_RATIO = 2.0
+
+# Weight of each attribute in the similarity score; the score is scaled to 0..1
+SIMILARITY_WEIGHTS = {
+    'name': 4.0,
+    'category': 3.0,
+    'brand': 2.0,
+    'price': 2.0,
+    'size': 1.0,
+    'color': 1.0,
+}
+
+DEFAULT_K = 10
+MAX_K = 50
+
+# Most candidates whose stock is read in one query
+STOCK_BATCH_SIZE = 1000
+
+def _normalized(column):
+    return func.lower(func.trim(func.coalesce(column, '')))
+
+def _codes(values):
+    """Integer code per distinct value; -1 for empty values."""
+    uniques, codes = np.unique(values, return_inverse=True)
+    codes = codes.astype(np.int32)
+    if len(uniques) and uniques[0] == '':
+        codes -= 1
+    return codes
+
+def _size_rank(column):
+    """Position of a size in ``SIZE_ORDER``; -1 for sizes outside it."""
+    size = func.upper(func.trim(func.coalesce(column, '')))
+    return case({value: rank for rank, value in enumerate(SIZE_ORDER)}, value=size, else_=-1)
+
+def _category_paths():
+    """Sorted category IDs and a matrix of their paths, root first and padded with -1."""
+    parents = dict(db.session.execute(select(Category.id, Category.parent_id)).all())
+    category_ids = sorted(parents)
+    paths = []
+    for category_id in category_ids:
+        path = []
+        current = category_id
+        while current is not None and current not in path:
+            path.append(current)
+            current = parents.get(current)
+        paths.append(path[::-1])
+
+    matrix = np.full((len(paths), max((len(path) for path in paths), default=1)), -1, dtype=np.int64)
+    for index, path in enumerate(paths):
+        matrix[index, :len(path)] = path
+    return np.array(category_ids, dtype=np.int64), matrix
+
+class SimilarityIndex:
+    """In-process attribute vectors of the active catalog for "similar items" queries.
+
+    Each product is encoded as a compact row of numbers: its category,
+    codes for its trimmed, lower-cased name, brand, size and color, its
+    size's position in ``SIZE_ORDER`` and its log price. A query scores
+    every product against one of them with a handful of array operations,
+    so nearest neighbors come back in milliseconds without a precomputed
+    neighbor table. The index is rebuilt after
+    :func:`utils.cache.invalidate_catalog` runs in this process and after
+    ``SIMILARITY_INDEX_MAX_AGE`` seconds, to pick up changes made by other
+    workers. Stock is not indexed; it is read from the database for the
+    best candidates only.
+    """
+
+    def __init__(self):
+        self._data = None
+        self._generation = None
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        generation = catalog_generation()
+        product_ids, names, brands, sizes, size_ranks, colors, prices, product_categories = fetch_columns(
+            select(
+                Product.id,
+                _normalized(Product.name),
+                _normalized(Product.brand),
+                _normalized(Product.size),
+                _size_rank(Product.size),
+                _normalized(Product.color),
+                Product.selling_price,
+                Product.category_id
+            ).where(Product.is_active == True),
+            [np.int64, str, str, str, np.int32, str, np.float64, np.int64]
+        )
+        order = np.argsort(product_ids)
+        category_ids, paths = _category_paths()
+        categories = np.minimum(np.searchsorted(category_ids, product_categories[order]), max(len(category_ids) - 1, 0))
+
+        data = {
+            'product_id': product_ids[order],
+            'name': _codes(names[order]),
+            'brand': _codes(brands[order]),
+            'size': _codes(sizes[order]),
+            'size_rank': size_ranks[order],
+            'color': _codes(colors[order]),
+            'log_price': np.log(np.maximum(prices[order], 0.01)),
+            'category': categories,
+            'category_path': paths,
+            'category_depth': (paths >= 0).sum(axis=1),
+        }
+        with self._lock:
+            self._data = data
+            self._generation = generation
+            self._loaded_at = time.monotonic()
+        return data
+
+    def _current(self):
+        max_age = current_app.config['SIMILARITY_INDEX_MAX_AGE']
+        if (self._data is None or self._generation != catalog_generation()
+                or time.monotonic() - self._loaded_at > max_age):
+            return self.load()
+        return self._data
+
+    @staticmethod
+    def _scores(data, position):
+        """Similarity of every indexed product to the one at ``position``, from 0 to 1."""
+        def same(name):
+            return (data[name] == data[name][position]) & (data[name][position] >= 0)
+
+        # Shared share of the category path, worked out per category and then looked up per product
+        paths, depths = data['category_path'], data['category_depth']
+        query_category = data['category'][position]
+        query_path = paths[query_category]
+        common = np.cumprod((paths == query_path) & (query_path >= 0), axis=1).sum(axis=1)
+        category = (common / np.maximum(np.maximum(depths, depths[query_category]), 1))[data['category']]
+
+        ranks = data['size_rank']
+        query_rank = ranks[position]
+        if query_rank >= 0:
+            size = np.where(ranks >= 0, 1 - np.abs(ranks - query_rank) / (len(SIZE_ORDER) - 1), same('size'))
+        else:
+            size = same('size').astype(np.float64)
+
+        price = np.clip(
+            1 - np.abs(data['log_price'] - data['log_price'][position]) / np.log(PRICE_BAND_RATIO), 0, 1
+        )
+
+        weights = SIMILARITY_WEIGHTS
+        score = (
+            weights['name'] * same('name')
+            + weights['category'] * category
+            + weights['brand'] * same('brand')
+            + weights['price'] * price
+            + weights['size'] * size
+            + weights['color'] * same('color')
+        )
+        return score / sum(weights.values())
+
+    @staticmethod
+    def _top(data, scores, candidates, count):
+        """The ``count`` best candidates by score, ties broken by product ID."""
+        if count < len(candidates):
+            # Keep everything tied with the last place so the tie-break stays stable
+            threshold = np.partition(-scores[candidates], count - 1)[count - 1]
+            candidates = candidates[-scores[candidates] <= threshold]
+        order = np.lexsort((data['product_id'][candidates], -scores[candidates]))
+        return candidates[order][:count]
+
+    def nearest(self, product_id, k=DEFAULT_K, in_stock_only=True, same_brand=None, same_size=None, same_color=None):
+        """The ``k`` active products most similar to ``product_id``.
+
+        ``same_brand``, ``same_size`` and ``same_color`` are None to allow
+        any value, True to require a match or False to require a
+        difference, so "this item in another size" is
+        ``same_brand=True, same_size=False``. With ``in_stock_only`` the
+        stock of the best candidates is read in growing batches until ``k``
+        are in stock. Returns ``[(product_id, score)]`` best first, or None
+        if the product is not in the index.
+        """
+        data = self._current()
+        product_ids = data['product_id']
+        position = int(np.searchsorted(product_ids, product_id))
+        if position >= len(product_ids) or product_ids[position] != product_id:
+            return None
+
+        scores = self._scores(data, position)
+        mask = np.ones(len(product_ids), dtype=bool)
+        mask[position] = False
+        for name, wanted in (('brand', same_brand), ('size', same_size), ('color', same_color)):
+            if wanted is not None:
+                matches = (data[name] == data[name][position]) & (data[name][position] >= 0)
+                mask &= matches if wanted else ~matches
+        candidates = np.flatnonzero(mask)
+
+        if not in_stock_only:
+            top = self._top(data, scores, candidates, k)
+            return list(zip(product_ids[top].tolist(), scores[top].tolist()))
+
+        found = []
+        count = k * 4
+        ranked = self._top(data, scores, candidates, count)
+        seen = 0
+        while len(found) < k and seen < len(candidates):
+            if seen >= len(ranked):
+                count *= 4
+                ranked = self._top(data, scores, candidates, count)
+            batch = ranked[seen:seen + STOCK_BATCH_SIZE]
+            ids = product_ids[batch].tolist()
+            stock = dict(db.session.execute(
+                select(Product.id, Product.stock_quantity).where(Product.id.in_(ids))
+            ).all())
+            found.extend(
+                (product, score) for product, score in zip(ids, scores[batch].tolist())
+                if (stock.get(product) or 0) > 0
+            )
+            seen += len(batch)
+        return found[:k]
+
+similarity_index = SimilarityIndex()
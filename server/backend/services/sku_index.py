@@ -0,0 +1,176 @@
+from flask import current_app
+from models import db, Product, Inventory
+from sqlalchemy import select, event
+import threading
+import time
+
+# Above this many changed products a full reload is cheaper than a refresh by ID
+REFRESH_MAX_IDS = 1000
+
+class SkuIndex:
+    """In-process hash index of products keyed by SKU for the POS scan path.
+
+    Each entry holds just what the register needs (name, price, stock). The
+    index is loaded once and then kept current from committed ORM writes to
+    products and inventory; code that changes stock with Core statements
+    calls :func:`mark_products_changed` for the affected products. The index is per
+    process, so it is also reloaded after ``POS_INDEX_MAX_AGE`` seconds to
+    pick up writes made by other workers.
+    """
+
+    def __init__(self):
+        self._by_sku = {}
+        self._sku_by_id = {}
+        self._stale_ids = set()
+        self._lock = threading.Lock()
+        self._loaded_at = None
+
+    @staticmethod
+    def _statement():
+        return select(
+            Product.id,
+            Product.sku,
+            Product.name,
+            Product.selling_price,
+            Product.is_active,
+            Inventory.quantity_in_stock
+        ).outerjoin(Inventory, Inventory.product_id == Product.id)
+
+    @staticmethod
+    def _entry(product_id, sku, name, selling_price, is_active, quantity_in_stock):
+        return {
+            'product_id': product_id,
+            'sku': sku,
+            'name': name,
+            'selling_price': float(selling_price),
+            'quantity_in_stock': quantity_in_stock or 0,
+            'is_active': bool(is_active),
+        }
+
+    def load(self):
+        by_sku = {}
+        sku_by_id = {}
+        for row in db.session.execute(self._statement()):
+            by_sku[row.sku] = self._entry(*row)
+            sku_by_id[row.id] = row.sku
+
+        with self._lock:
+            self._by_sku = by_sku
+            self._sku_by_id = sku_by_id
+            self._stale_ids = set()
+            self._loaded_at = time.monotonic()
+
+    def _ensure_current(self):
+        max_age = current_app.config['POS_INDEX_MAX_AGE']
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > max_age:
+            self.load()
+        elif self._stale_ids:
+            with self._lock:
+                stale_ids, self._stale_ids = self._stale_ids, set()
+            if len(stale_ids) > REFRESH_MAX_IDS:
+                self.load()
+            else:
+                self.refresh(stale_ids)
+
+    def _put(self, entry):
+        old_sku = self._sku_by_id.get(entry['product_id'])
+        if old_sku is not None and old_sku != entry['sku']:
+            self._by_sku.pop(old_sku, None)
+        self._by_sku[entry['sku']] = entry
+        self._sku_by_id[entry['product_id']] = entry['sku']
+
+    def _remove(self, product_id):
+        sku = self._sku_by_id.pop(product_id, None)
+        if sku is not None:
+            self._by_sku.pop(sku, None)
+
+    def refresh(self, product_ids):
+        """Reload the given products from the database."""
+        product_ids = list(product_ids)
+        if not product_ids:
+            return
+        rows = db.session.execute(self._statement().where(Product.id.in_(product_ids))).all()
+        with self._lock:
+            found = set()
+            for row in rows:
+                self._put(self._entry(*row))
+                found.add(row.id)
+            for product_id in set(product_ids) - found:
+                self._remove(product_id)
+
+    def invalidate(self, product_ids):
+        """Mark products as changed; they are reloaded on the next lookup."""
+        with self._lock:
+            self._stale_ids.update(product_ids)
+
+    def apply(self, products, quantities, deleted_ids, stale_ids):
+        """Apply committed changes captured from the session."""
+        with self._lock:
+            self._stale_ids.update(stale_ids)
+            for product_id in deleted_ids:
+                self._remove(product_id)
+            for product_id, values in products.items():
+                sku = self._sku_by_id.get(product_id)
+                current = self._by_sku.get(sku) if sku is not None else None
+                quantity = current['quantity_in_stock'] if current else 0
+                self._put(self._entry(product_id, *values, quantity))
+            for product_id, quantity in quantities.items():
+                sku = self._sku_by_id.get(product_id)
+                if sku is None:
+                    self._stale_ids.add(product_id)
+                    continue
+                entry = dict(self._by_sku[sku])
+                entry['quantity_in_stock'] = quantity or 0
+                self._by_sku[sku] = entry
+
+    def lookup(self, sku):
+        self._ensure_current()
+        return self._by_sku.get(sku)
+
+    def lookup_many(self, skus):
+        self._ensure_current()
+        by_sku = self._by_sku
+        return {sku: by_sku.get(sku) for sku in skus}
+
+sku_index = SkuIndex()
+
+_PENDING_KEY = 'sku_index_pending'
+
+def _capture_changes(session, flush_context):
+    """Snapshot product and inventory values written by this flush."""
+    pending = session.info.setdefault(_PENDING_KEY, ({}, {}, set(), set()))
+    products, quantities, deleted_ids, stale_ids = pending
+
+    for instance in list(session.new) + list(session.dirty):
+        if isinstance(instance, Product) and instance.id is not None:
+            products[instance.id] = (
+                instance.sku, instance.name, instance.selling_price, instance.is_active
+            )
+        elif isinstance(instance, Inventory) and instance.product_id is not None:
+            quantities[instance.product_id] = instance.quantity_in_stock
+
+    for instance in session.deleted:
+        if isinstance(instance, Product) and instance.id is not None:
+            deleted_ids.add(instance.id)
+        elif isinstance(instance, Inventory) and instance.product_id is not None:
+            quantities[instance.product_id] = 0
+
+def mark_products_changed(session, product_ids):
+    """Record products changed by Core statements; refreshed once the session commits."""
+    pending = session.info.setdefault(_PENDING_KEY, ({}, {}, set(), set()))
+    pending[3].update(product_ids)
+
+def _apply_changes(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending and sku_index._loaded_at is not None:
+        sku_index.apply(*pending)
+
+def _discard_changes(session):
+    session.info.pop(_PENDING_KEY, None)
+
+def init_sku_index(app):
+    """Keep the SKU index in step with committed ORM writes."""
+    app.config.setdefault('POS_INDEX_MAX_AGE', 300)
+    event.listen(db.session, 'after_flush', _capture_changes)
+    event.listen(db.session, 'after_commit', _apply_changes)
+    event.listen(db.session, 'after_soft_rollback', lambda session, previous_transaction: _discard_changes(session))
@@ -0,0 +1,324 @@
+from models import db, Product, Inventory, Location, StockLevel, StockTransfer, StockTransferItem
+from sqlalchemy import case, select, insert, func, literal, event
+from datetime import datetime
+from services.sku_index import mark_products_changed
+from utils.cache import invalidate_catalog_responses
+
+DEFAULT_LOCATION_NAME = 'Main Warehouse'
+DEFAULT_LOCATION_CODE = 'MAIN'
+
+class StockError(ValueError):
+    """Raised when a stock movement cannot be made."""
+
+def stock_status(quantity, minimum):
+    """SQL expression for a product's stock status; mirrors ``Inventory.to_dict``."""
+    return case(
+        (quantity <= 0, 'out_of_stock'),
+        (quantity <= minimum, 'low_stock'),
+        else_='in_stock'
+    )
+
+def _product_stock_statement(product_ids=None):
+    """UPDATE copying inventory totals and status onto the products table.
+
+    ``product_ids`` is a list or a select of IDs; None syncs every product.
+    """
+    inventory = Inventory.__table__
+    products = Product.__table__
+
+    def from_inventory(column, default):
+        return func.coalesce(
+            select(column).where(inventory.c.product_id == products.c.id).limit(1).scalar_subquery(),
+            default
+        )
+
+    quantity = from_inventory(inventory.c.quantity_in_stock, 0)
+    statement = products.update().values(
+        stock_quantity=quantity,
+        stock_status=stock_status(quantity, from_inventory(inventory.c.minimum_stock_level, 0)),
+        # Stock changes are not edits to the product itself
+        updated_at=products.c.updated_at
+    )
+    if product_ids is not None:
+        statement = statement.where(products.c.id.in_(product_ids))
+    return statement
+
+def sync_product_stock(product_ids=None, connection=None):
+    """Refresh ``Product.stock_quantity``/``stock_status`` after Core writes to inventory.
+
+    Runs in the session unless a ``connection`` is given, as migrations do.
+    """
+    if connection is not None:
+        connection.execute(_product_stock_statement(product_ids))
+        return
+    db.session.execute(_product_stock_statement(product_ids))
+    _mark_stock_changed(db.session)
+    for instance in list(db.session.identity_map.values()):
+        if isinstance(instance, Product):
+            db.session.expire(instance, ['stock_quantity', 'stock_status'])
+
+_STOCK_CHANGED_KEY = 'product_stock_changed'
+
+def _mark_stock_changed(session):
+    session.info[_STOCK_CHANGED_KEY] = True
+
+def _sync_inventory_row(mapper, connection, target):
+    # Inventory rows written through the ORM (new records, threshold changes)
+    connection.execute(_product_stock_statement([target.product_id]))
+    _mark_stock_changed(db.session)
+
+def _invalidate_stock_responses(session):
+    # Product responses carry stock, so cached ones go stale once stock commits
+    if session.info.pop(_STOCK_CHANGED_KEY, False):
+        invalidate_catalog_responses()
+
+def init_stock_sync(app):
+    """Keep the stock columns on products, and cached product responses, in step with inventory."""
+    for identifier in ['after_insert', 'after_update', 'after_delete']:
+        if not event.contains(Inventory, identifier, _sync_inventory_row):
+            event.listen(Inventory, identifier, _sync_inventory_row)
+    if not event.contains(db.session, 'after_commit', _invalidate_stock_responses):
+        event.listen(db.session, 'after_commit', _invalidate_stock_responses)
+        event.listen(
+            db.session, 'after_soft_rollback',
+            lambda session, previous_transaction: session.info.pop(_STOCK_CHANGED_KEY, None)
+        )
+
+def ensure_default_location():
+    """Create the default location if needed and give it any unassigned stock.
+
+    Products whose inventory predates locations get a stock level at the
+    default location holding their whole inventory, so the per-location
+    levels always add up to ``Inventory.quantity_in_stock``. The caller
+    commits.
+    """
+    location = Location.query.filter_by(is_default=True).first()
+    if location is None:
+        location = Location.query.filter_by(code=DEFAULT_LOCATION_CODE).first() or Location(
+            name=DEFAULT_LOCATION_NAME,
+            code=DEFAULT_LOCATION_CODE
+        )
+        location.is_default = True
+        db.session.add(location)
+        db.session.flush()
+
+    inventory = Inventory.__table__
+    levels = StockLevel.__table__
+    db.session.execute(
+        insert(levels).from_select(
+            ['location_id', 'product_id', 'quantity', 'minimum_stock_level', 'maximum_stock_level', 'updated_at'],
+            select(
+                literal(location.id),
+                inventory.c.product_id,
+                func.coalesce(inventory.c.quantity_in_stock, 0),
+                inventory.c.minimum_stock_level,
+                inventory.c.maximum_stock_level,
+                literal(datetime.utcnow())
+            ).where(inventory.c.product_id.not_in(select(levels.c.product_id)))
+        )
+    )
+    return location
+
+def default_location_id():
+    location_id = db.session.execute(
+        select(Location.id).where(Location.is_default == True).order_by(Location.id).limit(1)
+    ).scalar()
+    if location_id is None:
+        location_id = ensure_default_location().id
+    return location_id
+
+def add_stock_levels(inventories, location_id=None):
+    """Create the stock levels for newly created inventory records.
+
+    ``inventories`` is a list of dicts with ``product_id`` and the
+    ``quantity_in_stock``, ``minimum_stock_level`` and
+    ``maximum_stock_level`` given to the new inventory record; the whole
+    quantity is placed at ``location_id`` (the default location if None).
+    """
+    if not inventories:
+        return
+    location_id = location_id or default_location_id()
+    now = datetime.utcnow()
+    db.session.execute(insert(StockLevel), [
+        {
+            'location_id': location_id,
+            'product_id': inventory['product_id'],
+            'quantity': inventory.get('quantity_in_stock') or 0,
+            'minimum_stock_level': inventory.get('minimum_stock_level'),
+            'maximum_stock_level': inventory.get('maximum_stock_level'),
+            'updated_at': now,
+        }
+        for inventory in inventories
+    ])
+
+def _ensure_levels(location_id, product_ids):
+    """Create empty stock levels for products with none at ``location_id``."""
+    existing = set(db.session.execute(
+        select(StockLevel.product_id).where(
+            StockLevel.location_id == location_id,
+            StockLevel.product_id.in_(list(product_ids))
+        )
+    ).scalars())
+    missing = [product_id for product_id in product_ids if product_id not in existing]
+    if missing:
+        now = datetime.utcnow()
+        db.session.execute(insert(StockLevel), [
+            {'location_id': location_id, 'product_id': product_id, 'quantity': 0, 'updated_at': now}
+            for product_id in missing
+        ])
+
+def _shift_levels(location_id, deltas):
+    levels = StockLevel.__table__
+    db.session.execute(
+        levels.update()
+        .where(levels.c.location_id == location_id, levels.c.product_id.in_(list(deltas)))
+        .values(
+            quantity=levels.c.quantity + case(deltas, value=levels.c.product_id),
+            updated_at=datetime.utcnow()
+        )
+    )
+
+def _expire(model, product_ids, attributes):
+    for instance in list(db.session.identity_map.values()):
+        if isinstance(instance, model) and instance.product_id in product_ids:
+            db.session.expire(instance, attributes)
+
+def adjust_stock(deltas, location_id=None):
+    """Apply per-product stock changes with set-based UPDATEs.
+
+    ``deltas`` maps product id to the change in stock (negative for
+    corrections, positive for returns and restocks). The stock levels at
+    ``location_id`` (the default location if None) and the per-product
+    totals on ``Inventory`` each move with one statement. Raises
+    :class:`StockError` before writing anything if a decrease is larger
+    than the stock at that location; sales use :func:`withdraw_stock`,
+    which draws on every location. The statements run in the current
+    transaction; the caller commits.
+    """
+    deltas = {product_id: delta for product_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    location_id = location_id or default_location_id()
+    decreases = {product_id: -delta for product_id, delta in deltas.items() if delta < 0}
+    if decreases:
+        levels = dict(db.session.execute(
+            select(StockLevel.product_id, StockLevel.quantity)
+            .where(StockLevel.location_id == location_id, StockLevel.product_id.in_(list(decreases)))
+        ).all())
+        short = [product_id for product_id, quantity in decreases.items() if (levels.get(product_id) or 0) < quantity]
+        if short:
+            raise StockError(f'Insufficient stock at location for products: {", ".join(map(str, short))}')
+
+    _ensure_levels(location_id, deltas)
+    _shift_levels(location_id, deltas)
+    _shift_totals(deltas)
+
+def withdraw_stock(quantities):
+    """Take sold units out of stock at the locations that hold them.
+
+    ``quantities`` maps product id to the (positive) number of units sold.
+    Each product is taken from the default location first, then from the
+    other locations with the most stock, active ones before inactive ones,
+    so no location goes below zero. Levels are read with one query, each
+    location involved moves with one ``UPDATE`` and the totals on
+    ``Inventory`` with one more. Raises :class:`StockError` before writing
+    anything if the locations together cannot cover a product. The caller
+    commits.
+    """
+    quantities = {product_id: quantity for product_id, quantity in quantities.items() if quantity > 0}
+    if not quantities:
+        return
+
+    default_id = default_location_id()
+    levels = db.session.execute(
+        select(StockLevel.product_id, StockLevel.location_id, StockLevel.quantity)
+        .join(Location, StockLevel.location_id == Location.id)
+        .where(StockLevel.product_id.in_(list(quantities)), StockLevel.quantity > 0)
+        .order_by(
+            StockLevel.product_id,
+            (StockLevel.location_id != default_id),
+            Location.is_active.desc(),
+            StockLevel.quantity.desc(),
+            StockLevel.location_id
+        )
+    ).all()
+
+    remaining = dict(quantities)
+    by_location = {}
+    for product_id, location_id, quantity in levels:
+        taken = min(quantity, remaining[product_id])
+        if taken:
+            remaining[product_id] -= taken
+            by_location.setdefault(location_id, {})[product_id] = -taken
+
+    short = [product_id for product_id, quantity in remaining.items() if quantity > 0]
+    if short:
+        raise StockError(f'Insufficient stock for products: {", ".join(map(str, short))}')
+
+    for location_id, deltas in by_location.items():
+        _shift_levels(location_id, deltas)
+    _shift_totals({product_id: -quantity for product_id, quantity in quantities.items()})
+
+def _shift_totals(deltas):
+    """Move the per-product totals on ``Inventory`` and everything copied from them."""
+    db.session.execute(
+        Inventory.__table__.update()
+        .where(Inventory.__table__.c.product_id.in_(list(deltas)))
+        .values(
+            quantity_in_stock=Inventory.__table__.c.quantity_in_stock
+            + case(deltas, value=Inventory.__table__.c.product_id),
+            updated_at=datetime.utcnow()
+        )
+    )
+
+    sync_product_stock(list(deltas))
+
+    # Objects already loaded in this session no longer match the tables
+    _expire(Inventory, deltas, ['quantity_in_stock', 'updated_at'])
+    _expire(StockLevel, deltas, ['quantity', 'updated_at'])
+
+    mark_products_changed(db.session, deltas)
+
+def transfer_stock(from_location_id, to_location_id, quantities, user_id=None, notes=None):
+    """Move stock between two locations.
+
+    ``quantities`` maps product id to the (positive) quantity to move.
+    Availability at the source is checked for every product with one
+    query before anything is written; each side then moves with one
+    ``UPDATE``. Totals on ``Inventory`` are unchanged. Returns the
+    :class:`StockTransfer`; the caller commits.
+    """
+    if from_location_id == to_location_id:
+        raise StockError('Source and destination locations must differ')
+
+    available = dict(db.session.execute(
+        select(StockLevel.product_id, StockLevel.quantity).where(
+            StockLevel.location_id == from_location_id,
+            StockLevel.product_id.in_(list(quantities))
+        )
+    ).all())
+    short = [
+        product_id for product_id, quantity in quantities.items()
+        if available.get(product_id, 0) < quantity
+    ]
+    if short:
+        raise StockError(f'Insufficient stock at source location for products: {", ".join(map(str, short))}')
+
+    _shift_levels(from_location_id, {product_id: -quantity for product_id, quantity in quantities.items()})
+    _ensure_levels(to_location_id, quantities)
+    _shift_levels(to_location_id, quantities)
+    _expire(StockLevel, quantities, ['quantity', 'updated_at'])
+
+    transfer = StockTransfer(
+        from_location_id=from_location_id,
+        to_location_id=to_location_id,
+        user_id=user_id,
+        notes=notes,
+        items=[
+            StockTransferItem(product_id=product_id, quantity=quantity)
+            for product_id, quantity in quantities.items()
+        ]
+    )
+    db.session.add(transfer)
+    return transfer
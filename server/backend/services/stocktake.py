@@ -0,0 +1,287 @@
+from models import db, Product, Inventory, StockLevel, StocktakeCount, StocktakeVariance
+from sqlalchemy import select, insert, update, delete, and_, or_, literal
+from datetime import datetime
+from decimal import Decimal
+from itertools import islice
+from services.repricing import category_descendants
+from services.sku_index import mark_products_changed
+from services.stock import sync_product_stock
+import numpy as np
+
+# Scanned rows resolved and written per round of statements
+COUNT_CHUNK_SIZE = 1000
+
+COUNT_MODES = ['add', 'set']
+
+def _scope_ids(session):
+    """Category IDs a session is limited to, or None for a full-store count."""
+    if session.category_id is None:
+        return None
+    return set(db.session.execute(category_descendants([session.category_id])).scalars())
+
+def _parse_count(row):
+    """Validate one scanned row. Returns ``(sku, product_id, quantity, error)``."""
+    sku = row.get('sku')
+    sku = str(sku).strip() if sku is not None and str(sku).strip() else None
+    product_id = row.get('product_id')
+    if sku is None:
+        try:
+            product_id = int(str(product_id).strip())
+        except (TypeError, ValueError):
+            return None, None, None, 'sku or product_id is required'
+    else:
+        product_id = None
+
+    try:
+        quantity = int(str(row.get('quantity', 1)).strip())
+    except ValueError:
+        return None, None, None, 'Quantity must be a whole number'
+    if quantity < 0:
+        return None, None, None, 'Quantity cannot be negative'
+    return sku, product_id, quantity, None
+
+def record_counts(session, rows, mode='add'):
+    """Merge scanned counts into an open stocktake session.
+
+    ``rows`` is an iterable of ``{'sku' or 'product_id', 'quantity'}``
+    dicts. In ``'add'`` mode quantities are added to what has already been
+    counted for a product (one row per scan or per shelf); in ``'set'``
+    mode they replace it. Each chunk resolves its SKUs and existing counts
+    with one query each and writes with batched statements. The caller
+    commits.
+    """
+    scope = _scope_ids(session)
+    summary = {'accepted': 0, 'errors': []}
+    rows = iter(enumerate(rows, start=1))
+
+    while True:
+        chunk = list(islice(rows, COUNT_CHUNK_SIZE))
+        if not chunk:
+            break
+
+        parsed = []
+        for row_number, row in chunk:
+            if not isinstance(row, dict):
+                summary['errors'].append({'row': row_number, 'error': 'Row must be an object'})
+                continue
+            sku, product_id, quantity, error = _parse_count(row)
+            if error:
+                summary['errors'].append({'row': row_number, 'error': error})
+                continue
+            parsed.append((row_number, sku, product_id, quantity))
+
+        if not parsed:
+            continue
+
+        skus = {sku for _, sku, _, _ in parsed if sku is not None}
+        ids = {product_id for _, _, product_id, _ in parsed if product_id is not None}
+        products = db.session.execute(
+            select(Product.id, Product.sku, Product.category_id)
+            .where(or_(Product.sku.in_(list(skus)), Product.id.in_(list(ids))))
+        ).all()
+        by_sku = {product.sku: product for product in products}
+        by_id = {product.id: product for product in products}
+
+        quantities = {}
+        for row_number, sku, product_id, quantity in parsed:
+            product = by_sku.get(sku) if sku is not None else by_id.get(product_id)
+            if product is None:
+                summary['errors'].append({'row': row_number, 'error': 'Product not found'})
+                continue
+            if scope is not None and product.category_id not in scope:
+                summary['errors'].append({'row': row_number, 'error': 'Product is outside the stocktake scope'})
+                continue
+            if mode == 'add':
+                quantities[product.id] = quantities.get(product.id, 0) + quantity
+            else:
+                quantities[product.id] = quantity
+            summary['accepted'] += 1
+
+        if not quantities:
+            continue
+
+        existing = {
+            row.product_id: row
+            for row in db.session.execute(
+                select(StocktakeCount.id, StocktakeCount.product_id, StocktakeCount.counted_quantity)
+                .where(StocktakeCount.session_id == session.id, StocktakeCount.product_id.in_(list(quantities)))
+            )
+        }
+
+        now = datetime.utcnow()
+        new_rows = []
+        update_rows = []
+        for product_id, quantity in quantities.items():
+            count = existing.get(product_id)
+            if count is None:
+                new_rows.append({
+                    'session_id': session.id,
+                    'product_id': product_id,
+                    'counted_quantity': quantity,
+                    'updated_at': now,
+                })
+            else:
+                if mode == 'add':
+                    quantity += count.counted_quantity
+                update_rows.append({'id': count.id, 'counted_quantity': quantity, 'updated_at': now})
+
+        if new_rows:
+            db.session.execute(insert(StocktakeCount), new_rows)
+        if update_rows:
+            db.session.execute(update(StocktakeCount), update_rows)
+
+    return summary
+
+def _cents(values):
+    return Decimal(int(values)).scaleb(-2)
+
+def compute_variances(session):
+    """Compare a session's counts with the stock on record and store the result.
+
+    Expected stock and cost for every product in the count are read in one
+    query and compared with the counts as numpy arrays, so the whole
+    comparison is a handful of vectorised operations however many products
+    were counted. Only products whose count differs are stored as
+    :class:`StocktakeVariance` rows; totals are kept on the session. The
+    caller commits.
+    """
+    counts = db.session.execute(
+        select(StocktakeCount.product_id, StocktakeCount.counted_quantity)
+        .where(StocktakeCount.session_id == session.id)
+        .order_by(StocktakeCount.product_id)
+    ).all()
+
+    statement = select(
+        Product.id, Product.cost_price, StockLevel.quantity
+    ).outerjoin(StockLevel, and_(
+        StockLevel.product_id == Product.id,
+        StockLevel.location_id == session.location_id
+    )).order_by(Product.id)
+    if session.zero_uncounted:
+        scope = _scope_ids(session)
+        if scope is not None:
+            statement = statement.where(Product.category_id.in_(list(scope)))
+    else:
+        statement = statement.where(Product.id.in_(
+            select(StocktakeCount.product_id).where(StocktakeCount.session_id == session.id)
+        ))
+    stock = db.session.execute(statement).all()
+
+    product_ids = np.array([row.id for row in stock], dtype=np.int64)
+    expected = np.array([row.quantity or 0 for row in stock], dtype=np.int64)
+    cost_cents = np.array([int(row.cost_price * 100) for row in stock], dtype=np.int64)
+
+    # Line the counts up with the stock rows; products not scanned count as 0
+    counted = np.zeros(len(product_ids), dtype=np.int64)
+    counted_mask = np.zeros(len(product_ids), dtype=bool)
+    if counts and len(product_ids):
+        count_ids = np.array([row.product_id for row in counts], dtype=np.int64)
+        count_values = np.array([row.counted_quantity for row in counts], dtype=np.int64)
+        positions = np.minimum(np.searchsorted(product_ids, count_ids), len(product_ids) - 1)
+        found = product_ids[positions] == count_ids
+        counted[positions[found]] = count_values[found]
+        counted_mask[positions[found]] = True
+
+    variance = counted - expected
+    value_cents = variance * cost_cents
+    changed = np.flatnonzero(variance)
+
+    db.session.execute(delete(StocktakeVariance).where(StocktakeVariance.session_id == session.id))
+    if len(changed):
+        db.session.execute(insert(StocktakeVariance), [
+            {
+                'session_id': session.id,
+                'product_id': product_id,
+                'expected_quantity': expected_quantity,
+                'counted_quantity': counted_quantity,
+                'variance': units,
+                'unit_cost': _cents(unit_cost),
+                'variance_value': _cents(value),
+            }
+            for product_id, expected_quantity, counted_quantity, units, unit_cost, value in zip(
+                product_ids[changed].tolist(),
+                expected[changed].tolist(),
+                counted[changed].tolist(),
+                variance[changed].tolist(),
+                cost_cents[changed].tolist(),
+                value_cents[changed].tolist()
+            )
+        ])
+
+    session.products_counted = int(counted_mask.sum())
+    session.products_with_variance = len(changed)
+    session.variance_units = int(variance.sum())
+    session.variance_value = _cents(value_cents.sum())
+    session.shrinkage_value = _cents(-value_cents[value_cents < 0].sum())
+    session.variances_computed_at = datetime.utcnow()
+    return session
+
+def reconcile(session, user_id):
+    """Apply a session's variances to stock in the current transaction.
+
+    Variances are recomputed first so they reflect stock at this moment.
+    The counted location's stock levels and the per-product inventory
+    totals are then each corrected with one ``UPDATE`` that adds the stored
+    variance. Products that were counted but had no stock record get one.
+    The caller commits.
+    """
+    compute_variances(session)
+    now = datetime.utcnow()
+
+    variances = StocktakeVariance.__table__
+    inventory = Inventory.__table__
+    levels = StockLevel.__table__
+    session_variances = select(variances.c.product_id).where(variances.c.session_id == session.id)
+
+    db.session.execute(
+        insert(inventory).from_select(
+            ['product_id', 'quantity_in_stock', 'created_at', 'updated_at'],
+            select(variances.c.product_id, literal(0), literal(now), literal(now)).where(
+                variances.c.session_id == session.id,
+                variances.c.product_id.not_in(select(inventory.c.product_id))
+            )
+        )
+    )
+    db.session.execute(
+        insert(levels).from_select(
+            ['location_id', 'product_id', 'quantity', 'updated_at'],
+            select(literal(session.location_id), variances.c.product_id, literal(0), literal(now)).where(
+                variances.c.session_id == session.id,
+                variances.c.product_id.not_in(
+                    select(levels.c.product_id).where(levels.c.location_id == session.location_id)
+                )
+            )
+        )
+    )
+
+    def variance_of(table):
+        return select(variances.c.variance).where(
+            variances.c.session_id == session.id,
+            variances.c.product_id == table.c.product_id
+        ).scalar_subquery()
+
+    db.session.execute(
+        levels.update()
+        .where(levels.c.location_id == session.location_id, levels.c.product_id.in_(session_variances))
+        .values(quantity=levels.c.quantity + variance_of(levels), updated_at=now)
+    )
+    db.session.execute(
+        inventory.update()
+        .where(inventory.c.product_id.in_(session_variances))
+        .values(quantity_in_stock=inventory.c.quantity_in_stock + variance_of(inventory), updated_at=now)
+    )
+
+    sync_product_stock(session_variances)
+
+    product_ids = set(db.session.execute(session_variances).scalars())
+    for instance in list(db.session.identity_map.values()):
+        if isinstance(instance, Inventory) and instance.product_id in product_ids:
+            db.session.expire(instance, ['quantity_in_stock', 'updated_at'])
+        elif isinstance(instance, StockLevel) and instance.product_id in product_ids:
+            db.session.expire(instance, ['quantity', 'updated_at'])
+    mark_products_changed(db.session, product_ids)
+
+    session.status = 'reconciled'
+    session.reconciled_by = user_id
+    session.reconciled_at = now
+    return session
@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+# The app reads its database URL on import
+os.environ['DATABASE_URL'] = 'sqlite://'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app as flask_app
+from models import db
+from services.stock import ensure_default_location
+
+@pytest.fixture
+def app():
+    """The app on a fresh in-memory database holding only the default location."""
+    with flask_app.app_context():
+        db.create_all()
+        ensure_default_location()
+        db.session.commit()
+        yield flask_app
+        db.session.remove()
+        db.drop_all()
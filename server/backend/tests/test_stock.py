@@ -0,0 +1,137 @@
+import pytest
+
+from models import db, Category, Supplier, Product, Inventory, Location, StockLevel
+from services.stock import StockError, adjust_stock, withdraw_stock, transfer_stock, default_location_id, add_stock_levels
+
+def _product(sku, quantity):
+    category = Category.query.first() or Category(name='Tops')
+    supplier = Supplier.query.first() or Supplier(name='Acme')
+    product = Product(
+        name=sku, sku=sku, cost_price=5, selling_price=10,
+        category=category, supplier=supplier, stock_quantity=quantity
+    )
+    db.session.add(product)
+    db.session.flush()
+    db.session.add(Inventory(product_id=product.id, quantity_in_stock=quantity))
+    add_stock_levels([{'product_id': product.id, 'quantity_in_stock': quantity}])
+    db.session.commit()
+    return product.id
+
+def _location(code):
+    location = Location(name=code, code=code)
+    db.session.add(location)
+    db.session.commit()
+    return location.id
+
+def _level(location_id, product_id):
+    level = StockLevel.query.filter_by(location_id=location_id, product_id=product_id).first()
+    return level.quantity if level else 0
+
+def _assert_consistent(product_id):
+    """Levels add up to the inventory total, which matches the product."""
+    levels = sum(level.quantity for level in StockLevel.query.filter_by(product_id=product_id))
+    inventory = Inventory.query.filter_by(product_id=product_id).one()
+    product = db.session.get(Product, product_id)
+    assert levels == inventory.quantity_in_stock == product.stock_quantity
+    assert all(level.quantity >= 0 for level in StockLevel.query.filter_by(product_id=product_id))
+
+def test_adjust_stock_moves_level_and_totals(app):
+    product_id = _product('A-1', 10)
+    adjust_stock({product_id: 5})
+    adjust_stock({product_id: -3})
+    db.session.commit()
+
+    assert _level(default_location_id(), product_id) == 12
+    assert db.session.get(Product, product_id).stock_status == 'in_stock'
+    _assert_consistent(product_id)
+
+def test_adjust_stock_at_other_location_creates_level(app):
+    product_id = _product('A-1', 10)
+    store_id = _location('STORE')
+    adjust_stock({product_id: 4}, location_id=store_id)
+    db.session.commit()
+
+    assert _level(store_id, product_id) == 4
+    assert _level(default_location_id(), product_id) == 10
+    _assert_consistent(product_id)
+
+def test_adjust_stock_rejects_decrease_below_location_level(app):
+    product_id = _product('A-1', 10)
+    store_id = _location('STORE')
+    adjust_stock({product_id: 2}, location_id=store_id)
+    db.session.commit()
+
+    with pytest.raises(StockError):
+        adjust_stock({product_id: -3}, location_id=store_id)
+    db.session.rollback()
+
+    assert _level(store_id, product_id) == 2
+    _assert_consistent(product_id)
+
+def test_withdraw_stock_draws_default_location_first(app):
+    product_id = _product('A-1', 3)
+    store_id = _location('STORE')
+    adjust_stock({product_id: 5}, location_id=store_id)
+    withdraw_stock({product_id: 6})
+    db.session.commit()
+
+    assert _level(default_location_id(), product_id) == 0
+    assert _level(store_id, product_id) == 2
+    _assert_consistent(product_id)
+
+def test_withdraw_stock_prefers_active_locations(app):
+    product_id = _product('A-1', 0)
+    closed_id = _location('CLOSED')
+    open_id = _location('OPEN')
+    adjust_stock({product_id: 8}, location_id=closed_id)
+    adjust_stock({product_id: 2}, location_id=open_id)
+    db.session.get(Location, closed_id).is_active = False
+    db.session.commit()
+
+    withdraw_stock({product_id: 3})
+    db.session.commit()
+
+    assert _level(open_id, product_id) == 0
+    assert _level(closed_id, product_id) == 7
+    _assert_consistent(product_id)
+
+def test_withdraw_stock_rejects_shortfall_without_writing(app):
+    first_id = _product('A-1', 5)
+    second_id = _product('A-2', 1)
+
+    with pytest.raises(StockError) as error:
+        withdraw_stock({first_id: 2, second_id: 2})
+    db.session.rollback()
+
+    assert str(second_id) in str(error.value)
+    assert db.session.get(Product, first_id).stock_quantity == 5
+    _assert_consistent(first_id)
+    _assert_consistent(second_id)
+
+def test_transfer_stock_keeps_totals(app):
+    product_id = _product('A-1', 10)
+    main_id = default_location_id()
+    store_id = _location('STORE')
+
+    transfer = transfer_stock(main_id, store_id, {product_id: 4}, notes='Restock store')
+    db.session.commit()
+
+    assert [(item.product_id, item.quantity) for item in transfer.items] == [(product_id, 4)]
+    assert _level(main_id, product_id) == 6
+    assert _level(store_id, product_id) == 4
+    assert db.session.get(Product, product_id).stock_quantity == 10
+    _assert_consistent(product_id)
+
+def test_transfer_stock_rejects_shortfall_and_same_location(app):
+    product_id = _product('A-1', 2)
+    main_id = default_location_id()
+    store_id = _location('STORE')
+
+    with pytest.raises(StockError):
+        transfer_stock(main_id, store_id, {product_id: 3})
+    with pytest.raises(StockError):
+        transfer_stock(main_id, main_id, {product_id: 1})
+    db.session.rollback()
+
+    assert _level(main_id, product_id) == 2
+    _assert_consistent(product_id)
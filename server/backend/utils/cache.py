@@ -0,0 +1,124 @@
+from flask import request, current_app
+from functools import wraps
+from utils.compression import compress_body
+import threading
+import time
+
+class CacheEntry:
+    """A cached response body plus its lazily built compressed variants."""
+
+    __slots__ = ('body', 'status', 'headers', 'expires_at', 'variants', 'lock')
+
+    def __init__(self, response, ttl):
+        self.body = response.get_data()
+        self.status = response.status_code
+        self.headers = [
+            (name, value) for name, value in response.headers.items()
+            if name not in ('Content-Length', 'Content-Encoding')
+        ]
+        self.expires_at = time.monotonic() + ttl
+        self.variants = {}
+        self.lock = threading.Lock()
+
+    def encoded(self, encoding):
+        """Return the body compressed with ``encoding``, or None if it is too small."""
+        if len(self.body) < current_app.config['COMPRESS_MIN_SIZE']:
+            return None
+        variant = self.variants.get(encoding)
+        if variant is None:
+            with self.lock:
+                variant = self.variants.get(encoding)
+                if variant is None:
+                    variant = compress_body(self.body, encoding)
+                    self.variants[encoding] = variant
+        return variant
+
+    def to_response(self):
+        response = current_app.response_class(self.body, status=self.status, headers=self.headers)
+        response.cache_entry = self
+        return response
+
+class ResponseCache:
+    """In-process TTL cache for rendered GET responses, grouped by namespace."""
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at < time.monotonic():
+            with self._lock:
+                self._entries.pop(key, None)
+            return None
+        return entry
+
+    def set(self, key, response, ttl):
+        entry = CacheEntry(response, ttl)
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                # Drop the oldest entry; dicts keep insertion order
+                self._entries.pop(next(iter(self._entries)), None)
+            self._entries[key] = entry
+        return entry
+
+    def invalidate(self, namespace=None):
+        with self._lock:
+            if namespace is None:
+                self._entries.clear()
+            else:
+                for key in [key for key in self._entries if key[0] == namespace]:
+                    del self._entries[key]
+
+response_cache = ResponseCache()
+
+def cached_response(namespace, unless=None):
+    """Cache successful responses of a GET view under ``namespace``.
+
+    The key covers the full path and the Accept header, since listings can
+    be negotiated into MessagePack. ``unless`` is an optional callable that
+    returns True for requests that must bypass the cache.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if unless is not None and unless():
+                return view(*args, **kwargs)
+
+            key = (namespace, request.full_path, request.headers.get('Accept', ''))
+            entry = response_cache.get(key)
+            if entry is not None:
+                return entry.to_response()
+
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code == 200 and not response.is_streamed:
+                response.cache_entry = response_cache.set(
+                    key, response, current_app.config['CATALOG_CACHE_TTL']
+                )
+            return response
+        return wrapper
+    return decorator
+
+_catalog_generation = 0
+
+def invalidate_catalog():
+    """Drop cached catalog responses after products, categories or suppliers change."""
+    global _catalog_generation
+    response_cache.invalidate('catalog')
+    _catalog_generation += 1
+
+def invalidate_catalog_responses():
+    """Drop cached catalog responses after stock changes.
+
+    Stock is part of product responses but not of the in-process catalog
+    indexes, so their generation is left alone and they do not rebuild
+    on every sale.
+    """
+    response_cache.invalidate('catalog')
+
+def catalog_generation():
+    """Counter bumped by :func:`invalidate_catalog`, so in-process indexes of the catalog know to rebuild."""
+    return _catalog_generation
@@ -0,0 +1,66 @@
+from flask import request, current_app
+import gzip
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/msgpack',
+    'application/x-ndjson',
+    'text/csv',
+    'text/html',
+    'text/plain',
+}
+
+def supported_encodings():
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+def negotiate_encoding():
+    """Pick the best content encoding the client accepts, or None."""
+    return request.accept_encodings.best_match(supported_encodings())
+
+def compress_body(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=current_app.config['COMPRESS_BROTLI_QUALITY'])
+    return gzip.compress(data, compresslevel=current_app.config['COMPRESS_LEVEL'])
+
+def compress_response(response):
+    """Compress eligible responses according to the request's Accept-Encoding."""
+    if (
+        response.direct_passthrough
+        or response.is_streamed
+        or response.status_code < 200
+        or response.status_code in (204, 304)
+        or 'Content-Encoding' in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+    ):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding()
+    if not encoding:
+        return response
+
+    # Cached responses keep their compressed variants so they are compressed once
+    entry = getattr(response, 'cache_entry', None)
+    if entry is not None:
+        body = entry.encoded(encoding)
+    else:
+        data = response.get_data()
+        body = compress_body(data, encoding) if len(data) >= current_app.config['COMPRESS_MIN_SIZE'] else None
+
+    if body is None:
+        return response
+
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+def init_compression(app):
+    app.config.setdefault('COMPRESS_MIN_SIZE', 1024)
+    app.config.setdefault('COMPRESS_LEVEL', 6)
+    app.config.setdefault('COMPRESS_BROTLI_QUALITY', 5)
+    app.after_request(compress_response)
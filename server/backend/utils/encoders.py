@@ -0,0 +1,138 @@
+from models import db, User, Category, Supplier, Product, Purchase, PurchaseItem, Inventory
+from sqlalchemy import select, func
+import math
+
+class RowEncoder:
+    """Maps flat row tuples onto response records for one model.
+
+    The encoder knows which columns to select, so list endpoints can run a
+    Core ``select`` and encode the rows directly instead of loading ORM
+    objects and calling ``to_dict`` on each of them. Values are left as the
+    database returns them (Decimal, datetime, enum); the app's JSON provider
+    encodes those natively.
+
+    ``nested`` maps a record key to ``(encoder, onclause)``. The related
+    model is outer joined on ``onclause`` and rendered as a sub-record, or
+    None when the join found no row.
+    """
+
+    def __init__(self, model, fields, nested=None, computed=None):
+        self.model = model
+        self.fields = tuple(fields)
+        self.nested = nested or {}
+        self.computed = computed or {}
+        self.width = len(self.fields) + sum(encoder.width for encoder, _ in self.nested.values())
+
+    @property
+    def columns(self):
+        columns = [getattr(self.model, field) for field in self.fields]
+        for encoder, _ in self.nested.values():
+            columns.extend(encoder.columns)
+        return columns
+
+    def join(self, statement):
+        for encoder, onclause in self.nested.values():
+            statement = encoder.join(statement.outerjoin(encoder.model, onclause))
+        return statement
+
+    def select(self):
+        return self.join(select(*self.columns).select_from(self.model))
+
+    def encode(self, row, offset=0):
+        end = offset + len(self.fields)
+        record = dict(zip(self.fields, row[offset:end]))
+        for name, (encoder, _) in self.nested.items():
+            nested = encoder.encode(row, end)
+            record[name] = nested if nested['id'] is not None else None
+            end += encoder.width
+        for name, compute in self.computed.items():
+            record[name] = compute(record)
+        return record
+
+    def encode_all(self, rows):
+        return [self.encode(row) for row in rows]
+
+def paginate_rows(statement, page, per_page):
+    """Run ``statement`` for one page, mirroring ``Query.paginate(error_out=False)``.
+
+    Returns ``(rows, total, pages)``.
+    """
+    page = page if page and page > 0 else 1
+    per_page = per_page if per_page and per_page > 0 else 20
+
+    total = db.session.execute(
+        select(func.count()).select_from(statement.order_by(None).subquery())
+    ).scalar()
+    rows = db.session.execute(
+        statement.limit(per_page).offset((page - 1) * per_page)
+    ).all()
+
+    return rows, total, int(math.ceil(total / per_page)) if total else 0
+
+USER_ENCODER = RowEncoder(User, [
+    'id', 'username', 'email', 'first_name', 'last_name', 'phone', 'address',
+    'role', 'is_active', 'created_at', 'updated_at'
+])
+
+CATEGORY_ENCODER = RowEncoder(Category, [
+    'id', 'name', 'description', 'parent_id', 'created_at', 'updated_at'
+])
+
+SUPPLIER_ENCODER = RowEncoder(Supplier, [
+    'id', 'name', 'contact_person', 'email', 'phone', 'address', 'payment_terms',
+    'delivery_schedule', 'is_active', 'created_at', 'updated_at'
+])
+
+PRODUCT_ENCODER = RowEncoder(Product, [
+    'id', 'name', 'description', 'sku', 'brand', 'size', 'color', 'cost_price',
+    'selling_price', 'image_url', 'category_id', 'supplier_id', 'style_id', 'is_active',
+    'stock_quantity', 'stock_status', 'created_at', 'updated_at'
+], nested={
+    'category': (CATEGORY_ENCODER, Product.category_id == Category.id),
+    'supplier': (SUPPLIER_ENCODER, Product.supplier_id == Supplier.id),
+})
+
+PURCHASE_ITEM_ENCODER = RowEncoder(PurchaseItem, [
+    'id', 'purchase_id', 'product_id', 'quantity', 'unit_price', 'unit_cost',
+    'discount_amount', 'promotion_id', 'total_price'
+], nested={
+    'product': (PRODUCT_ENCODER, PurchaseItem.product_id == Product.id),
+})
+
+PURCHASE_ENCODER = RowEncoder(Purchase, [
+    'id', 'user_id', 'total_amount', 'payment_method', 'payment_status', 'status',
+    'notes', 'created_at', 'updated_at'
+], nested={
+    'user': (USER_ENCODER, Purchase.user_id == User.id),
+})
+
+INVENTORY_ENCODER = RowEncoder(Inventory, [
+    'id', 'product_id', 'quantity_in_stock', 'minimum_stock_level',
+    'maximum_stock_level', 'last_restocked', 'created_at', 'updated_at'
+], nested={
+    'product': (PRODUCT_ENCODER, Inventory.product_id == Product.id),
+}, computed={
+    'is_low_stock': lambda record: record['quantity_in_stock'] <= record['minimum_stock_level'],
+    'is_out_of_stock': lambda record: record['quantity_in_stock'] == 0,
+})
+
+def encode_purchases(rows):
+    """Encode purchase rows together with their items, using one query for all items."""
+    purchases = PURCHASE_ENCODER.encode_all(rows)
+    if not purchases:
+        return purchases
+
+    by_id = {}
+    for purchase in purchases:
+        purchase['items'] = []
+        by_id[purchase['id']] = purchase
+
+    item_rows = db.session.execute(
+        PURCHASE_ITEM_ENCODER.select()
+        .where(PurchaseItem.purchase_id.in_(list(by_id)))
+        .order_by(PurchaseItem.id)
+    ).all()
+    for item in PURCHASE_ITEM_ENCODER.encode_all(item_rows):
+        by_id[item['purchase_id']]['items'].append(item)
+
+    return purchases
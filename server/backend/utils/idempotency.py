@@ -0,0 +1,123 @@
+from flask import request, jsonify, current_app
+from flask_jwt_extended import get_jwt_identity
+from functools import wraps
+from datetime import datetime, timedelta
+from sqlalchemy import inspect
+from sqlalchemy.exc import IntegrityError
+from models import db, IdempotencyKey
+import hashlib
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+
+# Attempts at storing a response after the view committed
+STORE_ATTEMPTS = 3
+
+def _request_hash():
+    digest = hashlib.sha256()
+    digest.update(request.method.encode('utf-8'))
+    digest.update(request.full_path.encode('utf-8'))
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+def _replay(record):
+    response = current_app.response_class(
+        record.response_body, status=record.status_code, mimetype='application/json'
+    )
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+def _replay_unstored(record):
+    """Answer a retry whose original request committed but whose response was never stored."""
+    response = jsonify({
+        'message': 'This request was already processed; its response is no longer available',
+        'idempotency_key': record.key
+    })
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+def _store_response(record_id, response, now):
+    """Save the view's response on its committed reservation, retrying transient failures."""
+    for _ in range(STORE_ATTEMPTS):
+        try:
+            IdempotencyKey.query.filter_by(id=record_id).update({
+                'status_code': response.status_code,
+                'response_body': response.get_data(as_text=True)
+            }, synchronize_session=False)
+            IdempotencyKey.query.filter(IdempotencyKey.expires_at <= now).delete(synchronize_session=False)
+            db.session.commit()
+            return True
+        except Exception:
+            db.session.rollback()
+    current_app.logger.exception('Could not store the response for idempotency key %s', record_id)
+    return False
+
+def idempotent(view):
+    """Make a mutating view safe to retry with an ``Idempotency-Key`` header.
+
+    The key is reserved in the same transaction as the view's own writes, so
+    it is committed together with them or not at all. A retry with the same
+    key and body replays the stored response instead of running the view
+    again. The response is stored right after the view commits; should
+    that keep failing, the reservation still proves the writes committed
+    (it only becomes visible with them), so once
+    ``IDEMPOTENCY_PENDING_SECONDS`` have passed a retry is told the
+    request was already processed instead of being held off as in flight.
+    Must be applied below ``jwt_required`` since keys are scoped per user.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view(*args, **kwargs)
+
+        if len(key) > 255:
+            return jsonify({'error': f'{IDEMPOTENCY_HEADER} must be at most 255 characters'}), 400
+
+        user_id = get_jwt_identity()
+        request_hash = _request_hash()
+        now = datetime.utcnow()
+
+        record = IdempotencyKey.query.filter_by(user_id=user_id, key=key).first()
+        if record is not None and record.expires_at <= now:
+            db.session.delete(record)
+            db.session.flush()
+            record = None
+
+        if record is not None:
+            if record.request_hash != request_hash:
+                return jsonify({'error': f'{IDEMPOTENCY_HEADER} was already used for a different request'}), 422
+            if record.status_code is None:
+                pending_for = now - (record.created_at or now)
+                if pending_for > timedelta(seconds=current_app.config['IDEMPOTENCY_PENDING_SECONDS']):
+                    return _replay_unstored(record)
+                return jsonify({'error': 'A request with this Idempotency-Key is still being processed'}), 409
+            return _replay(record)
+
+        record = IdempotencyKey(
+            user_id=user_id,
+            key=key,
+            request_hash=request_hash,
+            expires_at=now + timedelta(hours=current_app.config['IDEMPOTENCY_KEY_TTL_HOURS'])
+        )
+        db.session.add(record)
+        try:
+            db.session.flush()
+        except IntegrityError:
+            db.session.rollback()
+            return jsonify({'error': 'A request with this Idempotency-Key is still being processed'}), 409
+
+        response = current_app.make_response(view(*args, **kwargs))
+
+        # The view either committed the reservation with its writes or rolled both back
+        if inspect(record).persistent:
+            if 200 <= response.status_code < 300:
+                _store_response(record.id, response, now)
+            else:
+                try:
+                    db.session.delete(record)
+                    db.session.commit()
+                except Exception:
+                    db.session.rollback()
+
+        return response
+    return wrapper
@@ -0,0 +1,56 @@
+from flask.json.provider import DefaultJSONProvider
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+import json
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the stdlib encoder is used instead
+    orjson = None
+
+def json_default(value):
+    """Serialize the non-JSON types our models hand out.
+
+    Decimals become floats and datetimes ISO strings, matching what the
+    models' ``to_dict`` methods produce.
+    """
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson when it is installed.
+
+    Decimal, datetime and enum values (such as ``UserRole``) are encoded
+    directly, so routes can return raw column values instead of converting
+    them first.
+    """
+
+    sort_keys = False
+    default = staticmethod(json_default)
+
+    def dumps_bytes(self, obj):
+        if orjson is not None:
+            return orjson.dumps(obj, default=json_default, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(obj, default=json_default, ensure_ascii=self.ensure_ascii).encode('utf-8')
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.dumps(obj, default=json_default, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj), mimetype=self.mimetype)
@@ -0,0 +1,48 @@
+from alembic import op
+from sqlalchemy import inspect
+
+# Helpers for migration scripts. Databases reach a revision from different
+# starting points: an install from before migrations existed, or one where
+# ``db.create_all()`` already created a table with the newest columns. Each
+# step therefore only runs when its change is missing, and tables that do not
+# exist yet are left to ``db.create_all()``, which creates them complete.
+
+def has_table(table):
+    return inspect(op.get_bind()).has_table(table)
+
+def has_column(table, column):
+    return column in {info['name'] for info in inspect(op.get_bind()).get_columns(table)}
+
+def has_index(table, index):
+    return index in {info['name'] for info in inspect(op.get_bind()).get_indexes(table)}
+
+def add_column(table, column):
+    """Add ``column`` to ``table`` if the table exists without it. Returns True if added."""
+    if not has_table(table) or has_column(table, column.name):
+        return False
+    op.add_column(table, column)
+    return True
+
+def create_index(index, table, columns, unique=False):
+    """Create an index if ``table`` exists and has no index of that name."""
+    if has_table(table) and not has_index(table, index):
+        op.create_index(index, table, columns, unique=unique)
+
+def create_foreign_key(name, table, referent, columns, remote_columns):
+    """Add a foreign key to an existing table, except on SQLite.
+
+    SQLite can only add constraints by copying the whole table, and it does
+    not enforce foreign keys unless asked to, so there the column is left
+    without the constraint; tables created by ``db.create_all()`` have it.
+    """
+    if has_table(table) and op.get_bind().dialect.name != 'sqlite':
+        op.create_foreign_key(name, table, referent, columns, remote_columns)
+
+def drop_column(table, column):
+    if has_table(table) and has_column(table, column):
+        with op.batch_alter_table(table) as batch:
+            batch.drop_column(column)
+
+def drop_index(index, table):
+    if has_table(table) and has_index(table, index):
+        op.drop_index(index, table_name=table)
@@ -0,0 +1,44 @@
+from flask import request, jsonify, Response
+from utils.json_provider import json_default
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional; clients fall back to JSON
+    msgpack = None
+
+MSGPACK_MIMETYPE = 'application/msgpack'
+
+def wants_msgpack():
+    """Return True when the client prefers MessagePack over JSON."""
+    if msgpack is None:
+        return False
+    best = request.accept_mimetypes.best_match(['application/json', MSGPACK_MIMETYPE])
+    return best == MSGPACK_MIMETYPE
+
+def to_columnar(records):
+    """Turn a list of dicts into a dict of parallel arrays keyed by field name."""
+    if not records:
+        return {}
+    fields = list(records[0].keys())
+    return {field: [record.get(field) for record in records] for field in fields}
+
+def listing_response(payload, *listing_keys, status=200):
+    """Render a listing payload using the layout and encoding the client asked for.
+
+    ``listing_keys`` name the entries of ``payload`` that hold lists of records.
+    With ``?layout=columnar`` those lists are sent as parallel arrays per field,
+    and ``Accept: application/msgpack`` switches the body to MessagePack.
+    """
+    if request.args.get('layout') == 'columnar':
+        payload = dict(payload)
+        for key in listing_keys:
+            payload[key] = to_columnar(payload[key])
+        payload['layout'] = 'columnar'
+
+    if wants_msgpack():
+        response = Response(msgpack.packb(payload, default=json_default), mimetype=MSGPACK_MIMETYPE)
+    else:
+        response = jsonify(payload)
+
+    response.vary.add('Accept')
+    return response, status